@@ -1,4 +1,5 @@
 import os
+from datetime import datetime
 
 
 def try_parse(type, value: str):
@@ -17,5 +18,43 @@ MQTT_BROKER_PORT = try_parse(int, os.environ.get('MQTT_BROKER_PORT')) or 1883
 MQTT_TOPIC = os.environ.get('MQTT_TOPIC') or 'agent_data_topic'
 MQTT_TOPIC_PARKING = os.environ.get('MQTT_TOPIC_PARKING') or 'parking_topic'
 
-# Delay for sending data to mqtt in seconds
+# Publishing: aggregated data messages carry PUBLISH_BATCH_SIZE samples each and are sent
+# with MQTT_QOS (0 or 1). At most PUBLISH_WINDOW messages are unacknowledged at once,
+# publishing waits for acknowledgements beyond that (see mqtt_publisher.py)
+PUBLISH_BATCH_SIZE = try_parse(int, os.environ.get('PUBLISH_BATCH_SIZE')) or 1
+MQTT_QOS = try_parse(int, os.environ.get('MQTT_QOS')) or 0
+PUBLISH_WINDOW = try_parse(int, os.environ.get('PUBLISH_WINDOW')) or 100
+
+# Delay for sending data to mqtt in seconds, the default interval between replayed samples
 DELAY = try_parse(float, os.environ.get('DELAY')) or 1
+
+# Replay: samples are published REPLAY_SPEED times faster than they were recorded
+# (1 in real time, 0 as fast as possible). Samples keep their recorded timestamps when
+# the datasource has them, otherwise they are REPLAY_SAMPLE_RATE per second apart from
+# REPLAY_START (ISO 8601, now by default). REPLAY_SAMPLES stops after that many (0 never).
+REPLAY_SPEED = try_parse(float, os.environ.get('REPLAY_SPEED'))
+if REPLAY_SPEED is None:
+    REPLAY_SPEED = 1.0
+REPLAY_SAMPLE_RATE = try_parse(float, os.environ.get('REPLAY_SAMPLE_RATE')) or 1 / DELAY
+REPLAY_START = try_parse(datetime.fromisoformat, os.environ.get('REPLAY_START'))
+REPLAY_SAMPLES = try_parse(int, os.environ.get('REPLAY_SAMPLES')) or 0
+
+# Source of samples: "file" reads the CSV files row by row, "replay" loads them once
+# into memory and cycles through them (see replay_datasource.py), "recording" maps
+# RECORDING_FILE made by convert_recording.py (see recording_datasource.py)
+DATASOURCE = (os.environ.get('DATASOURCE') or 'file').lower()
+RECORDING_FILE = os.environ.get('RECORDING_FILE') or 'data/recording.bin'
+
+# Encoding of aggregated data messages: "json" or "binary" (see schema/wire_format.py)
+WIRE_FORMAT = (os.environ.get('WIRE_FORMAT') or 'json').lower()
+
+# Fleet mode: FLEET_SIZE virtual vehicles (0 simulates the single USER_ID vehicle) publishing
+# FLEET_RATE messages per second in total for FLEET_DURATION seconds (0 runs until stopped)
+FLEET_SIZE = try_parse(int, os.environ.get('FLEET_SIZE')) or 0
+FLEET_RATE = try_parse(float, os.environ.get('FLEET_RATE')) or 100
+FLEET_DURATION = try_parse(float, os.environ.get('FLEET_DURATION')) or 0
+FLEET_FIRST_USER_ID = try_parse(int, os.environ.get('FLEET_FIRST_USER_ID')) or USER_ID
+# Rows between the starting points of consecutive vehicles in the CSV files
+FLEET_OFFSET_STEP = try_parse(int, os.environ.get('FLEET_OFFSET_STEP')) or 50
+# Seconds between achieved rate and latency reports
+FLEET_REPORT_INTERVAL = try_parse(float, os.environ.get('FLEET_REPORT_INTERVAL')) or 5
@@ -0,0 +1,42 @@
+"""
+Convert the CSV files of a drive into a recording for DATASOURCE=recording.
+
+Usage (from the agent src directory):
+    python convert_recording.py data/recording.bin
+    python convert_recording.py data/recording.bin --sample-rate 10 --samples 10000000
+"""
+import argparse
+from datetime import datetime
+
+from recording_datasource import write_recording
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output", help="recording file to write")
+    parser.add_argument("--accelerometer", default="data/accelerometer.csv")
+    parser.add_argument("--gps", default="data/gps.csv")
+    parser.add_argument("--parking", default="data/parking.csv")
+    parser.add_argument("--sample-rate", type=float, default=1.0,
+                        help="samples per second, when the accelerometer file has no timestamp column")
+    parser.add_argument("--start", type=datetime.fromisoformat, default=None,
+                        help="ISO timestamp of the first generated sample (now by default)")
+    parser.add_argument("--samples", type=int, default=0,
+                        help="number of samples to write, cycling the files (one per accelerometer row by default)")
+    args = parser.parse_args()
+
+    with open(args.output, "wb") as output:
+        count = write_recording(
+            output,
+            args.accelerometer,
+            args.gps,
+            args.parking,
+            sample_rate=args.sample_rate,
+            start=args.start or datetime.now(),
+            samples=args.samples,
+        )
+    print(f"Wrote {count} samples to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
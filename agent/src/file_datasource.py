@@ -8,10 +8,21 @@ from domain.accelerometer import Accelerometer
 from domain.gps import Gps
 from domain.aggregated_data import AggregatedData
 from domain.parking import Parking
+from replay_clock import parse_timestamp
 
 
 class FileDatasource:
-    def __init__(self, accelerometer_filename: str, gps_filename: str, parking_filename: str) -> None:
+    def __init__(
+        self,
+        accelerometer_filename: str,
+        gps_filename: str,
+        parking_filename: str,
+        user_id: int = config.USER_ID,
+        offset: int = 0,
+    ) -> None:
+        self.user_id = user_id
+        # Rows skipped in every file on start, so several datasources replay different parts of a drive
+        self.offset = offset
         self._filenames = {
             'accelerometer': accelerometer_filename,
             'gps': gps_filename,
@@ -21,12 +32,15 @@ class FileDatasource:
         self._files: dict[str, Optional[TextIO]] = {'accelerometer': None, 'gps': None, 'parking': None}
         self._readers: dict[str, Optional[csv.DictReader]] = {'accelerometer': None, 'gps': None, 'parking': None}
 
+        self._recorded_timestamp: Optional[datetime] = None
         self.is_reading: bool = False
 
     def start_reading(self, *args, **kwargs):
         for key in self._filenames:
             self._files[key] = open(self._filenames[key], 'r')
             self._reset_reader(key)
+            for _ in range(self.offset):
+                self._next_row(key)
 
         self.is_reading = True
 
@@ -38,6 +52,10 @@ class FileDatasource:
         gps_row = self._next_row('gps')
         park_row = self._next_row('parking')
 
+        # Only recordings with a timestamp column know when their samples were taken
+        timestamp = acc_row.get("timestamp")
+        self._recorded_timestamp = parse_timestamp(timestamp) if timestamp else None
+
         acc_data = Accelerometer(
             x=int(acc_row["x"]),
             y=int(acc_row["y"]),
@@ -58,11 +76,15 @@ class FileDatasource:
         )
 
         return {
-            'aggregated': AggregatedData(user_id=config.USER_ID, accelerometer=acc_data, gps=gps_data,
+            'aggregated': AggregatedData(user_id=self.user_id, accelerometer=acc_data, gps=gps_data,
                                          timestamp=datetime.now()),
             'parking': park_data,
         }
 
+    def recorded_timestamp(self) -> Optional[datetime]:
+        """When the sample last returned by read() was recorded, if the recording says so."""
+        return self._recorded_timestamp
+
     def stop_reading(self, *args, **kwargs):
         for key in self._files:
             if self._files[key]:
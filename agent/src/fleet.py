@@ -0,0 +1,169 @@
+"""
+Fleet mode: many virtual vehicles publishing at a target aggregate rate, for capacity
+testing the edge, hub and store chain.
+
+Vehicle i gets user id FLEET_FIRST_USER_ID + i and starts i * FLEET_OFFSET_STEP samples
+into its data. Vehicles take turns, one aggregated data message of PUBLISH_BATCH_SIZE
+samples per tick. Ticks follow a fixed timeline (start + n / rate) rather than sleeping
+a fixed delay, so time spent reading and publishing does not make the rate drift, and
+late ticks are caught up at once. Ticks that are due together are read in bulk, which replay
+datasources serve from pre-serialized messages. Samples are stamped with the wall-clock time
+of their tick, spread evenly up to the next tick of their vehicle. Parking data is not
+published in this mode.
+"""
+import time
+from dataclasses import replace
+from datetime import datetime, timedelta
+
+from mqtt_publisher import LatencyStats, MqttPublisher, batch_messages
+from schema.aggregated_data_schema import AggregatedDataSchema
+from schema.wire_format import encode_aggregated_data
+import config
+
+
+# Most ticks published in one burst, so reports keep coming while catching up
+MAX_BURST = 1000
+
+
+class PublishStats(LatencyStats):
+    """Published messages, with the time publish() took including waits for the in-flight window."""
+
+    def __init__(self, batch_size: int = 1):
+        super().__init__()
+        self.batch_size = batch_size
+        self.failed = 0
+        self.max_lag = 0.0
+
+    def record_publish(self, latency: float, lag: float, ok: bool):
+        self.record(latency)
+        if not ok:
+            self.failed += 1
+        self.max_lag = max(self.max_lag, lag)
+
+    def report(self, ack_stats: LatencyStats) -> str:
+        elapsed = time.monotonic() - self.started
+        if not self.count:
+            return f"no messages sent in {elapsed:.1f}s"
+        return (
+            f"sent {self.count} in {elapsed:.1f}s ({self.count / elapsed:.0f} msg/s, "
+            f"{self.count * self.batch_size / elapsed:.0f} samples/s), failed {self.failed}, "
+            f"publish {self.percentiles()}, acked {ack_stats.count} {ack_stats.percentiles()}, "
+            f"max lag behind schedule {self.max_lag * 1e3:.1f}ms"
+        )
+
+
+def create_fleet(size: int, first_user_id: int, offset_step: int, create_datasource) -> list:
+    """Vehicles made by `create_datasource(user_id, offset)`."""
+    return [create_datasource(first_user_id + index, index * offset_step) for index in range(size)]
+
+
+def _read_messages(
+    datasource, count: int, schema: AggregatedDataSchema, timestamp: datetime, interval: timedelta
+) -> list:
+    """Next `count` samples of the datasource, the first stamped `timestamp`, every next one `interval` later."""
+    read_payloads = getattr(datasource, 'read_payloads', None)
+    if read_payloads is not None:
+        return read_payloads(count, config.WIRE_FORMAT, timestamp, interval)
+    messages = []
+    for sample in range(count):
+        data = replace(datasource.read()['aggregated'], timestamp=timestamp + sample * interval)
+        if config.WIRE_FORMAT == 'binary':
+            messages.append(encode_aggregated_data(data))
+        else:
+            messages.append(schema.dumps(data))
+    return messages
+
+
+def _burst_messages(
+    datasources,
+    first_tick: int,
+    count: int,
+    schema: AggregatedDataSchema,
+    batch_size: int,
+    started_at: datetime,
+    interval: float,
+) -> list:
+    """
+    Messages of `count` consecutive ticks, read in bulk from every vehicle taking part.
+    Each message holds `batch_size` samples of one vehicle. Tick n is due `n * interval`
+    seconds after `started_at`.
+    """
+    size = len(datasources)
+    last_tick = first_tick + count - 1
+    # A vehicle's batch_size samples cover the time until its next tick
+    sample_interval = timedelta(seconds=size * interval / batch_size)
+    vehicle_messages = {}
+    messages = []
+    for tick in range(first_tick, last_tick + 1):
+        index = tick % size
+        if index not in vehicle_messages:
+            vehicle_ticks = (last_tick - tick) // size + 1
+            timestamp = started_at + timedelta(seconds=tick * interval)
+            samples = _read_messages(
+                datasources[index], vehicle_ticks * batch_size, schema, timestamp, sample_interval
+            )
+            vehicle_messages[index] = iter([
+                batch_messages(samples[start:start + batch_size], config.WIRE_FORMAT)
+                for start in range(0, len(samples), batch_size)
+            ])
+        messages.append(next(vehicle_messages[index]))
+    return messages
+
+
+def run_fleet(
+    publisher: MqttPublisher,
+    topic,
+    datasources,
+    rate: float,
+    duration: float = 0,
+    report_interval: float = 5,
+    batch_size: int = 1,
+):
+    """
+    Publish aggregated data of the datasources in turn at `rate` messages per second
+    in total, for `duration` seconds (0 runs until interrupted).
+    """
+    schema = AggregatedDataSchema()
+    for datasource in datasources:
+        datasource.start_reading()
+
+    interval = 1 / rate
+    ticks = int(duration * rate)
+    start = time.monotonic()
+    started_at = datetime.now()
+    next_report = start + report_interval
+    stats = PublishStats(batch_size)
+    total = PublishStats(batch_size)
+    tick = 0
+    try:
+        while not ticks or tick < ticks:
+            now = time.monotonic()
+            due = int((now - start) * rate) + 1
+            if ticks:
+                due = min(due, ticks)
+            if due <= tick:
+                time.sleep(start + tick * interval - now)
+                continue
+
+            # Every tick that is due goes out in one burst, so a late scheduler catches up
+            count = min(due - tick, MAX_BURST)
+            messages = _burst_messages(datasources, tick, count, schema, batch_size, started_at, interval)
+            for offset, message in enumerate(messages):
+                lag = now - (start + (tick + offset) * interval)
+                published = time.monotonic()
+                ok = publisher.publish(topic, message)
+                latency = time.monotonic() - published
+                stats.record_publish(latency, lag, ok)
+                total.record_publish(latency, lag, ok)
+            tick += count
+
+            if now >= next_report:
+                print(f"Fleet of {len(datasources)}: {stats.report(publisher.take_ack_stats())}")
+                stats = PublishStats(batch_size)
+                next_report = now + report_interval
+        publisher.flush()
+    finally:
+        for datasource in datasources:
+            datasource.stop_reading()
+        print(f"Fleet of {len(datasources)} total: {total.report(publisher.ack_stats)}")
+    return total
@@ -1,13 +1,18 @@
 from paho.mqtt import client as mqtt_client
-import time
 from schema.aggregated_data_schema import AggregatedDataSchema
 from schema.parking_schema import ParkingSchema
+from schema.wire_format import encode_aggregated_data
 from file_datasource import FileDatasource
+from fleet import create_fleet, run_fleet
+from mqtt_publisher import MqttPublisher, batch_messages
+from recording_datasource import Recording, RecordingDatasource
+from replay_clock import ReplayClock
+from replay_datasource import ReplayDatasource, ReplayTable
 import config
 
 
 def connect_mqtt(broker, port):
-    """Create MQTT client"""
+    """Create MQTT client and the publisher sending through it"""
     print(f"CONNECT TO {broker}:{port}")
 
     def on_connect(client, userdata, flags, rc):
@@ -19,45 +24,98 @@ def connect_mqtt(broker, port):
 
     client = mqtt_client.Client()
     client.on_connect = on_connect
+    publisher = MqttPublisher(client, config.MQTT_QOS, config.PUBLISH_WINDOW)
     client.connect(broker, port)
     client.loop_start()
-    return client
+    return publisher
 
 
-def publish(client, topic_aggregated, topic_parking, datasource, delay):
+def publish(publisher, topic_aggregated, topic_parking, datasource, clock, samples=0, batch_size=1):
+    """
+    Publish samples of the datasource paced by the replay clock, forever or `samples` of them.
+    Aggregated data goes out `batch_size` samples per message.
+    """
     datasource.start_reading()
-    schema_map = {
-        topic_aggregated: (AggregatedDataSchema(), 'aggregated'),
-        topic_parking: (ParkingSchema(), 'parking')
-    }
+    aggregated_schema = AggregatedDataSchema()
+    parking_schema = ParkingSchema()
+    recorded_timestamp = getattr(datasource, 'recorded_timestamp', lambda: None)
 
-    while True:
-        time.sleep(delay)
+    sent = 0
+    batch = []
+    while not samples or sent < samples:
         data = datasource.read()
 
         if not data:
             continue
 
-        for topic, (schema, key) in schema_map.items():
-            msg = schema.dumps(data[key])
-            result = client.publish(topic, msg)
-            if result[0] != 0:
-                print(f"Failed to send {key} data to topic {topic}")
+        data['aggregated'].timestamp = clock.timestamp(recorded_timestamp())
+        clock.wait(data['aggregated'].timestamp)
 
+        if config.WIRE_FORMAT == 'binary':
+            batch.append(encode_aggregated_data(data['aggregated']))
+        else:
+            batch.append(aggregated_schema.dumps(data['aggregated']))
+        if len(batch) >= batch_size:
+            if not publisher.publish(topic_aggregated, batch_messages(batch, config.WIRE_FORMAT)):
+                print(f"Failed to send aggregated data to topic {topic_aggregated}")
+            batch = []
 
-def run():
-    # Prepare mqtt client
-    client = connect_mqtt(config.MQTT_BROKER_HOST, config.MQTT_BROKER_PORT)
+        if not publisher.publish(topic_parking, parking_schema.dumps(data['parking'])):
+            print(f"Failed to send parking data to topic {topic_parking}")
+        sent += 1
 
-    # Prepare datasource
-    datasource = FileDatasource(
+    if batch and not publisher.publish(topic_aggregated, batch_messages(batch, config.WIRE_FORMAT)):
+        print(f"Failed to send aggregated data to topic {topic_aggregated}")
+    # Messages are written by the network thread, which stops with the process
+    publisher.flush()
+    print(f"Published {sent} samples, acknowledged {publisher.ack_stats.percentiles()}")
+    datasource.stop_reading()
+
+
+def datasource_factory():
+    """
+    Function creating the configured datasource for a user id and a starting offset.
+    Replayed and recorded data is loaded or mapped once and shared by every datasource.
+    """
+    if config.DATASOURCE == 'replay':
+        table = ReplayTable("data/accelerometer.csv", "data/gps.csv", "data/parking.csv")
+        return lambda user_id, offset: ReplayDatasource(table, user_id, offset)
+    if config.DATASOURCE == 'recording':
+        recording = Recording(config.RECORDING_FILE)
+        return lambda user_id, offset: RecordingDatasource(recording, user_id, offset)
+    return lambda user_id, offset: FileDatasource(
         "data/accelerometer.csv",
         "data/gps.csv",
-        "data/parking.csv"
+        "data/parking.csv",
+        user_id=user_id,
+        offset=offset,
     )
 
-    # Infinity publish data
-    publish(client, config.MQTT_TOPIC, config.MQTT_TOPIC_PARKING, datasource, config.DELAY)
+
+def run():
+    # Prepare mqtt client
+    publisher = connect_mqtt(config.MQTT_BROKER_HOST, config.MQTT_BROKER_PORT)
+
+    create_datasource = datasource_factory()
+
+    if config.FLEET_SIZE > 0:
+        # Load generator: many vehicles at a target aggregate rate
+        fleet = create_fleet(
+            config.FLEET_SIZE, config.FLEET_FIRST_USER_ID, config.FLEET_OFFSET_STEP, create_datasource
+        )
+        run_fleet(publisher, config.MQTT_TOPIC, fleet, config.FLEET_RATE, config.FLEET_DURATION,
+                  config.FLEET_REPORT_INTERVAL, config.PUBLISH_BATCH_SIZE)
+        return
+
+    # Prepare datasource
+    datasource = create_datasource(config.USER_ID, 0)
+
+    # Replay at recorded timestamps, or REPLAY_SAMPLE_RATE, sped up by REPLAY_SPEED
+    clock = ReplayClock(config.REPLAY_SPEED, config.REPLAY_SAMPLE_RATE, config.REPLAY_START)
+
+    # Infinity publish data, unless REPLAY_SAMPLES limits it
+    publish(publisher, config.MQTT_TOPIC, config.MQTT_TOPIC_PARKING, datasource, clock, config.REPLAY_SAMPLES,
+            config.PUBLISH_BATCH_SIZE)
 
 
 if __name__ == '__main__':
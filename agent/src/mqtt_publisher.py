@@ -0,0 +1,158 @@
+"""
+Flow-controlled MQTT publishing of batched samples.
+
+MqttPublisher keeps at most `window` messages outstanding: with QoS 1 until the broker
+acknowledges them, with QoS 0 until the network thread has written them. A producer
+faster than the broker therefore blocks in publish() instead of growing paho's
+unbounded queue, and every message's acknowledgement latency is measured.
+"""
+import random
+import threading
+import time
+
+from paho.mqtt import client as mqtt_client
+
+from schema.wire_format import HEADER, KIND_AGENT_DATA, WIRE_FORMAT_VERSION
+
+
+class LatencyStats:
+    """
+    Count and latencies of events. Latencies are reservoir-sampled, so
+    percentiles of a long run are estimated from at most MAX_SAMPLES of them.
+    """
+
+    MAX_SAMPLES = 100_000
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.count = 0
+        self.latencies = []
+
+    def record(self, latency: float):
+        self.count += 1
+        if len(self.latencies) < self.MAX_SAMPLES:
+            self.latencies.append(latency)
+        else:
+            index = random.randrange(self.count)
+            if index < self.MAX_SAMPLES:
+                self.latencies[index] = latency
+
+    def percentile(self, fraction: float) -> float:
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def percentiles(self) -> str:
+        if not self.latencies:
+            return "p50 - p95 - p99 -"
+        return " ".join(
+            f"p{round(fraction * 100)} {self.percentile(fraction) * 1e3:.2f}ms" for fraction in (0.5, 0.95, 0.99)
+        )
+
+
+def batch_messages(messages: list, wire_format: str):
+    """
+    One message holding the samples of single-sample aggregated data messages:
+    a JSON array, or a binary message with all of their records.
+    """
+    if len(messages) == 1:
+        return messages[0]
+    if wire_format == 'binary':
+        return HEADER.pack(WIRE_FORMAT_VERSION, KIND_AGENT_DATA, len(messages)) + b"".join(
+            message[HEADER.size:] for message in messages
+        )
+    if isinstance(messages[0], str):
+        return "[" + ",".join(messages) + "]"
+    return b"[" + b",".join(messages) + b"]"
+
+
+class MqttPublisher:
+    """
+    Publishes through a paho client with a bounded window of unacknowledged messages.
+    Create it before the client connects, paho does not change its in-flight limit later.
+    """
+
+    def __init__(self, client, qos: int = 0, window: int = 100) -> None:
+        self.client = client
+        self.qos = qos
+        self.window = window
+        self.failed = 0
+        self.lost = 0
+        # Acknowledgement latencies of every message, and since the last take_ack_stats()
+        self.ack_stats = LatencyStats()
+        self._recent_ack_stats = LatencyStats()
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        # Message ids of outstanding messages and when they were published
+        self._pending: dict[int, float] = {}
+        # Acknowledgements that arrived before publish() registered their message id
+        self._early_acks: set[int] = set()
+
+        # Paho holds back QoS 1 messages beyond its own in-flight limit, the window replaces it
+        client.max_inflight_messages_set(window)
+        client.on_publish = self._on_publish
+        client.on_disconnect = self._on_disconnect
+
+    def publish(self, topic: str, payload) -> bool:
+        """Publish a message, first waiting while the window is full. Returns False if it was not sent."""
+        with self._condition:
+            while self._in_flight >= self.window:
+                self._condition.wait()
+            self._in_flight += 1
+
+        published = time.monotonic()
+        info = self.client.publish(topic, payload, qos=self.qos)
+
+        with self._condition:
+            # Without a connection paho keeps QoS 1 messages and sends them after reconnecting
+            queued = self.qos > 0 and info.rc == mqtt_client.MQTT_ERR_NO_CONN
+            if info.rc != mqtt_client.MQTT_ERR_SUCCESS and not queued:
+                self.failed += 1
+                self._release()
+                return False
+            if info.mid in self._early_acks:
+                self._early_acks.discard(info.mid)
+                self._acknowledged(time.monotonic() - published)
+            else:
+                self._pending[info.mid] = published
+        return True
+
+    def take_ack_stats(self) -> LatencyStats:
+        """Acknowledgements since the previous call, for periodic reports."""
+        with self._condition:
+            stats, self._recent_ack_stats = self._recent_ack_stats, LatencyStats()
+        return stats
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait until every message is acknowledged. Returns False on timeout."""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._in_flight == 0, timeout)
+
+    def _acknowledged(self, latency: float):
+        self.ack_stats.record(latency)
+        self._recent_ack_stats.record(latency)
+        self._release()
+
+    def _release(self):
+        self._in_flight -= 1
+        self._condition.notify_all()
+
+    def _on_publish(self, client, userdata, mid):
+        acknowledged = time.monotonic()
+        with self._condition:
+            published = self._pending.pop(mid, None)
+            if published is None:
+                self._early_acks.add(mid)
+                return
+            self._acknowledged(acknowledged - published)
+
+    def _on_disconnect(self, client, userdata, rc):
+        if self.qos > 0:
+            # Paho sends unacknowledged QoS 1 messages again after reconnecting
+            return
+        # Unwritten QoS 0 messages are discarded by paho without on_publish
+        with self._condition:
+            self.lost += len(self._pending)
+            self._in_flight -= len(self._pending)
+            self._pending.clear()
+            self._early_acks.clear()
+            self._condition.notify_all()
@@ -0,0 +1,202 @@
+"""
+Memory-mapped replay of large recorded drives.
+
+A recording is a binary file of fixed-width little-endian samples, produced offline
+from the CSV files by convert_recording.py:
+
+    header    magic: 8 bytes (b"RVREC\\x00\\x00\\x01"), record size: u32, sample count: u64
+    sample    timestamp: i64 (microseconds since 1970-01-01 of the wall clock),
+              x, y, z: i32, latitude, longitude: f64,
+              parking empty_count: i32, parking latitude, parking longitude: f64
+
+The file is mapped rather than read, so memory stays constant whatever its length.
+Any sample is found by its index in O(1), and any number of datasources can share
+one mapping.
+"""
+import csv
+import mmap
+import struct
+from datetime import datetime, timedelta
+from typing import BinaryIO, Iterator
+
+from domain.accelerometer import Accelerometer
+from domain.aggregated_data import AggregatedData
+from domain.gps import Gps
+from domain.parking import Parking
+from replay_clock import parse_timestamp
+import config
+
+MAGIC = b"RVREC\x00\x00\x01"
+HEADER = struct.Struct("<8sIQ")
+SAMPLE = struct.Struct("<q3i2di2d")
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class Recording:
+    """Read-only memory mapping of a recording file."""
+
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+        self._file = open(filename, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise RuntimeError(f"Recording {filename} is empty")
+        if len(self._map) < HEADER.size:
+            self.close()
+            raise RuntimeError(f"Recording {filename} is empty or truncated")
+        magic, record_size, count = HEADER.unpack_from(self._map)
+        if magic != MAGIC or record_size != SAMPLE.size:
+            self.close()
+            raise RuntimeError(f"{filename} is not a recording in a supported format")
+        if count == 0 or len(self._map) < HEADER.size + count * SAMPLE.size:
+            self.close()
+            raise RuntimeError(f"Recording {filename} is empty or truncated")
+        self.count = count
+        if hasattr(mmap, 'MADV_SEQUENTIAL'):
+            # Samples are mostly replayed in order, so let the kernel read ahead
+            self._map.madvise(mmap.MADV_SEQUENTIAL)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def sample(self, index: int) -> tuple:
+        """Fields of the sample at `index`, in the order of SAMPLE."""
+        return SAMPLE.unpack_from(self._map, HEADER.size + index * SAMPLE.size)
+
+    def close(self):
+        if getattr(self, '_map', None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+
+class RecordingDatasource:
+    """Replays a shared Recording from sample `offset`, wrapping around at its end."""
+
+    def __init__(self, recording: Recording, user_id: int = config.USER_ID, offset: int = 0) -> None:
+        self.recording = recording
+        self.user_id = user_id
+        self.offset = offset
+        self._index = offset % len(recording)
+        self._recorded_timestamp: datetime | None = None
+        self.is_reading: bool = False
+
+    def start_reading(self, *args, **kwargs):
+        self.seek(self.offset)
+        self.is_reading = True
+
+    def seek(self, index: int):
+        """Continue reading from sample `index` of the recording."""
+        self._index = index % len(self.recording)
+
+    def tell(self) -> int:
+        return self._index
+
+    def read(self) -> dict[str, Parking | AggregatedData]:
+        if not self.is_reading:
+            raise RuntimeError('RecordingDatasource.start_reading() must be called before reading')
+
+        microseconds, x, y, z, latitude, longitude, empty_count, parking_latitude, parking_longitude = (
+            self.recording.sample(self._index)
+        )
+        self._recorded_timestamp = _EPOCH + timedelta(microseconds=microseconds)
+        self._index = (self._index + 1) % len(self.recording)
+
+        return {
+            'aggregated': AggregatedData(
+                user_id=self.user_id,
+                accelerometer=Accelerometer(x=x, y=y, z=z),
+                gps=Gps(longitude=longitude, latitude=latitude),
+                timestamp=datetime.now(),
+            ),
+            'parking': Parking(
+                empty_count=empty_count,
+                gps=Gps(longitude=parking_longitude, latitude=parking_latitude),
+            ),
+        }
+
+    def recorded_timestamp(self) -> datetime | None:
+        """When the sample last returned by read() was recorded."""
+        return self._recorded_timestamp
+
+    def stop_reading(self, *args, **kwargs):
+        # The mapping is shared with other datasources, its owner closes it
+        self.is_reading = False
+
+
+def _cycle_rows(filename: str) -> Iterator[dict]:
+    """Rows of a CSV file, starting over at its end like FileDatasource does."""
+    while True:
+        found = False
+        with open(filename, newline='') as file:
+            for row in csv.DictReader(file):
+                found = True
+                yield row
+        if not found:
+            raise RuntimeError(f"No data found in {filename}")
+
+
+def _single_pass(filename: str) -> Iterator[dict]:
+    with open(filename, newline='') as file:
+        yield from csv.DictReader(file)
+
+
+def write_recording(
+    output: BinaryIO,
+    accelerometer_filename: str,
+    gps_filename: str,
+    parking_filename: str,
+    sample_rate: float,
+    start: datetime,
+    samples: int = 0,
+) -> int:
+    """
+    Write the CSV files to `output` as a recording, streaming them row by row.
+
+    Samples pair the rows of the three files in lock-step, like FileDatasource, with
+    the shorter files starting over. One sample is written per accelerometer row and
+    timestamped from its "timestamp" column, or `sample_rate` per second from `start`
+    without one. When `samples` is given, that many samples are written, cycling the
+    accelerometer file too, and timestamps are always generated from `start`.
+    Returns the number of samples written.
+    """
+    output.write(HEADER.pack(MAGIC, SAMPLE.size, 0))
+    gps_rows = _cycle_rows(gps_filename)
+    parking_rows = _cycle_rows(parking_filename)
+    if samples:
+        accelerometer_rows = _cycle_rows(accelerometer_filename)
+    else:
+        accelerometer_rows = _single_pass(accelerometer_filename)
+    step = timedelta(seconds=1 / sample_rate)
+
+    count = 0
+    for acc_row in accelerometer_rows:
+        if samples and count >= samples:
+            break
+        gps_row = next(gps_rows)
+        park_row = next(parking_rows)
+        if not samples and acc_row.get('timestamp'):
+            timestamp = parse_timestamp(acc_row['timestamp'])
+        else:
+            timestamp = start + count * step
+        output.write(SAMPLE.pack(
+            (timestamp - _EPOCH) // timedelta(microseconds=1),
+            int(acc_row['x']),
+            int(acc_row['y']),
+            int(acc_row['z']),
+            float(gps_row['latitude']),
+            float(gps_row['longitude']),
+            int(park_row['empty_count']),
+            float(park_row['latitude']),
+            float(park_row['longitude']),
+        ))
+        count += 1
+
+    # The count is known only at the end, so the header is written again
+    output.seek(0)
+    output.write(HEADER.pack(MAGIC, SAMPLE.size, count))
+    output.seek(0, 2)
+    return count
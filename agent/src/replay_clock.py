@@ -0,0 +1,66 @@
+import time
+from datetime import datetime, timedelta
+
+
+class ReplayClock:
+    """
+    Timestamps samples and paces their replay.
+
+    Samples keep the timestamps they were recorded with, or are spaced 1 / sample_rate
+    seconds apart from `start` (now by default) when the datasource has none. Each
+    sample is due when its distance from the first sample, divided by `speed`, has
+    elapsed, so 1 replays in real time, 10 ten times faster and 0 as fast as possible.
+    Due times are measured from the first sample rather than the previous one, so time
+    spent publishing does not accumulate into drift.
+    """
+
+    def __init__(self, speed: float = 1.0, sample_rate: float = 1.0, start: datetime | None = None) -> None:
+        self.speed = speed
+        self.step = timedelta(seconds=1 / sample_rate)
+        self.start = start
+        self._next_generated: datetime | None = None
+        self._previous: datetime | None = None
+        self._last_step = self.step
+        # Added to recorded timestamps once the recording has started over
+        self._lap_shift = timedelta(0)
+        self._origin: tuple[datetime, float] | None = None
+
+    def timestamp(self, recorded: datetime | None = None) -> datetime:
+        """Timestamp of the next sample, given the one it was recorded with if any."""
+        if recorded is None:
+            if self._next_generated is None:
+                self._next_generated = self.start or datetime.now()
+            timestamp = self._next_generated
+            self._next_generated += self.step
+        else:
+            timestamp = recorded + self._lap_shift
+            if self._previous is not None and timestamp < self._previous:
+                # The datasource wrapped around: continue the timeline one step after the last sample
+                self._lap_shift += self._previous - timestamp + self._last_step
+                timestamp = recorded + self._lap_shift
+
+        if self._previous is not None and timestamp > self._previous:
+            self._last_step = timestamp - self._previous
+        self._previous = timestamp
+        return timestamp
+
+    def wait(self, timestamp: datetime):
+        """Sleep until the sample with `timestamp` is due."""
+        if not self.speed:
+            return
+        now = time.monotonic()
+        if self._origin is None:
+            self._origin = (timestamp, now)
+            return
+        first_timestamp, first_time = self._origin
+        due = first_time + (timestamp - first_timestamp).total_seconds() / self.speed
+        if due > now:
+            time.sleep(due - now)
+
+
+def parse_timestamp(value: str) -> datetime:
+    """Timestamp column value: ISO 8601 or Unix time in seconds. Aware timestamps keep their wall clock."""
+    try:
+        return datetime.fromtimestamp(float(value))
+    except ValueError:
+        return datetime.fromisoformat(value).replace(tzinfo=None)
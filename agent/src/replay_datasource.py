@@ -0,0 +1,194 @@
+"""
+Preloaded replay of the CSV recordings.
+
+ReplayTable parses every CSV once into typed columns. Any number of ReplayDatasources
+then cycle through the shared table by index, without opening files or parsing rows.
+Besides the `read` contract of FileDatasource, a replay datasource hands out ready
+aggregated data messages in bulk. They are assembled from per-row fragments
+serialized once, so only the user id and the timestamp are encoded per message.
+"""
+import csv
+import json
+from array import array
+from datetime import datetime, timedelta
+
+from domain.accelerometer import Accelerometer
+from domain.aggregated_data import AggregatedData
+from domain.gps import Gps
+from domain.parking import Parking
+from replay_clock import parse_timestamp
+from schema.wire_format import (
+    ACCELEROMETER_FIELDS,
+    GPS_FIELDS,
+    HEADER,
+    KIND_AGENT_DATA,
+    TIMESTAMP_FIELDS,
+    USER_ID_FIELD,
+    WIRE_FORMAT_VERSION,
+    timestamp_fields,
+)
+import config
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _read_columns(filename: str) -> dict[str, list[str]]:
+    with open(filename, newline='') as file:
+        reader = csv.reader(file)
+        header = next(reader)
+        columns = [[] for _ in header]
+        for row in reader:
+            for column, value in zip(columns, row):
+                column.append(value)
+    if not columns or not columns[0]:
+        raise RuntimeError(f"No data found in {filename}")
+    return dict(zip(header, columns))
+
+
+class ReplayTable:
+    """CSV recordings loaded once into compact typed columns."""
+
+    def __init__(self, accelerometer_filename: str, gps_filename: str, parking_filename: str) -> None:
+        accelerometer = _read_columns(accelerometer_filename)
+        self.x = array('i', map(int, accelerometer['x']))
+        self.y = array('i', map(int, accelerometer['y']))
+        self.z = array('i', map(int, accelerometer['z']))
+        # Microseconds since 1970-01-01 of the wall clock, for recordings with a timestamp column
+        self.timestamp = None
+        if 'timestamp' in accelerometer:
+            self.timestamp = array('q', (
+                (parse_timestamp(value) - _EPOCH) // timedelta(microseconds=1)
+                for value in accelerometer['timestamp']
+            ))
+
+        gps = _read_columns(gps_filename)
+        self.longitude = array('d', map(float, gps['longitude']))
+        self.latitude = array('d', map(float, gps['latitude']))
+
+        parking = _read_columns(parking_filename)
+        self.parking_empty_count = array('i', map(int, parking['empty_count']))
+        self.parking_longitude = array('d', map(float, parking['longitude']))
+        self.parking_latitude = array('d', map(float, parking['latitude']))
+
+        self._fragments: dict[str, tuple[list[bytes], list[bytes]]] = {}
+
+    @property
+    def accelerometer_rows(self) -> int:
+        return len(self.x)
+
+    @property
+    def gps_rows(self) -> int:
+        return len(self.longitude)
+
+    @property
+    def parking_rows(self) -> int:
+        return len(self.parking_empty_count)
+
+    def fragments(self, wire_format: str) -> tuple[list[bytes], list[bytes]]:
+        """Accelerometer and GPS parts of a message in the wire format, serialized once per row."""
+        if wire_format not in self._fragments:
+            if wire_format == 'binary':
+                accelerometer = [ACCELEROMETER_FIELDS.pack(*row) for row in zip(self.x, self.y, self.z)]
+                gps = [GPS_FIELDS.pack(*row) for row in zip(self.latitude, self.longitude)]
+            else:
+                # Same layout as AggregatedDataSchema.dumps
+                accelerometer = [
+                    f', "accelerometer": {json.dumps({"x": x, "y": y, "z": z})}, "gps": '.encode()
+                    for x, y, z in zip(self.x, self.y, self.z)
+                ]
+                gps = [
+                    json.dumps({"longitude": longitude, "latitude": latitude}).encode()
+                    for longitude, latitude in zip(self.longitude, self.latitude)
+                ]
+            self._fragments[wire_format] = (accelerometer, gps)
+        return self._fragments[wire_format]
+
+
+class ReplayDatasource:
+    """Cycles through a shared ReplayTable, starting `offset` rows into every recording."""
+
+    def __init__(self, table: ReplayTable, user_id: int = config.USER_ID, offset: int = 0) -> None:
+        self.table = table
+        self.user_id = user_id
+        self.offset = offset
+        self._index = offset
+        self._last_accelerometer_index: int | None = None
+        self.is_reading: bool = False
+
+    def start_reading(self, *args, **kwargs):
+        self._index = self.offset
+        self.is_reading = True
+
+    def read(self) -> dict[str, Parking | AggregatedData]:
+        if not self.is_reading:
+            raise RuntimeError('ReplayDatasource.start_reading() must be called before reading')
+
+        table = self.table
+        index = self._index
+        self._index += 1
+        acc_index = index % table.accelerometer_rows
+        self._last_accelerometer_index = acc_index
+        gps_index = index % table.gps_rows
+        park_index = index % table.parking_rows
+
+        return {
+            'aggregated': AggregatedData(
+                user_id=self.user_id,
+                accelerometer=Accelerometer(x=table.x[acc_index], y=table.y[acc_index], z=table.z[acc_index]),
+                gps=Gps(longitude=table.longitude[gps_index], latitude=table.latitude[gps_index]),
+                timestamp=datetime.now(),
+            ),
+            'parking': Parking(
+                empty_count=table.parking_empty_count[park_index],
+                gps=Gps(
+                    longitude=table.parking_longitude[park_index],
+                    latitude=table.parking_latitude[park_index],
+                ),
+            ),
+        }
+
+    def read_payloads(
+        self,
+        count: int,
+        wire_format: str = 'json',
+        timestamp: datetime | None = None,
+        interval: timedelta = timedelta(0),
+    ) -> list[bytes]:
+        """
+        Next `count` samples as aggregated data messages in the wire format. The first
+        is stamped with `timestamp` (now by default), every next one `interval` later.
+        Parking data is skipped.
+        """
+        if not self.is_reading:
+            raise RuntimeError('ReplayDatasource.start_reading() must be called before reading')
+
+        timestamp = timestamp or datetime.now()
+        accelerometer, gps = self.table.fragments(wire_format)
+        acc_rows = len(accelerometer)
+        gps_rows = len(gps)
+        # One timestamp is encoded once and shared when the samples are not spread out
+        timestamps = [timestamp + sample * interval for sample in range(count)] if interval else [timestamp]
+        if wire_format == 'binary':
+            prefix = HEADER.pack(WIRE_FORMAT_VERSION, KIND_AGENT_DATA, 1) + USER_ID_FIELD.pack(self.user_id)
+            suffixes = [TIMESTAMP_FIELDS.pack(*timestamp_fields(value)) for value in timestamps]
+        else:
+            prefix = f'{{"user_id": {self.user_id}'.encode()
+            suffixes = [f', "timestamp": "{value.isoformat()}"}}'.encode() for value in timestamps]
+        if not interval:
+            suffixes *= count
+
+        start = self._index
+        self._index += count
+        return [
+            b''.join((prefix, accelerometer[index % acc_rows], gps[index % gps_rows], suffix))
+            for index, suffix in zip(range(start, start + count), suffixes)
+        ]
+
+    def recorded_timestamp(self) -> datetime | None:
+        """When the sample last returned by read() was recorded, if the recording says so."""
+        if self.table.timestamp is None or self._last_accelerometer_index is None:
+            return None
+        return _EPOCH + timedelta(microseconds=self.table.timestamp[self._last_accelerometer_index])
+
+    def stop_reading(self, *args, **kwargs):
+        self.is_reading = False
@@ -0,0 +1,54 @@
+"""
+Compact binary encoding of aggregated agent data, an alternative to AggregatedDataSchema.
+
+A message is a 6-byte header followed by fixed-width little-endian records:
+
+    header        version: u8 (1), kind: u8 (1 for agent data), count: u32
+    agent data    user_id: i32, x, y, z, latitude, longitude: f64,
+                  timestamp: i64 (microseconds since 1970-01-01 of the wall clock),
+                  utc_offset: i16 (minutes, -32768 for naive timestamps)
+
+The edge tells it from JSON by the first byte, which JSON never starts with.
+"""
+import struct
+from datetime import datetime, timedelta
+
+from domain.aggregated_data import AggregatedData
+
+WIRE_FORMAT_VERSION = 1
+KIND_AGENT_DATA = 1
+
+HEADER = struct.Struct("<BBI")
+AGENT_DATA_RECORD = struct.Struct("<i5dqh")
+# Consecutive pieces of an agent data record, for callers that pre-pack the parts that do not change
+USER_ID_FIELD = struct.Struct("<i")
+ACCELEROMETER_FIELDS = struct.Struct("<3d")
+GPS_FIELDS = struct.Struct("<2d")
+TIMESTAMP_FIELDS = struct.Struct("<qh")
+
+_EPOCH = datetime(1970, 1, 1)
+_NAIVE = -32768
+
+
+def timestamp_fields(timestamp: datetime) -> tuple[int, int]:
+    offset = timestamp.utcoffset()
+    return (
+        (timestamp.replace(tzinfo=None) - _EPOCH) // timedelta(microseconds=1),
+        _NAIVE if offset is None else offset // timedelta(minutes=1),
+    )
+
+
+def encode_record(data: AggregatedData) -> bytes:
+    return AGENT_DATA_RECORD.pack(
+        data.user_id,
+        data.accelerometer.x,
+        data.accelerometer.y,
+        data.accelerometer.z,
+        data.gps.latitude,
+        data.gps.longitude,
+        *timestamp_fields(data.timestamp),
+    )
+
+
+def encode_aggregated_data(*items: AggregatedData) -> bytes:
+    return HEADER.pack(WIRE_FORMAT_VERSION, KIND_AGENT_DATA, len(items)) + b"".join(map(encode_record, items))
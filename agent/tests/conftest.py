@@ -0,0 +1,8 @@
+"""The agent runs from src/ with flat imports, so the tests import its modules the same way."""
+import sys
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+DATA = SRC / "data"
+
+sys.path.insert(0, str(SRC))
@@ -0,0 +1,49 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import config
+from conftest import DATA
+from file_datasource import FileDatasource
+from fleet import _burst_messages
+from replay_datasource import ReplayDatasource, ReplayTable
+from schema.aggregated_data_schema import AggregatedDataSchema
+
+FILENAMES = [str(DATA / name) for name in ("accelerometer.csv", "gps.csv", "parking.csv")]
+STARTED_AT = datetime(2024, 1, 1, 12)
+
+
+def _file_fleet(size):
+    return [FileDatasource(*FILENAMES, user_id=index + 1, offset=index * 10) for index in range(size)]
+
+
+def _replay_fleet(size):
+    table = ReplayTable(*FILENAMES)
+    return [ReplayDatasource(table, user_id=index + 1, offset=index * 10) for index in range(size)]
+
+
+def _samples(messages):
+    samples = []
+    for message in messages:
+        document = json.loads(message)
+        samples.extend(document if isinstance(document, list) else [document])
+    return samples
+
+
+@pytest.mark.parametrize("create_fleet", [_file_fleet, _replay_fleet])
+def test_every_sample_is_stamped_on_the_fleet_schedule(create_fleet, monkeypatch):
+    monkeypatch.setattr(config, "WIRE_FORMAT", "json")
+    datasources = create_fleet(2)
+    for datasource in datasources:
+        datasource.start_reading()
+
+    # Ticks 0.5 s apart, so each vehicle publishes 4 samples every second
+    messages = _burst_messages(datasources, 0, 6, AggregatedDataSchema(), 4, STARTED_AT, 0.5)
+
+    samples = _samples(messages)
+    for user_id, first_tick in ((1, 0), (2, 1)):
+        timestamps = [datetime.fromisoformat(s["timestamp"]) for s in samples if s["user_id"] == user_id]
+        first = STARTED_AT + timedelta(seconds=first_tick * 0.5)
+        assert timestamps == [first + index * timedelta(seconds=0.25) for index in range(12)]
+
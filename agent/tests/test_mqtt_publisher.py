@@ -0,0 +1,142 @@
+import json
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+
+import pytest
+from paho.mqtt import client as mqtt_client
+
+from domain.accelerometer import Accelerometer
+from domain.aggregated_data import AggregatedData
+from domain.gps import Gps
+from mqtt_publisher import MqttPublisher, batch_messages
+from schema.aggregated_data_schema import AggregatedDataSchema
+from schema.wire_format import encode_aggregated_data
+
+
+@dataclass
+class FakeMessageInfo:
+    rc: int
+    mid: int
+
+
+class FakeClient:
+    """Paho client stand-in that acknowledges messages only when told to."""
+
+    def __init__(self, rc=mqtt_client.MQTT_ERR_SUCCESS, ack_at_once=False):
+        self.rc = rc
+        self.ack_at_once = ack_at_once
+        self.max_inflight = None
+        self.published = []
+        self.on_publish = None
+        self.on_disconnect = None
+
+    def max_inflight_messages_set(self, inflight):
+        self.max_inflight = inflight
+
+    def publish(self, topic, payload, qos=0):
+        mid = len(self.published) + 1
+        self.published.append((topic, payload, qos))
+        if self.ack_at_once:
+            # The network thread may acknowledge before publish() returns
+            self.on_publish(self, None, mid)
+        return FakeMessageInfo(self.rc, mid)
+
+    def ack(self, mid):
+        self.on_publish(self, None, mid)
+
+
+def _sample(user_id: int) -> AggregatedData:
+    return AggregatedData(
+        user_id=user_id,
+        accelerometer=Accelerometer(x=1, y=2, z=16500),
+        gps=Gps(longitude=30.52, latitude=50.45),
+        timestamp=datetime(2024, 1, 1, 12),
+    )
+
+
+def test_binary_batch_holds_the_records_of_every_message():
+    samples = [_sample(user_id) for user_id in range(3)]
+
+    batch = batch_messages([encode_aggregated_data(sample) for sample in samples], "binary")
+
+    assert batch == encode_aggregated_data(*samples)
+
+
+@pytest.mark.parametrize("encode", [str, str.encode])
+def test_json_batch_is_an_array(encode):
+    schema = AggregatedDataSchema()
+    documents = [schema.dumps(_sample(user_id)) for user_id in range(3)]
+
+    batch = batch_messages([encode(document) for document in documents], "json")
+
+    assert json.loads(batch) == [json.loads(document) for document in documents]
+    assert batch_messages(documents[:1], "json") == documents[0]
+
+
+def test_publish_waits_while_the_window_is_full():
+    client = FakeClient()
+    publisher = MqttPublisher(client, qos=1, window=2)
+    assert client.max_inflight == 2
+    publisher.publish("topic", b"1")
+    publisher.publish("topic", b"2")
+
+    third = threading.Thread(target=publisher.publish, args=("topic", b"3"))
+    third.start()
+    third.join(0.2)
+    assert third.is_alive()
+    assert len(client.published) == 2
+
+    client.ack(1)
+    third.join(5)
+    assert not third.is_alive()
+    assert len(client.published) == 3
+    assert not publisher.flush(timeout=0.05)
+
+    client.ack(2)
+    client.ack(3)
+    assert publisher.flush(timeout=5)
+    assert publisher.ack_stats.count == 3
+
+
+def test_acknowledgement_before_publish_returns_is_counted():
+    publisher = MqttPublisher(FakeClient(ack_at_once=True), window=1)
+
+    for _ in range(3):
+        assert publisher.publish("topic", b"payload")
+
+    assert publisher.flush(timeout=5)
+    assert publisher.take_ack_stats().count == 3
+    assert publisher.take_ack_stats().count == 0
+
+
+def test_failed_publish_frees_its_slot():
+    publisher = MqttPublisher(FakeClient(rc=mqtt_client.MQTT_ERR_QUEUE_SIZE), window=1)
+
+    assert not publisher.publish("topic", b"1")
+    assert not publisher.publish("topic", b"2")
+    assert publisher.failed == 2
+    assert publisher.flush(timeout=0)
+
+
+def test_qos1_messages_without_connection_stay_in_flight():
+    client = FakeClient(rc=mqtt_client.MQTT_ERR_NO_CONN)
+    publisher = MqttPublisher(client, qos=1, window=2)
+
+    assert publisher.publish("topic", b"1")
+    assert not publisher.flush(timeout=0.05)
+
+    client.ack(1)
+    assert publisher.flush(timeout=5)
+
+
+def test_disconnect_drops_unwritten_qos0_messages():
+    client = FakeClient()
+    publisher = MqttPublisher(client, qos=0, window=2)
+    publisher.publish("topic", b"1")
+    publisher.publish("topic", b"2")
+
+    client.on_disconnect(client, None, 1)
+
+    assert publisher.lost == 2
+    assert publisher.flush(timeout=0)
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import DATA
+from recording_datasource import HEADER, MAGIC, Recording, RecordingDatasource, write_recording
+from replay_datasource import ReplayDatasource, ReplayTable
+
+FILENAMES = [str(DATA / name) for name in ("accelerometer.csv", "gps.csv", "parking.csv")]
+START = datetime(2024, 1, 1, 12)
+
+
+def _write(path, **kwargs) -> int:
+    with open(path, "wb") as output:
+        return write_recording(output, *FILENAMES, sample_rate=kwargs.pop("sample_rate", 10), start=START, **kwargs)
+
+
+def _fields(sample: dict) -> tuple:
+    aggregated, parking = sample["aggregated"], sample["parking"]
+    return aggregated.user_id, aggregated.accelerometer, aggregated.gps, parking
+
+
+@pytest.mark.parametrize("samples", [0, 1000])
+def test_recording_replays_like_the_csv_files(tmp_path, samples):
+    path = tmp_path / "recording.bin"
+    count = _write(path, samples=samples)
+    table = ReplayTable(*FILENAMES)
+    assert count == (samples or table.accelerometer_rows)
+
+    recording = Recording(str(path))
+    try:
+        datasource = RecordingDatasource(recording, user_id=3, offset=5)
+        replay = ReplayDatasource(table, user_id=3, offset=5)
+        datasource.start_reading()
+        replay.start_reading()
+        for index in range(5, count):
+            assert _fields(datasource.read()) == _fields(replay.read())
+            assert datasource.recorded_timestamp() == START + index * timedelta(seconds=0.1)
+
+        # Whole samples start over at the end of the recording
+        datasource.seek(0)
+        first = _fields(datasource.read())
+        datasource.seek(count - 1)
+        datasource.read()
+        assert _fields(datasource.read()) == first
+        assert datasource.recorded_timestamp() == START
+    finally:
+        recording.close()
+
+
+def test_truncated_recording_is_rejected(tmp_path):
+    path = tmp_path / "recording.bin"
+    _write(path, samples=10)
+    path.write_bytes(path.read_bytes()[:HEADER.size + 5])
+
+    with pytest.raises(RuntimeError, match="truncated"):
+        Recording(str(path))
+
+
+def test_empty_recording_is_rejected(tmp_path):
+    path = tmp_path / "recording.bin"
+    path.write_bytes(b"")
+
+    with pytest.raises(RuntimeError, match="empty"):
+        Recording(str(path))
+
+
+def test_recording_shorter_than_its_header_is_rejected(tmp_path):
+    path = tmp_path / "recording.bin"
+    path.write_bytes(MAGIC[:5])
+
+    with pytest.raises(RuntimeError, match="truncated"):
+        Recording(str(path))
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import replay_clock
+from replay_clock import ReplayClock, parse_timestamp
+
+START = datetime(2024, 1, 1, 12)
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def fake_time(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(replay_clock, "time", fake)
+    return fake
+
+
+def test_generated_timestamps_follow_the_sample_rate():
+    clock = ReplayClock(sample_rate=4, start=START)
+
+    assert [clock.timestamp() for _ in range(3)] == [START + timedelta(seconds=0.25 * i) for i in range(3)]
+
+
+def test_recorded_timestamps_are_kept_and_continue_after_a_wrap():
+    clock = ReplayClock()
+    recorded = [START, START + timedelta(seconds=2), START + timedelta(seconds=3)]
+
+    timestamps = [clock.timestamp(value) for value in recorded + recorded]
+
+    # The second lap starts one step (the last gap, 1 s) after the end of the first
+    assert timestamps == recorded + [value + timedelta(seconds=4) for value in recorded]
+
+
+@pytest.mark.parametrize("speed, expected", [(1, [2.0, 1.0]), (2, [0.75, 0.5])])
+def test_samples_are_due_at_their_distance_from_the_first(fake_time, speed, expected):
+    clock = ReplayClock(speed=speed)
+
+    clock.wait(START)
+    # Time spent publishing is taken out of the next wait rather than added to the schedule
+    fake_time.now += 0.5
+    clock.wait(START + timedelta(seconds=2.5))
+    clock.wait(START + timedelta(seconds=3.5))
+
+    assert fake_time.sleeps == pytest.approx(expected)
+
+
+def test_late_samples_are_not_delayed(fake_time):
+    clock = ReplayClock(speed=1)
+
+    clock.wait(START)
+    fake_time.now += 5
+    clock.wait(START + timedelta(seconds=1))
+
+    assert fake_time.sleeps == []
+
+
+def test_speed_zero_never_sleeps(fake_time):
+    clock = ReplayClock(speed=0)
+
+    for seconds in range(3):
+        clock.wait(START + timedelta(seconds=seconds * 60))
+
+    assert fake_time.sleeps == []
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2024-01-01T12:00:00.250000", datetime(2024, 1, 1, 12, 0, 0, 250000)),
+    ("2024-01-01T12:00:00+03:00", datetime(2024, 1, 1, 12)),
+    ("1704110400.5", datetime.fromtimestamp(1704110400.5)),
+])
+def test_parse_timestamp(value, expected):
+    assert parse_timestamp(value) == expected
@@ -0,0 +1,64 @@
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from conftest import DATA
+from replay_datasource import ReplayDatasource, ReplayTable
+from schema.aggregated_data_schema import AggregatedDataSchema
+from schema.wire_format import encode_aggregated_data
+
+FILENAMES = [str(DATA / name) for name in ("accelerometer.csv", "gps.csv", "parking.csv")]
+
+
+@pytest.fixture(scope="module")
+def table():
+    return ReplayTable(*FILENAMES)
+
+
+def _expected(table, wire_format, count, timestamp, interval=timedelta(0), user_id=7, offset=3):
+    datasource = ReplayDatasource(table, user_id=user_id, offset=offset)
+    datasource.start_reading()
+    schema = AggregatedDataSchema()
+    messages = []
+    for sample in range(count):
+        data = replace(datasource.read()["aggregated"], timestamp=timestamp + sample * interval)
+        messages.append(encode_aggregated_data(data) if wire_format == "binary" else schema.dumps(data).encode())
+    return messages
+
+
+def _payloads(table, wire_format, count, timestamp, interval=timedelta(0), user_id=7, offset=3):
+    datasource = ReplayDatasource(table, user_id=user_id, offset=offset)
+    datasource.start_reading()
+    return datasource.read_payloads(count, wire_format, timestamp, interval)
+
+
+@pytest.mark.parametrize("wire_format", ["json", "binary"])
+@pytest.mark.parametrize("timestamp", [
+    datetime(2024, 1, 1, 12, 0, 0, 123456),
+    datetime(2024, 1, 1, 12, tzinfo=timezone(timedelta(hours=3))),
+])
+def test_payloads_match_the_encoders(table, wire_format, timestamp):
+    # More samples than rows, so reading wraps around the shorter recordings
+    count = table.accelerometer_rows + 5
+
+    assert _payloads(table, wire_format, count, timestamp) == _expected(table, wire_format, count, timestamp)
+
+
+@pytest.mark.parametrize("wire_format", ["json", "binary"])
+def test_spread_payloads_match_the_encoders(table, wire_format):
+    timestamp = datetime(2024, 1, 1, 12)
+    interval = timedelta(milliseconds=250)
+
+    assert _payloads(table, wire_format, 10, timestamp, interval) == _expected(
+        table, wire_format, 10, timestamp, interval
+    )
+
+
+def test_read_payloads_continues_where_read_stopped(table):
+    timestamp = datetime(2024, 1, 1, 12)
+    datasource = ReplayDatasource(table, user_id=7, offset=3)
+    datasource.start_reading()
+    datasource.read()
+
+    assert datasource.read_payloads(2, "json", timestamp) == _expected(table, "json", 3, timestamp)[1:]
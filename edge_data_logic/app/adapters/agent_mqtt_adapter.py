@@ -1,9 +1,10 @@
 import logging
 import paho.mqtt.client as mqtt
 from app.interfaces.agent_gateway import AgentGateway
-from app.entities.agent_data import AgentData, GpsData
 from app.usecases.data_processing import process_agent_data
 from app.interfaces.hub_gateway import HubGateway
+from app.adapters.agent_worker_pool import AgentWorkerPool
+from app.adapters.wire_format import decode_agent_data
 
 
 class AgentMQTTAdapter(AgentGateway):
@@ -14,6 +15,7 @@ class AgentMQTTAdapter(AgentGateway):
         topic,
         hub_gateway: HubGateway,
         batch_size=10,
+        workers=0,
     ):
         self.batch_size = batch_size
         # MQTT
@@ -23,6 +25,10 @@ class AgentMQTTAdapter(AgentGateway):
         self.client = mqtt.Client()
         # Hub
         self.hub_gateway = hub_gateway
+        # Worker processes; with no workers messages are processed on the MQTT thread
+        self.worker_pool = (
+            AgentWorkerPool(workers, hub_gateway, batch_size) if workers > 0 else None
+        )
 
     def on_connect(self, client, userdata, flags, rc):
         if rc == 0:
@@ -33,15 +39,17 @@ class AgentMQTTAdapter(AgentGateway):
 
     def on_message(self, client, userdata, msg):
         """Processing agent data and sent it to hub gateway"""
+        if self.worker_pool:
+            self.worker_pool.submit(msg.payload)
+            return
         try:
-            payload: str = msg.payload.decode("utf-8")
-            # Create AgentData instance with the received data
-            agent_data = AgentData.model_validate_json(payload, strict=True)
-            # Process the received data (you can call a use case here if needed)
-            processed_data = process_agent_data(agent_data)
-            # Store the agent_data in the database (you can send it to the data processing module)
-            if not self.hub_gateway.save_data(processed_data):
-                logging.error("Hub is not available")
+            # Create AgentData instances with the received data (binary or JSON)
+            for agent_data in decode_agent_data(msg.payload):
+                # Process the received data (you can call a use case here if needed)
+                processed_data = process_agent_data(agent_data)
+                # Store the agent_data in the database (you can send it to the data processing module)
+                if not self.hub_gateway.save_data(processed_data):
+                    logging.error("Hub is not available")
         except Exception as e:
             logging.info(f"Error processing MQTT message: {e}")
 
@@ -51,26 +59,30 @@ class AgentMQTTAdapter(AgentGateway):
         self.client.connect(self.broker_host, self.broker_port, 60)
 
     def start(self):
+        if self.worker_pool:
+            self.worker_pool.start()
         self.client.loop_start()
 
     def stop(self):
         self.client.loop_stop()
+        if self.worker_pool:
+            self.worker_pool.stop()
 
 
 # Usage example:
 if __name__ == "__main__":
+    from app.adapters.hub_mqtt_adapter import HubMqttAdapter
+    from app.runtime import wait_for_shutdown
+
     broker_host = "localhost"
     broker_port = 1883
     topic = "agent_data_topic"
-    # Assuming you have implemented the StoreGateway and passed it to the adapter
-    store_gateway = HubGateway()
-    adapter = AgentMQTTAdapter(broker_host, broker_port, topic, store_gateway)
+    hub_gateway = HubMqttAdapter(broker_host, broker_port, "processed_agent_data_topic")
+    adapter = AgentMQTTAdapter(broker_host, broker_port, topic, hub_gateway)
     adapter.connect()
     adapter.start()
-    try:
-        # Keep the adapter running in the background
-        while True:
-            pass
-    except KeyboardInterrupt:
-        adapter.stop()
-        logging.info("Adapter stopped.")
\ No newline at end of file
+    # Block until SIGINT/SIGTERM without burning CPU
+    wait_for_shutdown()
+    adapter.stop()
+    hub_gateway.stop()
+    logging.info("Adapter stopped.")
@@ -0,0 +1,192 @@
+import logging
+import multiprocessing
+import queue
+import re
+import signal
+import threading
+import time
+from typing import List, Optional
+
+from app.adapters.wire_format import decode_agent_data, first_user_id, is_binary
+from app.entities.agent_data import AgentData
+from app.interfaces.hub_gateway import HubGateway
+from app.usecases.data_processing import process_agent_data_batch
+
+USER_ID_PATTERN = re.compile(rb'"user_id"\s*:\s*(-?\d+)')
+
+
+def shard_of(payload: bytes, shards: int) -> int:
+    """Pick the worker for a raw payload by its user_id without parsing the whole message."""
+    if is_binary(payload):
+        user_id = first_user_id(payload)
+    else:
+        match = USER_ID_PATTERN.search(payload)
+        user_id = int(match.group(1)) if match else None
+    if user_id is None:
+        return 0
+    return user_id % shards
+
+
+def _worker_main(tasks, results, batch_size: int):
+    """
+    Worker process loop: parse and classify the payloads of one shard.
+
+    Drains up to `batch_size` queued payloads at a time and classifies them
+    with the batch path. Puts None to `results` once the stop sentinel arrives.
+    """
+    # Ctrl+C in a terminal reaches the whole process group. Workers leave it to the
+    # parent, which stops them through the sentinel after draining their queues.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    running = True
+    while running:
+        payloads = [tasks.get()]
+        while len(payloads) < batch_size:
+            try:
+                payloads.append(tasks.get_nowait())
+            except queue.Empty:
+                break
+
+        if None in payloads:
+            payloads = payloads[:payloads.index(None)]
+            running = False
+
+        agent_data_batch: List[AgentData] = []
+        for payload in payloads:
+            try:
+                agent_data_batch.extend(decode_agent_data(payload))
+            except Exception as e:
+                logging.info(f"Error processing MQTT message: {e}")
+
+        if agent_data_batch:
+            results.put(process_agent_data_batch(agent_data_batch))
+
+    results.put(None)
+
+
+class AgentWorkerPool:
+    """
+    Pool of processes that parse and classify raw agent payloads.
+
+    Payloads are sharded by user_id, so every agent is handled by one worker
+    and its messages keep their order. Processed data from all workers is
+    passed to the hub gateway by a single publisher thread, which also restarts
+    workers that died. A payload whose shard queue stays full for SUBMIT_TIMEOUT
+    seconds is dropped, so the MQTT network thread never blocks for long.
+    """
+
+    # Seconds between checks that workers are alive
+    POLL_INTERVAL = 0.5
+    # Seconds submit() waits for room in a full shard queue before dropping the payload
+    SUBMIT_TIMEOUT = 1.0
+
+    def __init__(self, workers: int, hub_gateway: HubGateway, batch_size: int, queue_size: int = 10000):
+        self.workers = workers
+        self.hub_gateway = hub_gateway
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.processed_count = 0
+        self.dropped_count = 0
+        self.restarted_count = 0
+        self._context = None
+        self._stopping = False
+        self._tasks = []
+        self._results = None
+        self._processes: List[multiprocessing.Process] = []
+        self._publisher: Optional[threading.Thread] = None
+
+    def start(self):
+        # Spawn instead of fork: the parent already runs the MQTT network thread
+        self._context = multiprocessing.get_context("spawn")
+        self._stopping = False
+        self._results = self._context.Queue()
+        self._tasks = []
+        self._processes = []
+        for _ in range(self.workers):
+            tasks, process = self._start_worker()
+            self._tasks.append(tasks)
+            self._processes.append(process)
+
+        self._publisher = threading.Thread(target=self._publish_results, daemon=True)
+        self._publisher.start()
+
+    def submit(self, payload: bytes):
+        """Enqueue a raw payload, waiting up to SUBMIT_TIMEOUT seconds while the shard queue is full."""
+        shard = shard_of(payload, self.workers)
+        try:
+            self._tasks[shard].put(payload, timeout=self.SUBMIT_TIMEOUT)
+        except queue.Full:
+            self.dropped_count += 1
+            logging.error(f"Worker queue {shard} is full, dropping the payload")
+
+    def _start_worker(self):
+        tasks = self._context.Queue(maxsize=self.queue_size)
+        process = self._context.Process(
+            target=_worker_main, args=(tasks, self._results, self.batch_size), daemon=True
+        )
+        process.start()
+        return tasks, process
+
+    def _restart_dead_workers(self):
+        for shard, process in enumerate(self._processes):
+            if process.is_alive() or self._stopping:
+                continue
+            # The dead worker may have held the lock of its queue, so the shard gets a new one
+            old_tasks = self._tasks[shard]
+            self._tasks[shard], self._processes[shard] = self._start_worker()
+            old_tasks.cancel_join_thread()
+            old_tasks.close()
+            self.restarted_count += 1
+            logging.error(
+                f"Worker {process.pid} exited with code {process.exitcode}, restarted it, "
+                f"payloads queued for it are lost"
+            )
+
+    def stop(self, timeout: float = 10.0):
+        """
+        Let the workers finish queued payloads and wait until all results are published.
+        Workers still running after `timeout` seconds are terminated.
+        """
+        deadline = time.monotonic() + timeout
+        self._stopping = True
+        for tasks, process in zip(self._tasks, self._processes):
+            if not process.is_alive():
+                continue
+            try:
+                tasks.put(None, timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                logging.error(f"Worker {process.pid} does not take payloads, terminating it")
+                process.terminate()
+        if self._publisher:
+            self._publisher.join(max(0.0, deadline - time.monotonic()))
+        for process in self._processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logging.error(f"Worker {process.pid} did not stop in {timeout}s, terminating it")
+                process.terminate()
+                process.join()
+        for tasks in self._tasks:
+            # Payloads left for stopped workers are dropped instead of blocking the exit
+            tasks.cancel_join_thread()
+        self._processes = []
+
+    def _publish_results(self):
+        finished = 0
+        next_check = time.monotonic() + self.POLL_INTERVAL
+        while finished < self.workers:
+            if time.monotonic() >= next_check:
+                next_check = time.monotonic() + self.POLL_INTERVAL
+                self._restart_dead_workers()
+                # A worker that died while stopping never sends its sentinel, so stop once none is left
+                if self._stopping and not any(process.is_alive() for process in self._processes):
+                    break
+            try:
+                batch = self._results.get(timeout=self.POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            if batch is None:
+                finished += 1
+                continue
+            for processed_data in batch:
+                if not self.hub_gateway.save_data(processed_data):
+                    logging.error("Hub is not available")
+            self.processed_count += len(batch)
@@ -26,4 +26,8 @@ class HubHttpAdapter(HubGateway):
                 f"Invalid Hub response\nData: {processed_data.model_dump_json()}\nResponse: {response}"
             )
             return False
-        return True
\ No newline at end of file
+        return True
+
+    def stop(self):
+        # Requests are sent synchronously, so there is nothing in flight
+        pass
@@ -1,18 +1,40 @@
 import logging
+import struct
+import threading
+import time
+from typing import List
 
 import requests as requests
 from paho.mqtt import client as mqtt_client
+from pydantic import TypeAdapter
 
+from app.adapters.wire_format import encode_processed_agent_data
 from app.entities.processed_agent_data import ProcessedAgentData
 from app.interfaces.hub_gateway import HubGateway
 
+PROCESSED_AGENT_DATA_LIST = TypeAdapter(List[ProcessedAgentData])
+
 
 class HubMqttAdapter(HubGateway):
-    def __init__(self, broker, port, topic):
+    def __init__(self, broker, port, topic, batch_size=1, batch_interval_ms=0, wire_format="json"):
         self.broker = broker
         self.port = port
         self.topic = topic
+        # "binary" publishes compact records, see app.adapters.wire_format
+        self.wire_format = wire_format
         self.mqtt_client = self._connect_mqtt(broker, port)
+        self._last_message_info = None
+        # Batching: publish once batch_size items are collected or the oldest is batch_interval_ms old
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval_ms / 1000
+        self._batch: List[ProcessedAgentData] = []
+        self._batch_started = 0.0
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._flusher = None
+        if batch_size > 1:
+            self._flusher = threading.Thread(target=self._flush_on_interval, daemon=True)
+            self._flusher.start()
 
     def save_data(self, processed_data: ProcessedAgentData):
         """
@@ -20,10 +42,72 @@ class HubMqttAdapter(HubGateway):
         Parameters:
             processed_data (ProcessedAgentData): Processed road data to be saved.
         Returns:
-            bool: True if the data is successfully saved, False otherwise.
+            bool: True if the data is successfully saved (or queued for the next batch), False otherwise.
         """
-        msg = processed_data.model_dump_json()
+        if self.batch_size <= 1:
+            return self._publish(self._encode([processed_data]))
+
+        with self._condition:
+            if not self._batch:
+                self._batch_started = time.monotonic()
+                self._condition.notify()
+            self._batch.append(processed_data)
+            if len(self._batch) < self.batch_size:
+                return True
+            return self._publish_batch()
+
+    def stop(self, timeout=5.0):
+        """Publish the pending batch, wait until queued messages are written to the broker and disconnect."""
+        with self._condition:
+            self._stopping = True
+            if self._batch:
+                self._publish_batch()
+            self._condition.notify()
+        if self._flusher:
+            self._flusher.join()
+
+        # Messages are sent in order, so the last one being published means all were
+        if self._last_message_info is not None:
+            try:
+                self._last_message_info.wait_for_publish(timeout)
+            except (RuntimeError, ValueError) as e:
+                logging.warning(f"Pending messages were not published: {e}")
+        self.mqtt_client.disconnect()
+        self.mqtt_client.loop_stop()
+
+    def _flush_on_interval(self):
+        with self._condition:
+            while not self._stopping:
+                if not self._batch:
+                    self._condition.wait()
+                    continue
+                remaining = self._batch_started + self.batch_interval - time.monotonic()
+                if remaining > 0:
+                    self._condition.wait(remaining)
+                    continue
+                self._publish_batch()
+
+    def _publish_batch(self):
+        """Publish collected items as one message. Must be called holding the condition lock."""
+        msg = self._encode(self._batch)
+        self._batch = []
+        return self._publish(msg)
+
+    def _encode(self, items: List[ProcessedAgentData]):
+        if self.wire_format == "binary":
+            try:
+                return encode_processed_agent_data(items)
+            except KeyError as e:
+                logging.warning(f"Road state {e} has no binary code, publishing JSON")
+            except (struct.error, OverflowError) as e:
+                logging.warning(f"Value out of range of the binary format ({e}), publishing JSON")
+        if len(items) == 1:
+            return items[0].model_dump_json()
+        return PROCESSED_AGENT_DATA_LIST.dump_json(items)
+
+    def _publish(self, msg):
         result = self.mqtt_client.publish(self.topic, msg)
+        self._last_message_info = result
         status = result[0]
         if status == 0:
             return True
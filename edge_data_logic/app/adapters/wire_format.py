@@ -0,0 +1,129 @@
+"""
+Compact binary wire format of agent and processed agent data, with JSON as fallback.
+
+A binary message is a 6-byte header followed by fixed-width little-endian records:
+
+    header            version: u8 (1), kind: u8, count: u32
+    agent data        user_id: i32, x, y, z, latitude, longitude: f64,
+                      timestamp: i64 (microseconds since 1970-01-01 of the wall clock),
+                      utc_offset: i16 (minutes, -32768 for naive timestamps)
+    processed data    road_state: u8 (index in ROAD_STATES), then an agent data record
+
+JSON documents start with "{", "[" or whitespace, which never equals the version
+byte, so consumers tell the formats apart by the first byte of a message.
+"""
+import struct
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Sequence
+
+from pydantic import TypeAdapter
+
+from app.entities.agent_data import AgentData
+from app.entities.processed_agent_data import ProcessedAgentData
+
+WIRE_FORMAT_VERSION = 1
+KIND_AGENT_DATA = 1
+KIND_PROCESSED_AGENT_DATA = 2
+ROAD_STATES = ("normal", "pothole", "bump")
+
+HEADER = struct.Struct("<BBI")
+AGENT_DATA_RECORD = struct.Struct("<i5dqh")
+PROCESSED_AGENT_DATA_RECORD = struct.Struct("<Bi5dqh")
+
+AGENT_DATA_LIST = TypeAdapter(List[AgentData])
+
+_EPOCH = datetime(1970, 1, 1)
+_NAIVE = -32768
+# Timestamps that datetime can represent, other values of the i64 field are rejected
+_MIN_MICROSECONDS = (datetime.min - _EPOCH) // timedelta(microseconds=1)
+_MAX_MICROSECONDS = (datetime.max - _EPOCH) // timedelta(microseconds=1)
+_ROAD_STATE_CODES = {road_state: code for code, road_state in enumerate(ROAD_STATES)}
+
+
+def is_binary(payload: bytes) -> bool:
+    return payload[:1] == bytes((WIRE_FORMAT_VERSION,))
+
+
+def _timestamp_fields(timestamp: datetime):
+    offset = timestamp.utcoffset()
+    wall_clock = timestamp.replace(tzinfo=None) - _EPOCH
+    offset_minutes = _NAIVE if offset is None else offset // timedelta(minutes=1)
+    return wall_clock // timedelta(microseconds=1), offset_minutes
+
+
+def _timestamp(microseconds: int, offset: int) -> datetime:
+    if not _MIN_MICROSECONDS <= microseconds <= _MAX_MICROSECONDS:
+        raise ValueError(f"Timestamp of {microseconds} microseconds is out of range")
+    timestamp = _EPOCH + timedelta(microseconds=microseconds)
+    if offset == _NAIVE:
+        return timestamp
+    return timestamp.replace(tzinfo=timezone(timedelta(minutes=offset)))
+
+
+def _agent_data_fields(agent_data: AgentData):
+    return (
+        agent_data.user_id,
+        agent_data.accelerometer.x,
+        agent_data.accelerometer.y,
+        agent_data.accelerometer.z,
+        agent_data.gps.latitude,
+        agent_data.gps.longitude,
+        *_timestamp_fields(agent_data.timestamp),
+    )
+
+
+def _agent_data(user_id, x, y, z, latitude, longitude, microseconds, offset) -> dict:
+    # Validating plain dicts in one call is cheaper than model_construct per nested model
+    return {
+        "user_id": user_id,
+        "accelerometer": {"x": x, "y": y, "z": z},
+        "gps": {"latitude": latitude, "longitude": longitude},
+        "timestamp": _timestamp(microseconds, offset),
+    }
+
+
+def _records(payload: bytes, kind: int, record: struct.Struct) -> bytes:
+    version, payload_kind, count = HEADER.unpack_from(payload)
+    if version != WIRE_FORMAT_VERSION or payload_kind != kind:
+        raise ValueError(f"Unsupported binary message version {version} kind {payload_kind}")
+    if len(payload) != HEADER.size + count * record.size:
+        raise ValueError(f"Binary message of {len(payload)} bytes does not hold {count} records")
+    return payload[HEADER.size:]
+
+
+def encode_agent_data(items: Sequence[AgentData]) -> bytes:
+    return HEADER.pack(WIRE_FORMAT_VERSION, KIND_AGENT_DATA, len(items)) + b"".join(
+        AGENT_DATA_RECORD.pack(*_agent_data_fields(item)) for item in items
+    )
+
+
+def decode_agent_data(payload: bytes) -> List[AgentData]:
+    """Agent data of a binary message, a JSON object or a JSON array."""
+    if not is_binary(payload):
+        if payload.lstrip().startswith(b"["):
+            return AGENT_DATA_LIST.validate_json(payload, strict=True)
+        return [AgentData.model_validate_json(payload, strict=True)]
+    records = _records(payload, KIND_AGENT_DATA, AGENT_DATA_RECORD)
+    return AGENT_DATA_LIST.validate_python(
+        [_agent_data(*fields) for fields in AGENT_DATA_RECORD.iter_unpack(records)]
+    )
+
+
+def encode_processed_agent_data(items: Sequence[ProcessedAgentData]) -> bytes:
+    """
+    Raises KeyError for a road state that has no binary code,
+    struct.error for a value out of the range of its field.
+    """
+    return HEADER.pack(WIRE_FORMAT_VERSION, KIND_PROCESSED_AGENT_DATA, len(items)) + b"".join(
+        PROCESSED_AGENT_DATA_RECORD.pack(
+            _ROAD_STATE_CODES[item.road_state], *_agent_data_fields(item.agent_data)
+        )
+        for item in items
+    )
+
+
+def first_user_id(payload: bytes) -> Optional[int]:
+    """User id of the first record of a binary agent data message."""
+    if len(payload) < HEADER.size + 4:
+        return None
+    return struct.unpack_from("<i", payload, HEADER.size)[0]
@@ -17,4 +17,11 @@ class HubGateway(ABC):
         Returns:
             bool: True if the data is successfully saved, False otherwise.
         """
-        pass
\ No newline at end of file
+        pass
+
+    @abstractmethod
+    def stop(self):
+        """
+        Method to flush data that is still being sent and release resources.
+        """
+        pass
@@ -0,0 +1,35 @@
+import logging
+import signal
+import threading
+import time
+
+
+def wait_for_shutdown():
+    """Block the calling (main) thread without using CPU until SIGINT or SIGTERM arrives."""
+    shutdown = threading.Event()
+
+    def request_shutdown(signum, frame):
+        logging.info(f"Received {signal.Signals(signum).name}, shutting down")
+        shutdown.set()
+
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, request_shutdown)
+    shutdown.wait()
+
+
+class CpuUsageMeter:
+    """Measures the CPU time the process burns relative to the wall-clock time since creation."""
+
+    def __init__(self):
+        self._wall_started = time.monotonic()
+        self._cpu_started = time.process_time()
+
+    def usage(self) -> float:
+        """CPU usage in percent of one core."""
+        wall = time.monotonic() - self._wall_started
+        cpu = time.process_time() - self._cpu_started
+        return 100 * cpu / wall if wall > 0 else 0.0
+
+    def summary(self) -> str:
+        wall = time.monotonic() - self._wall_started
+        return f"CPU usage {self.usage():.1f}% of one core over {wall:.0f}s"
@@ -1,26 +1,25 @@
-from typing import List
+from typing import Dict, List
+
+import numpy as np
+
 from app.entities.agent_data import AgentData
 from app.entities.processed_agent_data import ProcessedAgentData
+from app.usecases.detector_state import DetectorState, DetectorStateRegistry
 
-ACCEL_HISTORY: List[float] = []
-MAX_HISTORY_LENGTH = 10
 EMA_ALPHA = 0.3  # smoothing factor: closer to 1 — less smoothed
 
 # Thresholds to detect potholes and bumps based on z-axis acceleration changes
 POTHOLE_DROP_THRESHOLD = -15.0  # strong drop in Z value
 BUMP_PEAK_THRESHOLD = 15.0      # strong rise in Z value
 
+# Bounds for the per-agent detector state registry
+STATE_MAX_USERS = 10000
+STATE_TTL_SECONDS = 600.0
 
-def apply_ema(data: List[float], alpha: float) -> List[float]:
-    """Applies exponential smoothing to a list of values."""
-    if not data:
-        return []
+DETECTOR_STATES = DetectorStateRegistry(max_size=STATE_MAX_USERS, ttl=STATE_TTL_SECONDS)
 
-    smoothed = [data[0]]
-    for value in data[1:]:
-        new_val = alpha * value + (1 - alpha) * smoothed[-1]
-        smoothed.append(new_val)
-    return smoothed
+# Batches smaller than this are classified item by item, NumPy setup costs more than it saves
+VECTORIZED_DETECTION_MIN_BATCH = 64
 
 
 def detect_event(data: List[float]) -> str:
@@ -30,7 +29,10 @@ def detect_event(data: List[float]) -> str:
 
     # Analyze last three points to detect sudden spike or dip
     v1, v2, v3 = data[-3:]
+    return _classify_window(v1, v2, v3)
+
 
+def _classify_window(v1: float, v2: float, v3: float) -> str:
     delta1 = v2 - v1
     delta2 = v3 - v2
 
@@ -45,7 +47,7 @@ def detect_event(data: List[float]) -> str:
 def process_agent_data(agent_data: AgentData) -> ProcessedAgentData:
     """
     Process single agent data point and classify road surface condition
-    using recent accelerometer Z-history.
+    using the running accelerometer Z smoothing of its agent.
 
     Args:
         agent_data (AgentData): Current agent data.
@@ -53,21 +55,80 @@ def process_agent_data(agent_data: AgentData) -> ProcessedAgentData:
     Returns:
         ProcessedAgentData: Result with road surface classification.
     """
-    global ACCEL_HISTORY
-
-    z_value = agent_data.accelerometer.z
-    ACCEL_HISTORY.append(z_value)
-
-    if len(ACCEL_HISTORY) > MAX_HISTORY_LENGTH:
-        ACCEL_HISTORY = ACCEL_HISTORY[-MAX_HISTORY_LENGTH:]
-
-    # Smoothing the history before calculation
-    smoothed_data = apply_ema(ACCEL_HISTORY, EMA_ALPHA)
+    state = DETECTOR_STATES.get(agent_data.user_id)
 
-    # Detect specific road event based on smoothed values
-    road_state = detect_event(smoothed_data)
+    # Smoothing the new value and detecting specific road event on the last smoothed values
+    smoothed_data = state.update(agent_data.accelerometer.z, EMA_ALPHA)
+    road_state = detect_event(list(smoothed_data))
 
     return ProcessedAgentData(
         road_state=road_state,
         agent_data=agent_data
     )
+
+
+def _detect_events(v1: np.ndarray, v2: np.ndarray, v3: np.ndarray) -> np.ndarray:
+    """
+    Vectorized counterpart of `detect_event` over windows of three smoothed values,
+    given as the oldest, middle and newest value of every window.
+    """
+    delta1 = v2 - v1
+    delta2 = v3 - v2
+
+    # Windows padded with NaN (less than three points of history) compare as False
+    pothole = (delta1 < POTHOLE_DROP_THRESHOLD) & (delta2 > np.abs(delta1) * 0.5)
+    bump = (delta1 > BUMP_PEAK_THRESHOLD) & (delta2 < -np.abs(delta1) * 0.5)
+    return np.where(pothole, "pothole", np.where(bump, "bump", "normal"))
+
+
+def process_agent_data_batch(agent_data_batch: List[AgentData]) -> List[ProcessedAgentData]:
+    """
+    Process a batch of agent data points in one pass in arrival order.
+
+    The EMA recursion runs per item with the same float operations as
+    `DetectorState.update`, on the states of the registry. Small batches are
+    classified as they go; from VECTORIZED_DETECTION_MIN_BATCH items on, the
+    window of the last three smoothed values of every item is collected and
+    the event detection runs once, vectorized over the whole batch.
+
+    Produces the same road states as calling `process_agent_data` for every
+    item in order, and leaves the detector states in the same condition.
+
+    Args:
+        agent_data_batch (List[AgentData]): Agent data in arrival order.
+
+    Returns:
+        List[ProcessedAgentData]: Results in the same order as the input.
+    """
+    count = len(agent_data_batch)
+    if count == 1:
+        return [process_agent_data(agent_data_batch[0])]
+    vectorized = count >= VECTORIZED_DETECTION_MIN_BATCH
+    if vectorized:
+        windows = np.full((3, count), np.nan)
+        oldest, middle, newest = windows
+    road_states = ["normal"] * count
+    states: Dict[int, DetectorState] = {}
+    for index, agent_data in enumerate(agent_data_batch):
+        user_id = agent_data.user_id
+        state = states.get(user_id)
+        if state is None:
+            state = states[user_id] = DETECTOR_STATES.get(user_id)
+        value = agent_data.accelerometer.z
+        ema = state.ema
+        ema = state.ema = value if ema is None else EMA_ALPHA * value + (1 - EMA_ALPHA) * ema
+        smoothed = state.smoothed
+        smoothed.append(ema)
+        if len(smoothed) < 3:
+            continue
+        if vectorized:
+            oldest[index], middle[index], newest[index] = smoothed
+        else:
+            road_states[index] = _classify_window(*smoothed)
+
+    if vectorized:
+        road_states = _detect_events(oldest, middle, newest).tolist()
+    return [
+        ProcessedAgentData(road_state=road_state, agent_data=agent_data)
+        for road_state, agent_data in zip(road_states, agent_data_batch)
+    ]
@@ -0,0 +1,73 @@
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Optional
+
+
+class DetectorState:
+    """
+    Incremental road-event detector state of a single agent.
+
+    Keeps the running EMA of the accelerometer Z value and a ring buffer
+    with the last three smoothed samples, so every update is O(1).
+    """
+
+    __slots__ = ("ema", "smoothed", "last_seen")
+
+    def __init__(self):
+        self.ema: Optional[float] = None
+        self.smoothed: Deque[float] = deque(maxlen=3)
+        self.last_seen: float = 0.0
+
+    def update(self, value: float, alpha: float) -> Deque[float]:
+        """Add a raw value to the running EMA and return the last smoothed samples."""
+        if self.ema is None:
+            self.ema = value
+        else:
+            self.ema = alpha * value + (1 - alpha) * self.ema
+        self.smoothed.append(self.ema)
+        return self.smoothed
+
+
+class DetectorStateRegistry:
+    """
+    Detector states keyed by user_id with LRU and TTL eviction.
+
+    Entries idle for longer than `ttl` seconds are dropped, and the least
+    recently used entry is evicted once more than `max_size` agents are tracked.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._states: "OrderedDict[int, DetectorState]" = OrderedDict()
+
+    def get(self, user_id: int) -> DetectorState:
+        """Return the state of the agent, creating it if needed, and mark it as used."""
+        now = time.monotonic()
+        self._evict_expired(now)
+
+        state = self._states.get(user_id)
+        if state is None:
+            state = DetectorState()
+            self._states[user_id] = state
+            if len(self._states) > self.max_size:
+                self._states.popitem(last=False)
+        else:
+            self._states.move_to_end(user_id)
+
+        state.last_seen = now
+        return state
+
+    def clear(self):
+        self._states.clear()
+
+    def __len__(self):
+        return len(self._states)
+
+    def _evict_expired(self, now: float):
+        # States are ordered by last use, so expired ones are always at the front
+        while self._states:
+            state = next(iter(self._states.values()))
+            if now - state.last_seen <= self.ttl:
+                break
+            self._states.popitem(last=False)
@@ -0,0 +1,62 @@
+"""
+Classification cost per sample of the per-message path and of the batch path
+at the batch sizes the workers use.
+
+SAMPLES agent data points of USERS simulated vehicles are classified in arrival
+order, one by one with process_agent_data and in chunks of every BATCH_SIZES
+size with process_agent_data_batch.
+
+Usage (from the edge_data_logic directory):
+    python -m benchmarks.data_processing
+"""
+import random
+import time
+from datetime import datetime
+
+from app.entities.agent_data import AgentData
+from app.usecases.data_processing import DETECTOR_STATES, process_agent_data, process_agent_data_batch
+
+SAMPLES = 100000
+USERS = 64
+BATCH_SIZES = [1, 10, 100, 1000]
+REPEAT = 3
+
+
+def build_samples(count: int = SAMPLES, users: int = USERS):
+    generator = random.Random(0)
+    return [
+        AgentData(
+            user_id=i % users,
+            accelerometer={"x": 1.0, "y": 2.0, "z": 16500.0 + generator.uniform(-60.0, 60.0)},
+            gps={"latitude": 50.45, "longitude": 30.52},
+            timestamp=datetime(2024, 1, 1),
+        )
+        for i in range(count)
+    ]
+
+
+def scalar_seconds(samples) -> float:
+    DETECTOR_STATES.clear()
+    started = time.perf_counter()
+    for agent_data in samples:
+        process_agent_data(agent_data)
+    return time.perf_counter() - started
+
+
+def batch_seconds(samples, batch_size: int) -> float:
+    DETECTOR_STATES.clear()
+    started = time.perf_counter()
+    for start in range(0, len(samples), batch_size):
+        process_agent_data_batch(samples[start:start + batch_size])
+    return time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    samples = build_samples()
+    print(f"{SAMPLES} samples of {USERS} users")
+    print(f"  {'path':12} {'seconds':>8} {'us/sample':>10}")
+    scalar = min(scalar_seconds(samples) for _ in range(REPEAT))
+    print(f"  {'scalar':12} {scalar:>8.3f} {scalar / SAMPLES * 1e6:>10.2f}")
+    for batch_size in BATCH_SIZES:
+        seconds = min(batch_seconds(samples, batch_size) for _ in range(REPEAT))
+        print(f"  {'batch ' + str(batch_size):12} {seconds:>8.3f} {seconds / SAMPLES * 1e6:>10.2f}")
@@ -0,0 +1,47 @@
+"""
+CPU burned by an idle edge node while it keeps the main thread alive.
+
+Compares the former `while True: pass` loop with blocking on an event,
+each with a background thread standing in for the paho network loop.
+
+Usage (from the edge_data_logic directory):
+    python -m benchmarks.idle_cpu
+"""
+import threading
+import time
+
+from app.runtime import CpuUsageMeter
+
+DURATION = 5.0
+
+
+def network_loop(stop: threading.Event):
+    while not stop.wait(0.01):
+        pass
+
+
+def measure(keep_alive) -> float:
+    stop = threading.Event()
+    thread = threading.Thread(target=network_loop, args=(stop,), daemon=True)
+    thread.start()
+    meter = CpuUsageMeter()
+    keep_alive()
+    usage = meter.usage()
+    stop.set()
+    thread.join()
+    return usage
+
+
+def busy_wait():
+    deadline = time.monotonic() + DURATION
+    while time.monotonic() < deadline:
+        pass
+
+
+def event_wait():
+    threading.Event().wait(DURATION)
+
+
+if __name__ == "__main__":
+    print(f"busy wait:  {measure(busy_wait):.1f}% of one core")
+    print(f"event wait: {measure(event_wait):.1f}% of one core")
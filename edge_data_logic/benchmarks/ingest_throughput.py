@@ -0,0 +1,83 @@
+"""
+Edge ingestion throughput against a local mosquitto broker.
+
+Publishes MESSAGES agent messages from USERS simulated vehicles and measures
+how fast AgentMQTTAdapter hands processed data to the hub gateway, inline
+and with 1, 2, 4 and 8 worker processes.
+
+Usage (from the edge_data_logic directory, with mosquitto on localhost:1883):
+    python -m benchmarks.ingest_throughput
+"""
+import json
+import threading
+import time
+from datetime import datetime
+
+import paho.mqtt.client as mqtt
+
+from app.adapters.agent_mqtt_adapter import AgentMQTTAdapter
+from app.interfaces.hub_gateway import HubGateway
+
+BROKER_HOST = "localhost"
+BROKER_PORT = 1883
+TOPIC = "benchmark_agent_data_topic"
+MESSAGES = 50000
+USERS = 64
+WORKER_COUNTS = [0, 1, 2, 4, 8]
+
+
+class CountingHubGateway(HubGateway):
+    def __init__(self, expected: int):
+        self.expected = expected
+        self.count = 0
+        self.done = threading.Event()
+
+    def save_data(self, processed_data):
+        self.count += 1
+        if self.count >= self.expected:
+            self.done.set()
+        return True
+
+    def stop(self):
+        pass
+
+
+def build_payloads():
+    return [
+        json.dumps({
+            "user_id": i % USERS,
+            "accelerometer": {"x": 1, "y": 2, "z": 16500 + (i % 40)},
+            "gps": {"longitude": 50.45, "latitude": 30.52},
+            "timestamp": datetime.now().isoformat(),
+        })
+        for i in range(MESSAGES)
+    ]
+
+
+def run(workers: int, payloads) -> float:
+    hub_gateway = CountingHubGateway(len(payloads))
+    adapter = AgentMQTTAdapter(BROKER_HOST, BROKER_PORT, TOPIC, hub_gateway, batch_size=100, workers=workers)
+    adapter.connect()
+    adapter.start()
+    time.sleep(1)  # let the subscription and the workers come up
+
+    publisher = mqtt.Client()
+    publisher.connect(BROKER_HOST, BROKER_PORT)
+    publisher.loop_start()
+
+    started = time.perf_counter()
+    for payload in payloads:
+        publisher.publish(TOPIC, payload)
+    hub_gateway.done.wait(timeout=300)
+    elapsed = time.perf_counter() - started
+
+    publisher.loop_stop()
+    adapter.stop()
+    return hub_gateway.count / elapsed
+
+
+if __name__ == "__main__":
+    payloads = build_payloads()
+    print(f"{'workers':>8} {'msg/s':>10}")
+    for workers in WORKER_COUNTS:
+        print(f"{workers or 'inline':>8} {run(workers, payloads):>10.0f}")
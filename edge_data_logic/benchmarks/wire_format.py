@@ -0,0 +1,63 @@
+"""
+Size and encode/decode cost of JSON vs the binary wire format on the edge hops.
+
+agent -> edge: one agent data message, encoded by the agent and decoded here.
+edge -> hub:   a batch of HUB_BATCH_SIZE processed items published to the hub.
+
+Usage (from the edge_data_logic directory):
+    python -m benchmarks.wire_format
+"""
+import timeit
+from datetime import datetime
+
+from app.adapters.hub_mqtt_adapter import PROCESSED_AGENT_DATA_LIST
+from app.adapters.wire_format import decode_agent_data, encode_agent_data, encode_processed_agent_data
+from app.entities.agent_data import AgentData
+from app.entities.processed_agent_data import ProcessedAgentData
+
+HUB_BATCH_SIZE = 10
+REPEAT = 20000
+
+
+def per_call_us(statement) -> float:
+    return min(timeit.repeat(statement, number=REPEAT, repeat=3)) / REPEAT * 1e6
+
+
+def report(hop, json_payload, binary_payload, json_encode, binary_encode, json_decode=None, binary_decode=None):
+    print(f"{hop}")
+    print(f"  {'':8} {'bytes':>8} {'encode, us':>12} {'decode, us':>12}")
+    for name, payload, encode, decode in (
+        ("json", json_payload, json_encode, json_decode),
+        ("binary", binary_payload, binary_encode, binary_decode),
+    ):
+        decode_us = f"{per_call_us(decode):>12.2f}" if decode else f"{'-':>12}"
+        print(f"  {name:8} {len(payload):>8} {per_call_us(encode):>12.2f} {decode_us}")
+
+
+if __name__ == "__main__":
+    agent_data = AgentData(
+        user_id=1,
+        accelerometer={"x": -17.0, "y": 4.0, "z": 16516.0},
+        gps={"latitude": 50.450386085935094, "longitude": 30.524547100067142},
+        timestamp=datetime.now(),
+    )
+    json_message = agent_data.model_dump_json().encode()
+    binary_message = encode_agent_data([agent_data])
+    report(
+        "agent -> edge (1 item)",
+        json_message,
+        binary_message,
+        agent_data.model_dump_json,
+        lambda: encode_agent_data([agent_data]),
+        lambda: AgentData.model_validate_json(json_message, strict=True),
+        lambda: decode_agent_data(binary_message),
+    )
+
+    batch = [ProcessedAgentData(road_state="normal", agent_data=agent_data)] * HUB_BATCH_SIZE
+    report(
+        f"edge -> hub ({HUB_BATCH_SIZE} items)",
+        PROCESSED_AGENT_DATA_LIST.dump_json(batch),
+        encode_processed_agent_data(batch),
+        lambda: PROCESSED_AGENT_DATA_LIST.dump_json(batch),
+        lambda: encode_processed_agent_data(batch),
+    )
@@ -13,10 +13,19 @@ MQTT_BROKER_HOST = os.environ.get("MQTT_BROKER_HOST") or "localhost"
 MQTT_BROKER_PORT = try_parse_int(os.environ.get("MQTT_BROKER_PORT")) or 1883
 MQTT_TOPIC = os.environ.get("MQTT_TOPIC") or "agent_data_topic"
 
+# Configuration for data processing (0 workers processes messages on the MQTT thread).
+# Workers classify up to PROCESSING_BATCH_SIZE queued payloads at once, fewer when the queue is short
+PROCESSING_WORKERS = try_parse_int(os.environ.get("PROCESSING_WORKERS")) or 0
+PROCESSING_BATCH_SIZE = try_parse_int(os.environ.get("PROCESSING_BATCH_SIZE")) or 100
+
 # Configuration for hub MQTT
 HUB_MQTT_BROKER_HOST = os.environ.get("HUB_MQTT_BROKER_HOST") or "localhost"
 HUB_MQTT_BROKER_PORT = try_parse_int(os.environ.get("HUB_MQTT_BROKER_PORT")) or 1883
 HUB_MQTT_TOPIC = os.environ.get("HUB_MQTT_TOPIC") or "processed_agent_data_topic"
+HUB_MQTT_BATCH_SIZE = try_parse_int(os.environ.get("HUB_MQTT_BATCH_SIZE")) or 10
+HUB_MQTT_BATCH_INTERVAL_MS = try_parse_int(os.environ.get("HUB_MQTT_BATCH_INTERVAL_MS")) or 100
+# "json" or "binary" (compact records, see app/adapters/wire_format.py)
+HUB_WIRE_FORMAT = (os.environ.get("HUB_WIRE_FORMAT") or "json").lower()
 
 # Configuration for the Hub
 HUB_HOST = os.environ.get("HUB_HOST") or "localhost"
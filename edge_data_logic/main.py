@@ -1,14 +1,20 @@
 import logging
 from app.adapters.agent_mqtt_adapter import AgentMQTTAdapter
 from app.adapters.hub_mqtt_adapter import HubMqttAdapter
+from app.runtime import CpuUsageMeter, wait_for_shutdown
 from config import (
     MQTT_BROKER_HOST,
     MQTT_BROKER_PORT,
     MQTT_TOPIC,
+    PROCESSING_WORKERS,
+    PROCESSING_BATCH_SIZE,
     HUB_URL,
     HUB_MQTT_BROKER_HOST,
     HUB_MQTT_BROKER_PORT,
     HUB_MQTT_TOPIC,
+    HUB_MQTT_BATCH_SIZE,
+    HUB_MQTT_BATCH_INTERVAL_MS,
+    HUB_WIRE_FORMAT,
 )
 
 if __name__ == "__main__":
@@ -29,6 +35,9 @@ if __name__ == "__main__":
         broker=HUB_MQTT_BROKER_HOST,
         port=HUB_MQTT_BROKER_PORT,
         topic=HUB_MQTT_TOPIC,
+        batch_size=HUB_MQTT_BATCH_SIZE,
+        batch_interval_ms=HUB_MQTT_BATCH_INTERVAL_MS,
+        wire_format=HUB_WIRE_FORMAT,
     )
     # Create an instance of the AgentMQTTAdapter using the configuration
     agent_adapter = AgentMQTTAdapter(
@@ -36,15 +45,18 @@ if __name__ == "__main__":
         broker_port=MQTT_BROKER_PORT,
         topic=MQTT_TOPIC,
         hub_gateway=hub_adapter,
+        batch_size=PROCESSING_BATCH_SIZE,
+        workers=PROCESSING_WORKERS,
     )
+    cpu_usage_meter = CpuUsageMeter()
+    # Connect to the MQTT broker and start listening for messages
+    agent_adapter.connect()
+    agent_adapter.start()
     try:
-        # Connect to the MQTT broker and start listening for messages
-        agent_adapter.connect()
-        agent_adapter.start()
-        # Keep the system running indefinitely (you can add other logic as needed)
-        while True:
-            pass
-    except KeyboardInterrupt:
-        # Stop the MQTT adapter and exit gracefully if interrupted by the user
+        # Block until SIGINT/SIGTERM without burning CPU
+        wait_for_shutdown()
+    finally:
+        # Stop consuming first, then flush what is still being sent to the hub
         agent_adapter.stop()
-        logging.info("System stopped.")
\ No newline at end of file
+        hub_adapter.stop()
+        logging.info(f"System stopped. {cpu_usage_meter.summary()}")
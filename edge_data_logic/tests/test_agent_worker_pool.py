@@ -0,0 +1,112 @@
+import json
+import os
+import signal
+import time
+
+import pytest
+
+from app.adapters.agent_worker_pool import AgentWorkerPool, shard_of
+from app.interfaces.hub_gateway import HubGateway
+
+
+class CollectingHubGateway(HubGateway):
+    def __init__(self):
+        self.saved = []
+
+    def save_data(self, processed_data):
+        self.saved.append(processed_data)
+        return True
+
+    def stop(self):
+        pass
+
+
+def _payload(user_id: int, z: float = 0.0) -> bytes:
+    return json.dumps({
+        "user_id": user_id,
+        "accelerometer": {"x": 0.0, "y": 0.0, "z": z},
+        "gps": {"latitude": 50.45, "longitude": 30.52},
+        "timestamp": "2024-01-01T00:00:00",
+    }).encode()
+
+
+def _wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            pytest.fail("condition not met in time")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def pool():
+    gateway = CollectingHubGateway()
+    pool = AgentWorkerPool(2, gateway, batch_size=10)
+    pool.start()
+    # Workers ignore SIGINT only once they run, so wait until both have processed a payload
+    for user_id in (0, 1):
+        pool.submit(_payload(user_id))
+    _wait_for(lambda: len(gateway.saved) == 2)
+    yield pool
+    pool.stop(timeout=5)
+
+
+def test_shard_of_keeps_each_user_on_one_worker():
+    assert shard_of(_payload(7), 2) == shard_of(_payload(7, z=3.0), 2) == 1
+    assert shard_of(b"not json", 2) == 0
+
+
+def test_workers_survive_sigint_and_drain_on_stop(pool):
+    for process in pool._processes:
+        os.kill(process.pid, signal.SIGINT)
+    for index in range(100):
+        pool.submit(_payload(index % 4))
+
+    started = time.monotonic()
+    pool.stop(timeout=5)
+
+    assert time.monotonic() - started < 5
+    assert len(pool.hub_gateway.saved) == 102
+
+
+def test_stop_returns_when_a_worker_died(pool):
+    os.kill(pool._processes[0].pid, signal.SIGKILL)
+    pool._processes[0].join()
+
+    started = time.monotonic()
+    pool.stop(timeout=5)
+
+    assert time.monotonic() - started < 5
+
+
+def test_dead_worker_is_restarted(pool):
+    killed = pool._processes[1]
+    os.kill(killed.pid, signal.SIGKILL)
+    killed.join()
+
+    _wait_for(lambda: pool.restarted_count == 1 and pool._processes[1].is_alive())
+    pool.submit(_payload(1))
+
+    _wait_for(lambda: len(pool.hub_gateway.saved) == 3)
+    assert pool._processes[1].pid != killed.pid
+
+
+def test_submit_drops_payloads_when_a_worker_stalls():
+    gateway = CollectingHubGateway()
+    pool = AgentWorkerPool(2, gateway, batch_size=10, queue_size=5)
+    pool.SUBMIT_TIMEOUT = 0.05
+    pool.start()
+    stalled = pool._processes[1]
+    os.kill(stalled.pid, signal.SIGSTOP)
+    try:
+        started = time.monotonic()
+        for _ in range(20):
+            pool.submit(_payload(1))
+        pool.submit(_payload(0))
+
+        assert time.monotonic() - started < 5
+        assert pool.dropped_count >= 10
+        _wait_for(lambda: any(item.agent_data.user_id == 0 for item in gateway.saved))
+    finally:
+        os.kill(stalled.pid, signal.SIGCONT)
+        pool.stop(timeout=5)
@@ -0,0 +1,94 @@
+import random
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from app.entities.agent_data import AgentData
+from benchmarks.data_processing import batch_seconds, build_samples, scalar_seconds
+from app.usecases.data_processing import (
+    BUMP_PEAK_THRESHOLD,
+    DETECTOR_STATES,
+    EMA_ALPHA,
+    POTHOLE_DROP_THRESHOLD,
+    process_agent_data,
+    process_agent_data_batch,
+)
+
+
+def _agent_data(user_id: int, z: float) -> AgentData:
+    return AgentData(
+        user_id=user_id,
+        accelerometer={"x": 0.0, "y": 0.0, "z": z},
+        gps={"latitude": 50.45, "longitude": 30.52},
+        timestamp=datetime(2024, 1, 1),
+    )
+
+
+def _scalar_results(items):
+    DETECTOR_STATES.clear()
+    road_states = [process_agent_data(item).road_state for item in items]
+    return road_states, {user_id: DETECTOR_STATES.get(user_id).ema for user_id in {i.user_id for i in items}}
+
+
+def _batch_results(items, batch_size):
+    DETECTOR_STATES.clear()
+    road_states = []
+    for start in range(0, len(items), batch_size):
+        road_states += [result.road_state for result in process_agent_data_batch(items[start:start + batch_size])]
+    return road_states, {user_id: DETECTOR_STATES.get(user_id).ema for user_id in {i.user_id for i in items}}
+
+
+@pytest.fixture(autouse=True)
+def clear_detector_states():
+    DETECTOR_STATES.clear()
+    yield
+    DETECTOR_STATES.clear()
+
+
+@pytest.mark.parametrize("batch_size", [1, 7, 100, 20000])
+def test_batch_matches_scalar_on_random_samples(batch_size):
+    rng = random.Random(42)
+    items = [_agent_data(rng.randrange(5), rng.uniform(-100, 100)) for _ in range(20000)]
+
+    assert _batch_results(items, batch_size) == _scalar_results(items)
+
+
+def _threshold_samples(threshold: float):
+    """Raw values whose smoothed delta lands on, just below and just above the threshold."""
+    values = []
+    for nudge in (0.0, -1e-9, 1e-9, -1e-12, 1e-12, np.nextafter(0, 1)):
+        # From a settled EMA of 0, a raw value v moves the smoothed value by EMA_ALPHA * v
+        first = threshold / EMA_ALPHA + nudge
+        # Swing back by half of the first delta and a little more or less, then settle
+        values += [0.0] * 30 + [first, -first * (0.5 / EMA_ALPHA + 1) + nudge] + [0.0] * 30
+    return values
+
+
+@pytest.mark.parametrize("threshold", [POTHOLE_DROP_THRESHOLD, BUMP_PEAK_THRESHOLD])
+def test_batch_matches_scalar_at_thresholds(threshold):
+    items = [_agent_data(1, z) for z in _threshold_samples(threshold)]
+
+    for batch_size in (1, 3, 31, len(items)):
+        assert _batch_results(items, batch_size) == _scalar_results(items)
+
+
+def test_batch_continues_scalar_state():
+    rng = random.Random(7)
+    items = [_agent_data(1, rng.uniform(-60, 60)) for _ in range(500)]
+    expected, _ = _scalar_results(items)
+
+    DETECTOR_STATES.clear()
+    road_states = [process_agent_data(item).road_state for item in items[:250]]
+    road_states += [result.road_state for result in process_agent_data_batch(items[250:])]
+
+    assert road_states == expected
+
+
+def test_batch_is_not_slower_than_scalar_at_worker_batch_size():
+    # Guards against the batch path regressing below the per-message one, see benchmarks/data_processing.py
+    samples = build_samples(20000)
+    scalar = min(scalar_seconds(samples) for _ in range(3))
+    batch = min(batch_seconds(samples, 10) for _ in range(3))
+
+    assert batch < scalar * 1.5
@@ -0,0 +1,80 @@
+import json
+import struct
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.adapters.hub_mqtt_adapter import HubMqttAdapter
+from app.adapters.wire_format import (
+    AGENT_DATA_RECORD,
+    HEADER,
+    KIND_AGENT_DATA,
+    WIRE_FORMAT_VERSION,
+    decode_agent_data,
+    encode_agent_data,
+    encode_processed_agent_data,
+)
+from app.entities.agent_data import AgentData
+from app.entities.processed_agent_data import ProcessedAgentData
+
+
+def _agent_data(user_id=1, timestamp=datetime(2024, 1, 1, 12, 0, 0, 123456)) -> AgentData:
+    return AgentData(
+        user_id=user_id,
+        accelerometer={"x": 0.5, "y": -1.25, "z": 16500.0},
+        gps={"latitude": 50.45, "longitude": 30.52},
+        timestamp=timestamp,
+    )
+
+
+def _hub_adapter(wire_format: str) -> HubMqttAdapter:
+    # Only the encoding is exercised, so no MQTT client is connected
+    adapter = HubMqttAdapter.__new__(HubMqttAdapter)
+    adapter.wire_format = wire_format
+    return adapter
+
+
+@pytest.mark.parametrize("timestamp", [
+    datetime(2024, 1, 1, 12, 0, 0, 123456),
+    datetime(2024, 1, 1, 12, tzinfo=timezone(timedelta(hours=3))),
+    datetime(2024, 1, 1, 12, tzinfo=timezone(timedelta(hours=-5, minutes=-30))),
+    datetime.min,
+    datetime.max,
+])
+def test_agent_data_round_trip(timestamp):
+    items = [_agent_data(user_id=user_id, timestamp=timestamp) for user_id in (1, -2, 2 ** 31 - 1)]
+
+    decoded = decode_agent_data(encode_agent_data(items))
+
+    assert decoded == items
+    assert [item.timestamp.utcoffset() for item in decoded] == [timestamp.utcoffset()] * 3
+
+
+def test_out_of_range_timestamp_is_rejected():
+    payload = HEADER.pack(WIRE_FORMAT_VERSION, KIND_AGENT_DATA, 1) + AGENT_DATA_RECORD.pack(
+        1, 0.0, 0.0, 0.0, 50.45, 30.52, 2 ** 63 - 1, -32768
+    )
+
+    with pytest.raises(ValueError, match="out of range"):
+        decode_agent_data(payload)
+
+
+def test_out_of_range_user_id_has_no_binary_form():
+    with pytest.raises(struct.error):
+        encode_processed_agent_data([ProcessedAgentData(road_state="normal", agent_data=_agent_data(user_id=2 ** 31))])
+
+
+@pytest.mark.parametrize("item", [
+    ProcessedAgentData(road_state="normal", agent_data=_agent_data(user_id=2 ** 31)),
+    ProcessedAgentData(road_state="speed_bump", agent_data=_agent_data()),
+])
+def test_hub_adapter_falls_back_to_json(item):
+    message = _hub_adapter("binary")._encode([item])
+
+    assert ProcessedAgentData.model_validate(json.loads(message)) == item
+
+
+def test_hub_adapter_encodes_binary():
+    items = [ProcessedAgentData(road_state="pothole", agent_data=_agent_data())] * 2
+
+    assert _hub_adapter("binary")._encode(items) == encode_processed_agent_data(items)
@@ -0,0 +1,76 @@
+import logging
+from typing import List
+
+import httpx
+from pydantic import TypeAdapter
+
+from app.adapters.store_request import compress, payload_preview, save_result
+from app.adapters.wire_format import JSON_CONTENT_TYPE, store_payload
+from app.entities.processed_agent_data import ProcessedAgentData
+from app.interfaces.async_store_gateway import AsyncStoreGateway
+from app.interfaces.store_gateway import SaveResult
+
+PROCESSED_AGENT_DATA_LIST = TypeAdapter(List[ProcessedAgentData])
+
+
+class AsyncStoreApiAdapter(AsyncStoreGateway):
+    """Store API adapter that reuses pooled keep-alive connections without blocking the event loop."""
+
+    def __init__(self, api_base_url, max_connections=10, timeout=10.0, wire_format="json", gzip_min_size=0):
+        self.api_base_url = api_base_url
+        self.wire_format = wire_format
+        # Request bodies of at least this many bytes are gzipped, 0 disables compression
+        self.gzip_min_size = gzip_min_size
+        self._client = httpx.AsyncClient(
+            base_url=api_base_url,
+            headers={"Content-Type": "application/json"},
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=timeout,
+        )
+
+    async def save_data(self, processed_agent_data_batch: List[ProcessedAgentData]) -> bool:
+        """
+        Save the processed road data to the Store API.
+
+        Parameters:
+            processed_agent_data_batch (List[ProcessedAgentData]): Processed road data to be saved.
+
+        Returns:
+            bool: True if the data is successfully saved, False otherwise.
+        """
+        result = await self._post(PROCESSED_AGENT_DATA_LIST.dump_json(processed_agent_data_batch))
+        return result is SaveResult.SAVED
+
+    async def save_raw_data(self, processed_agent_data_batch: List[bytes]) -> SaveResult:
+        """
+        Save already serialized processed road data to the Store API without re-parsing it.
+
+        Parameters:
+            processed_agent_data_batch (List[bytes]): JSON documents or binary records of processed road data.
+
+        Returns:
+            SaveResult: Whether the data was saved, may be retried or was rejected.
+        """
+        return await self._post(*store_payload(processed_agent_data_batch, self.wire_format))
+
+    async def close(self):
+        await self._client.aclose()
+
+    async def _post(self, payload: bytes, content_type: str = JSON_CONTENT_TYPE) -> SaveResult:
+        logging.info("Saving data to Store API")
+        body, headers = compress(payload, self.gzip_min_size)
+        try:
+            response = await self._client.post(
+                "/processed_agent_data/", content=body, headers={"Content-Type": content_type, **headers}
+            )
+        except httpx.HTTPError as e:
+            logging.error(f"Request to Store API failed: {e}")
+            return SaveResult.FAILED
+
+        if response.status_code != 200:
+            logging.error(
+                f"Store API returned status {response.status_code}.\n"
+                f"Payload: {payload_preview(payload)}\n"
+                f"Response content: {payload_preview(response.text)}"
+            )
+        return save_result(response.status_code)
@@ -0,0 +1,281 @@
+import time
+from typing import List, NamedTuple, Union
+
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+
+# Appends the items and, in the same atomic call, moves every complete batch
+# from the head of the pending list to its own in-flight list. In-flight batch
+# ids are kept in a sorted set scored by the time they may be redelivered, and
+# every claim of a batch is numbered so that only its latest claim delivers it.
+# KEYS: pending list, in-flight set, batch id sequence, key prefix of in-flight lists, claims hash.
+# ARGV: batch size, redelivery deadline, serialized items.
+PUSH_AND_CLAIM_SCRIPT = """
+local batch_size = tonumber(ARGV[1])
+local length = redis.call('LLEN', KEYS[1])
+for i = 3, #ARGV, 1000 do
+    length = redis.call('RPUSH', KEYS[1], unpack(ARGV, i, math.min(i + 999, #ARGV)))
+end
+local batches = {}
+while length >= batch_size do
+    local items = redis.call('LRANGE', KEYS[1], 0, batch_size - 1)
+    redis.call('LTRIM', KEYS[1], batch_size, -1)
+    length = length - batch_size
+    local batch_id = redis.call('INCR', KEYS[3])
+    redis.call('RPUSH', KEYS[4] .. batch_id, unpack(items))
+    redis.call('ZADD', KEYS[2], ARGV[2], batch_id)
+    redis.call('HSET', KEYS[5], batch_id, 1)
+    table.insert(items, 1, 1)
+    table.insert(items, 1, batch_id)
+    table.insert(batches, items)
+end
+return batches
+"""
+
+# Claims in-flight batches whose redelivery deadline has passed and gives them a new one.
+# KEYS: in-flight set, key prefix of in-flight lists, claims hash. ARGV: now, new deadline, limit.
+CLAIM_EXPIRED_SCRIPT = """
+local batch_ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[3])
+local batches = {}
+for _, batch_id in ipairs(batch_ids) do
+    local items = redis.call('LRANGE', KEYS[2] .. batch_id, 0, -1)
+    if #items == 0 then
+        redis.call('ZREM', KEYS[1], batch_id)
+        redis.call('HDEL', KEYS[3], batch_id)
+    else
+        redis.call('ZADD', KEYS[1], ARGV[2], batch_id)
+        table.insert(items, 1, redis.call('HINCRBY', KEYS[3], batch_id, 1))
+        table.insert(items, 1, batch_id)
+        table.insert(batches, items)
+    end
+end
+return batches
+"""
+
+# Moves an in-flight batch to the dead letters, a sorted set of batch ids scored by
+# the time they were given up, each with its items kept in its own list.
+# KEYS: in-flight set, attempts hash, key prefix of in-flight lists, dead letter set,
+# key prefix of dead letter lists, claims hash. ARGV: batch id, now.
+DEAD_LETTER = """
+local function dead_letter(batch_id, now)
+    if redis.call('EXISTS', KEYS[3] .. batch_id) == 1 then
+        redis.call('RENAME', KEYS[3] .. batch_id, KEYS[5] .. batch_id)
+        redis.call('ZADD', KEYS[4], now, batch_id)
+    end
+    redis.call('ZREM', KEYS[1], batch_id)
+    redis.call('HDEL', KEYS[2], batch_id)
+    redis.call('HDEL', KEYS[6], batch_id)
+end
+"""
+
+DEAD_LETTER_SCRIPT = DEAD_LETTER + """
+dead_letter(ARGV[1], ARGV[2])
+return 1
+"""
+
+# Schedules the next delivery attempt of an in-flight batch with exponential backoff,
+# or moves it to the dead letters once it has failed `max attempts` times (0 never does).
+# KEYS: as for DEAD_LETTER. ARGV: batch id, now, base delay, max delay, max attempts.
+RETRY_LATER_SCRIPT = DEAD_LETTER + """
+local attempts = redis.call('HINCRBY', KEYS[2], ARGV[1], 1)
+local max_attempts = tonumber(ARGV[5])
+if max_attempts > 0 and attempts >= max_attempts then
+    dead_letter(ARGV[1], ARGV[2])
+    return attempts
+end
+local delay = math.min(tonumber(ARGV[3]) * 2 ^ (attempts - 1), tonumber(ARGV[4]))
+redis.call('ZADD', KEYS[1], 'XX', tonumber(ARGV[2]) + delay, ARGV[1])
+return attempts
+"""
+
+# Starts a delivery attempt of a claimed batch: moves its redelivery deadline to a full
+# visibility timeout from now, so time spent waiting for a free worker does not count.
+# Returns 0 when the claim is stale, because the batch was settled or claimed again meanwhile.
+# KEYS: in-flight set, claims hash. ARGV: batch id, claim, new deadline.
+START_DELIVERY_SCRIPT = """
+if redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[2] or not redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], 'XX', ARGV[3], ARGV[1])
+return 1
+"""
+
+# Forgets a delivered batch. KEYS: in-flight set, attempts hash, key prefix of in-flight lists, claims hash.
+ACK_SCRIPT = """
+redis.call('DEL', KEYS[3] .. ARGV[1])
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+redis.call('HDEL', KEYS[4], ARGV[1])
+return 1
+"""
+
+
+class ClaimedBatch(NamedTuple):
+    batch_id: int
+    items: List[bytes]
+    # Number of the claim that handed the batch out, see start_delivery
+    claim: int = 1
+
+
+class _RedisBatchQueueBase:
+    def __init__(
+        self,
+        redis_client: Union[Redis, AsyncRedis],
+        key: str,
+        batch_size: int,
+        visibility_timeout: float = 60,
+        retry_base_delay: float = 1,
+        retry_max_delay: float = 60,
+        max_attempts: int = 0,
+    ):
+        self.key = key
+        self.batch_size = batch_size
+        self.visibility_timeout = visibility_timeout
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        # Failed deliveries after which a batch is dead-lettered, 0 retries forever
+        self.max_attempts = max_attempts
+        self._inflight_key = f"{key}:inflight"
+        self._inflight_prefix = f"{key}:inflight:"
+        self._attempts_key = f"{key}:attempts"
+        self._claims_key = f"{key}:claims"
+        self._sequence_key = f"{key}:batch_id"
+        self._dead_key = f"{key}:dead"
+        self._dead_prefix = f"{key}:dead:"
+        self._push_and_claim = redis_client.register_script(PUSH_AND_CLAIM_SCRIPT)
+        self._claim_expired = redis_client.register_script(CLAIM_EXPIRED_SCRIPT)
+        self._retry_later = redis_client.register_script(RETRY_LATER_SCRIPT)
+        self._dead_letter = redis_client.register_script(DEAD_LETTER_SCRIPT)
+        self._start_delivery = redis_client.register_script(START_DELIVERY_SCRIPT)
+        self._ack = redis_client.register_script(ACK_SCRIPT)
+
+    def _push_and_claim_call(self, items):
+        keys = [self.key, self._inflight_key, self._sequence_key, self._inflight_prefix, self._claims_key]
+        return dict(keys=keys, args=[self.batch_size, time.time() + self.visibility_timeout, *items])
+
+    def _claim_expired_call(self, limit):
+        now = time.time()
+        keys = [self._inflight_key, self._inflight_prefix, self._claims_key]
+        return dict(keys=keys, args=[now, now + self.visibility_timeout, limit])
+
+    def _start_delivery_call(self, batch: ClaimedBatch):
+        keys = [self._inflight_key, self._claims_key]
+        return dict(keys=keys, args=[batch.batch_id, batch.claim, time.time() + self.visibility_timeout])
+
+    def _dead_letter_keys(self):
+        return [
+            self._inflight_key,
+            self._attempts_key,
+            self._inflight_prefix,
+            self._dead_key,
+            self._dead_prefix,
+            self._claims_key,
+        ]
+
+    def _retry_later_call(self, batch_id):
+        args = [batch_id, time.time(), self.retry_base_delay, self.retry_max_delay, self.max_attempts]
+        return dict(keys=self._dead_letter_keys(), args=args)
+
+    def _dead_letter_call(self, batch_id):
+        return dict(keys=self._dead_letter_keys(), args=[batch_id, time.time()])
+
+    def is_dead_lettered(self, attempts: int) -> bool:
+        """Whether retry_later gave up on a batch after its `attempts` failed deliveries."""
+        return 0 < self.max_attempts <= attempts
+
+    def _ack_call(self, batch_id):
+        keys = [self._inflight_key, self._attempts_key, self._inflight_prefix, self._claims_key]
+        return dict(keys=keys, args=[batch_id])
+
+    @staticmethod
+    def _to_batches(result) -> List[ClaimedBatch]:
+        return [ClaimedBatch(batch_id=int(batch[0]), items=batch[2:], claim=int(batch[1])) for batch in result]
+
+
+class RedisBatchQueue(_RedisBatchQueueBase):
+    """
+    Reliable FIFO queue of serialized items in Redis that hands out complete batches.
+
+    Pushing items and claiming the batches they complete is a single atomic
+    script call, so every message costs one round trip and concurrent
+    producers never claim the same items. A claimed batch stays in flight
+    until it is acknowledged: failed deliveries are retried with exponential
+    backoff and batches of a crashed consumer are redelivered once
+    `visibility_timeout` passes, so items are delivered at least once.
+    A delivery attempt restarts that timeout when it actually begins, and
+    is skipped if the batch has been claimed again or settled meanwhile.
+    Batches that fail `max_attempts` times, or are rejected outright, are
+    moved to the "<key>:dead" sorted set, their items to "<key>:dead:<id>".
+    """
+
+    def push(self, items: List[Union[str, bytes]]) -> List[ClaimedBatch]:
+        """
+        Append serialized items to the queue.
+        Returns:
+            List[ClaimedBatch]: Complete batches claimed from the queue, oldest first.
+        """
+        return self._to_batches(self._push_and_claim(**self._push_and_claim_call(items)))
+
+    def claim_expired(self, limit: int = 10) -> List[ClaimedBatch]:
+        """Claim in-flight batches that are due for another delivery attempt."""
+        return self._to_batches(self._claim_expired(**self._claim_expired_call(limit)))
+
+    def start_delivery(self, batch: ClaimedBatch) -> bool:
+        """
+        Restart the visibility timeout of a batch right before it is sent.
+        Returns False if the claim is stale and the batch must not be sent.
+        """
+        return bool(self._start_delivery(**self._start_delivery_call(batch)))
+
+    def retry_later(self, batch_id: int) -> int:
+        """
+        Schedule another delivery attempt of a batch, or dead-letter it after `max_attempts`.
+        Returns the number of failed attempts.
+        """
+        return self._retry_later(**self._retry_later_call(batch_id))
+
+    def dead_letter(self, batch_id: int):
+        """Give up on a batch that can never be delivered, keeping its items for inspection."""
+        self._dead_letter(**self._dead_letter_call(batch_id))
+
+    def ack(self, batch_id: int):
+        """Mark a batch as delivered."""
+        self._ack(**self._ack_call(batch_id))
+
+
+class AsyncRedisBatchQueue(_RedisBatchQueueBase):
+    """Asyncio counterpart of RedisBatchQueue for use from the event loop."""
+
+    async def push(self, items: List[Union[str, bytes]]) -> List[ClaimedBatch]:
+        """
+        Append serialized items to the queue.
+        Returns:
+            List[ClaimedBatch]: Complete batches claimed from the queue, oldest first.
+        """
+        return self._to_batches(await self._push_and_claim(**self._push_and_claim_call(items)))
+
+    async def claim_expired(self, limit: int = 10) -> List[ClaimedBatch]:
+        """Claim in-flight batches that are due for another delivery attempt."""
+        return self._to_batches(await self._claim_expired(**self._claim_expired_call(limit)))
+
+    async def start_delivery(self, batch: ClaimedBatch) -> bool:
+        """
+        Restart the visibility timeout of a batch right before it is sent.
+        Returns False if the claim is stale and the batch must not be sent.
+        """
+        return bool(await self._start_delivery(**self._start_delivery_call(batch)))
+
+    async def retry_later(self, batch_id: int) -> int:
+        """
+        Schedule another delivery attempt of a batch, or dead-letter it after `max_attempts`.
+        Returns the number of failed attempts.
+        """
+        return await self._retry_later(**self._retry_later_call(batch_id))
+
+    async def dead_letter(self, batch_id: int):
+        """Give up on a batch that can never be delivered, keeping its items for inspection."""
+        await self._dead_letter(**self._dead_letter_call(batch_id))
+
+    async def ack(self, batch_id: int):
+        """Mark a batch as delivered."""
+        await self._ack(**self._ack_call(batch_id))
@@ -1,23 +1,30 @@
 import logging
 from typing import List
-from datetime import datetime
-import json
 
 import requests
+from pydantic import TypeAdapter
 from requests.exceptions import RequestException
 
+from app.adapters.store_request import compress, payload_preview, save_result
+from app.adapters.wire_format import JSON_CONTENT_TYPE, store_payload
 from app.entities.processed_agent_data import ProcessedAgentData
-from app.interfaces.store_gateway import StoreGateway
+from app.interfaces.store_gateway import SaveResult, StoreGateway
+
+PROCESSED_AGENT_DATA_LIST = TypeAdapter(List[ProcessedAgentData])
 
 
 class StoreApiAdapter(StoreGateway):
-    def __init__(self, api_base_url):
+    def __init__(self, api_base_url, wire_format="json", gzip_min_size=0, timeout=10.0):
         self.api_base_url = api_base_url
-
-    def _default_serializer(self, obj):
-        if isinstance(obj, datetime):
-            return obj.isoformat()
-        raise TypeError(f"Type {type(obj)} not serializable")
+        # Seconds to wait for the Store API, so a stalled Store cannot block the caller for good
+        self.timeout = timeout
+        # "binary" sends compact records, see app.adapters.wire_format
+        self.wire_format = wire_format
+        # Request bodies of at least this many bytes are gzipped, 0 disables compression
+        self.gzip_min_size = gzip_min_size
+        # Session keeps the connection to the Store API alive between batches
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
 
     def save_data(self, processed_agent_data_batch: List[ProcessedAgentData]) -> bool:
         """
@@ -30,24 +37,38 @@ class StoreApiAdapter(StoreGateway):
             bool: True if the data is successfully saved, False otherwise.
         """
         logging.info("Saving data to Store API")
+        # The whole batch is serialized in one pass by pydantic
+        return self._post(PROCESSED_AGENT_DATA_LIST.dump_json(processed_agent_data_batch)) is SaveResult.SAVED
 
-        url = f"{self.api_base_url}/processed_agent_data/"
-        payload = [item.model_dump() for item in processed_agent_data_batch]
+    def save_raw_data(self, processed_agent_data_batch: List[bytes]) -> SaveResult:
+        """
+        Save already serialized processed road data to the Store API without re-parsing it.
+
+        Parameters:
+            processed_agent_data_batch (List[bytes]): JSON documents or binary records of processed road data.
 
+        Returns:
+            SaveResult: Whether the data was saved, may be retried or was rejected.
+        """
+        logging.info("Saving data to Store API")
+        return self._post(*store_payload(processed_agent_data_batch, self.wire_format))
+
+    def _post(self, payload: bytes, content_type=JSON_CONTENT_TYPE) -> SaveResult:
+        url = f"{self.api_base_url}/processed_agent_data/"
+        body, headers = compress(payload, self.gzip_min_size)
         try:
-            json_payload = json.dumps(payload, default=self._default_serializer)
-            headers = {"Content-Type": "application/json"}
-            response = requests.post(url, data=json_payload, headers=headers)
+            response = self.session.post(
+                url, data=body, headers={"Content-Type": content_type, **headers}, timeout=self.timeout
+            )
 
             if response.status_code != 200:
                 logging.error(
                     f"Store API returned status {response.status_code}.\n"
-                    f"Payload: {json_payload}\n"
-                    f"Response content: {response.text}"
+                    f"Payload: {payload_preview(payload)}\n"
+                    f"Response content: {payload_preview(response.text)}"
                 )
-                return False
-            return True
+            return save_result(response.status_code)
 
         except RequestException as e:
             logging.error(f"Request to Store API failed: {e}")
-            return False
+            return SaveResult.FAILED
@@ -0,0 +1,46 @@
+"""
+Request body helpers shared by the Store API adapters.
+"""
+import gzip
+from typing import Dict, Tuple, Union
+
+from app.interfaces.store_gateway import SaveResult
+
+# Fastest gzip level: JSON batches shrink several times already, higher levels mostly cost CPU
+GZIP_LEVEL = 1
+# Characters of a failed request body or its response included in the error log
+PAYLOAD_PREVIEW_SIZE = 200
+# Client error statuses that a later attempt of the same request may still pass
+RETRYABLE_CLIENT_ERRORS = (408, 429)
+
+
+def compress(body: bytes, gzip_min_size: int) -> Tuple[bytes, Dict[str, str]]:
+    """
+    Gzip a request body of at least `gzip_min_size` bytes (0 disables compression).
+    Returns the body to send and the extra headers it needs.
+    """
+    if not gzip_min_size or len(body) < gzip_min_size:
+        return body, {}
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0), {"Content-Encoding": "gzip"}
+
+
+def payload_preview(payload: Union[bytes, str]) -> str:
+    """Beginning of a request or response body for logs, so a failed batch does not flood them."""
+    if len(payload) <= PAYLOAD_PREVIEW_SIZE:
+        return payload if isinstance(payload, str) else repr(payload)
+    preview = payload[:PAYLOAD_PREVIEW_SIZE]
+    if not isinstance(preview, str):
+        preview = repr(preview)
+    return f"{preview}... ({len(payload)} in total)"
+
+
+def save_result(status_code: int) -> SaveResult:
+    """
+    Outcome of a Store API response: any other 4xx rejects the batch itself,
+    so sending it again would fail the same way.
+    """
+    if status_code == 200:
+        return SaveResult.SAVED
+    if 400 <= status_code < 500 and status_code not in RETRYABLE_CLIENT_ERRORS:
+        return SaveResult.REJECTED
+    return SaveResult.FAILED
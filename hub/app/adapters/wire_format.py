@@ -0,0 +1,166 @@
+"""
+Compact binary wire format of processed agent data, with JSON as fallback.
+
+A binary message is a 6-byte header followed by fixed-width little-endian records:
+
+    header            version: u8 (1), kind: u8 (2 for processed agent data), count: u32
+    processed data    road_state: u8 (index in ROAD_STATES),
+                      user_id: i32, x, y, z, latitude, longitude: f64,
+                      timestamp: i64 (microseconds since 1970-01-01 of the wall clock),
+                      utc_offset: i16 (minutes, -32768 for naive timestamps)
+
+The hub passes binary records from the edge to the Store as they are, without
+decoding them. JSON documents never start with the version byte, so items of
+both formats can share the Redis queue and are converted only when needed.
+"""
+import logging
+import struct
+from datetime import datetime, timedelta, timezone
+from typing import List, Sequence, Tuple
+
+from app.entities.processed_agent_data import ProcessedAgentData
+
+WIRE_FORMAT_VERSION = 1
+KIND_PROCESSED_AGENT_DATA = 2
+ROAD_STATES = ("normal", "pothole", "bump")
+
+# Content-Type of binary Store API requests
+BINARY_CONTENT_TYPE = "application/x-road-vision"
+JSON_CONTENT_TYPE = "application/json"
+
+HEADER = struct.Struct("<BBI")
+PROCESSED_AGENT_DATA_RECORD = struct.Struct("<Bi5dqh")
+
+_EPOCH = datetime(1970, 1, 1)
+_NAIVE = -32768
+# Timestamps that datetime can represent, other values of the i64 field are rejected
+_MIN_MICROSECONDS = (datetime.min - _EPOCH) // timedelta(microseconds=1)
+_MAX_MICROSECONDS = (datetime.max - _EPOCH) // timedelta(microseconds=1)
+_ROAD_STATE_CODES = {road_state: code for code, road_state in enumerate(ROAD_STATES)}
+
+
+def is_binary(payload: bytes) -> bool:
+    return payload[:1] == bytes((WIRE_FORMAT_VERSION,))
+
+
+def split_records(payload: bytes) -> List[bytes]:
+    """Records of a binary processed agent data message, validated against the header."""
+    version, kind, count = HEADER.unpack_from(payload)
+    if version != WIRE_FORMAT_VERSION or kind != KIND_PROCESSED_AGENT_DATA:
+        raise ValueError(f"Unsupported binary message version {version} kind {kind}")
+    size = PROCESSED_AGENT_DATA_RECORD.size
+    if len(payload) != HEADER.size + count * size:
+        raise ValueError(f"Binary message of {len(payload)} bytes does not hold {count} records")
+    return [payload[start:start + size] for start in range(HEADER.size, len(payload), size)]
+
+
+def join_records(records: Sequence[bytes]) -> bytes:
+    return HEADER.pack(WIRE_FORMAT_VERSION, KIND_PROCESSED_AGENT_DATA, len(records)) + b"".join(records)
+
+
+def encode_record(item: ProcessedAgentData) -> bytes:
+    """
+    Raises KeyError for a road state that has no binary code,
+    struct.error for a value out of the range of its field.
+    """
+    agent_data = item.agent_data
+    offset = agent_data.timestamp.utcoffset()
+    return PROCESSED_AGENT_DATA_RECORD.pack(
+        _ROAD_STATE_CODES[item.road_state],
+        agent_data.user_id,
+        agent_data.accelerometer.x,
+        agent_data.accelerometer.y,
+        agent_data.accelerometer.z,
+        agent_data.gps.latitude,
+        agent_data.gps.longitude,
+        (agent_data.timestamp.replace(tzinfo=None) - _EPOCH) // timedelta(microseconds=1),
+        _NAIVE if offset is None else offset // timedelta(minutes=1),
+    )
+
+
+def validate_record(record: bytes):
+    """
+    Raises ValueError for a record the Store would reject: an unknown road state code,
+    or a timestamp or UTC offset out of range.
+    """
+    code, *_, microseconds, offset = PROCESSED_AGENT_DATA_RECORD.unpack(record)
+    if code >= len(ROAD_STATES):
+        raise ValueError(f"Unknown road state code {code}")
+    if not _MIN_MICROSECONDS <= microseconds <= _MAX_MICROSECONDS:
+        raise ValueError(f"Timestamp of {microseconds} microseconds is out of range")
+    if offset != _NAIVE and abs(offset) >= 24 * 60:
+        raise ValueError(f"UTC offset of {offset} minutes is out of range")
+
+
+def valid_records(records: Sequence[bytes]) -> List[bytes]:
+    """Records that pass validate_record; the others are dropped and logged."""
+    valid = []
+    for record in records:
+        try:
+            validate_record(record)
+        except ValueError as e:
+            logging.warning(f"Dropping invalid binary record: {e}")
+            continue
+        valid.append(record)
+    return valid
+
+
+def decode_record(record: bytes) -> ProcessedAgentData:
+    """Raises ValueError for a record that does not pass validate_record."""
+    validate_record(record)
+    fields = PROCESSED_AGENT_DATA_RECORD.unpack(record)
+    code, user_id, x, y, z, latitude, longitude, microseconds, offset = fields
+    timestamp = _EPOCH + timedelta(microseconds=microseconds)
+    if offset != _NAIVE:
+        timestamp = timestamp.replace(tzinfo=timezone(timedelta(minutes=offset)))
+    # Validating a plain dict is cheaper than model_construct per nested model
+    return ProcessedAgentData.model_validate({
+        "road_state": ROAD_STATES[code],
+        "agent_data": {
+            "user_id": user_id,
+            "accelerometer": {"x": x, "y": y, "z": z},
+            "gps": {"latitude": latitude, "longitude": longitude},
+            "timestamp": timestamp,
+        },
+    })
+
+
+def is_binary_record(item: bytes) -> bool:
+    # Records start with a road state code, JSON documents with "{"
+    return len(item) == PROCESSED_AGENT_DATA_RECORD.size and item[0] < len(ROAD_STATES)
+
+
+def _to_record(item: bytes) -> bytes:
+    if is_binary_record(item):
+        return item
+    return encode_record(ProcessedAgentData.model_validate_json(item))
+
+
+def _to_documents(items: Sequence[bytes]) -> List[bytes]:
+    documents = []
+    for item in items:
+        if not is_binary_record(item):
+            documents.append(item)
+            continue
+        try:
+            documents.append(decode_record(item).model_dump_json().encode())
+        except ValueError as e:
+            # A record the Store could never accept would block its batch forever
+            logging.warning(f"Dropping binary record that has no JSON form: {e}")
+    return documents
+
+
+def store_payload(items: Sequence[bytes], wire_format: str) -> Tuple[bytes, str]:
+    """
+    Request body and Content-Type of a batch of queued items in the requested format.
+    Items already in that format are copied as they are; binary falls back to JSON
+    when an item has a road state without a binary code or a value out of the range
+    of its field, and records that cannot be converted to JSON are dropped.
+    """
+    if wire_format == "binary":
+        try:
+            return join_records([_to_record(item) for item in items]), BINARY_CONTENT_TYPE
+        except (KeyError, struct.error, OverflowError) as e:
+            logging.warning(f"Batch has no binary form ({e!r}), sending JSON")
+    return b"[" + b",".join(_to_documents(items)) + b"]", JSON_CONTENT_TYPE
+
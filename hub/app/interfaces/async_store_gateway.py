@@ -0,0 +1,40 @@
+from abc import ABC, abstractmethod
+from typing import List
+from app.entities.processed_agent_data import ProcessedAgentData
+from app.interfaces.store_gateway import SaveResult
+
+
+class AsyncStoreGateway(ABC):
+    """
+    Abstract class representing the non-blocking Store Gateway interface.
+    All async store gateway adapters must implement these methods.
+    """
+
+    @abstractmethod
+    async def save_data(self, processed_agent_data_batch: List[ProcessedAgentData]) -> bool:
+        """
+        Method to save the processed agent data in the database.
+        Parameters:
+            processed_agent_data_batch (List[ProcessedAgentData]): The processed agent data to be saved.
+        Returns:
+            bool: True if the data is successfully saved, False otherwise.
+        """
+        pass
+
+    @abstractmethod
+    async def save_raw_data(self, processed_agent_data_batch: List[bytes]) -> SaveResult:
+        """
+        Method to save already serialized processed agent data in the database.
+        Parameters:
+            processed_agent_data_batch (List[bytes]): JSON documents of processed agent data.
+        Returns:
+            SaveResult: Whether the data was saved, may be retried or was rejected.
+        """
+        pass
+
+    @abstractmethod
+    async def close(self):
+        """
+        Method to release connections held by the gateway.
+        """
+        pass
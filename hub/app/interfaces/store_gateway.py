@@ -1,8 +1,19 @@
 from abc import ABC, abstractmethod
+from enum import Enum
 from typing import List
 from app.entities.processed_agent_data import ProcessedAgentData
 
 
+class SaveResult(Enum):
+    """Outcome of sending a batch to the Store API."""
+
+    SAVED = "saved"
+    # The Store was unreachable, timed out or failed: the same batch may succeed later
+    FAILED = "failed"
+    # The Store refused the batch itself: sending it again cannot succeed
+    REJECTED = "rejected"
+
+
 class StoreGateway(ABC):
     """
     Abstract class representing the Store Gateway interface.
@@ -18,4 +29,15 @@ class StoreGateway(ABC):
         Returns:
             bool: True if the data is successfully saved, False otherwise.
         """
-        pass
\ No newline at end of file
+        pass
+
+    @abstractmethod
+    def save_raw_data(self, processed_agent_data_batch: List[bytes]) -> SaveResult:
+        """
+        Method to save already serialized processed agent data in the database.
+        Parameters:
+            processed_agent_data_batch (List[bytes]): JSON documents of processed agent data.
+        Returns:
+            SaveResult: Whether the data was saved, may be retried or was rejected.
+        """
+        pass
@@ -0,0 +1,69 @@
+"""
+Redis round trips per stored row on the hub ingest path.
+
+Replays the same stream of processed data through the former
+LPUSH/LLEN/RPOP flow and through RedisBatchQueue (including the
+acknowledgement of each batch), counting every command
+sent to Redis. The Store API call is replaced by a counter.
+
+Usage (from the hub directory, with Redis on localhost:6379):
+    python -m benchmarks.redis_round_trips
+"""
+from redis import Redis
+
+from app.adapters.redis_batch_queue import RedisBatchQueue
+
+REDIS_HOST = "localhost"
+REDIS_PORT = 6379
+KEY = "benchmark_processed_agent_data"
+BATCH_SIZE = 20
+ROWS = 10000
+ITEM = b'{"road_state":"normal","agent_data":{"user_id":1,"accelerometer":{"x":1.0,"y":2.0,"z":16500.0},' \
+       b'"gps":{"latitude":30.52,"longitude":50.45},"timestamp":"2025-01-01T00:00:00"}}'
+
+
+class CountingRedis(Redis):
+    round_trips = 0
+
+    def execute_command(self, *args, **options):
+        CountingRedis.round_trips += 1
+        return super().execute_command(*args, **options)
+
+
+def legacy_flow(redis_client: Redis, items_per_message: int) -> int:
+    stored = 0
+    for _ in range(ROWS // items_per_message):
+        for _ in range(items_per_message):
+            redis_client.lpush(KEY, ITEM)
+        if redis_client.llen(KEY) >= BATCH_SIZE:
+            for _ in range(BATCH_SIZE):
+                redis_client.rpop(KEY)
+            stored += BATCH_SIZE
+    return stored
+
+
+def batch_queue_flow(redis_client: Redis, items_per_message: int) -> int:
+    batch_queue = RedisBatchQueue(redis_client, KEY, BATCH_SIZE)
+    stored = 0
+    for _ in range(ROWS // items_per_message):
+        for batch in batch_queue.push([ITEM] * items_per_message):
+            batch_queue.ack(batch.batch_id)
+            stored += len(batch.items)
+    return stored
+
+
+def measure(flow, items_per_message: int) -> float:
+    redis_client = CountingRedis(host=REDIS_HOST, port=REDIS_PORT)
+    redis_client.delete(KEY)
+    CountingRedis.round_trips = 0
+    stored = flow(redis_client, items_per_message)
+    redis_client.delete(KEY, f"{KEY}:inflight", f"{KEY}:batch_id")
+    return CountingRedis.round_trips / stored
+
+
+if __name__ == "__main__":
+    print(f"{'items/message':>14} {'legacy':>8} {'batch queue':>12}  (round trips per stored row)")
+    for items_per_message in (1, 10):
+        legacy = measure(legacy_flow, items_per_message)
+        batched = measure(batch_queue_flow, items_per_message)
+        print(f"{items_per_message:>14} {legacy:>8.2f} {batched:>12.2f}")
@@ -0,0 +1,77 @@
+"""
+Cost of building Store API request bodies.
+
+Compares the former per-item model_dump + json.dumps serialization with a
+single TypeAdapter.dump_json pass and with joining the raw JSON kept in Redis,
+and shows what gzip adds in time and saves in bytes, for BATCH_SIZES items.
+
+Usage (from the hub directory):
+    python -m benchmarks.store_request
+"""
+import json
+import random
+import timeit
+from datetime import datetime, timedelta
+
+from app.adapters.store_api_adapter import PROCESSED_AGENT_DATA_LIST
+from app.adapters.store_request import compress
+from app.adapters.wire_format import store_payload
+from app.entities.processed_agent_data import ProcessedAgentData
+
+BATCH_SIZES = (20, 500, 5000)
+TOTAL_ITEMS = 50000
+
+
+def default_serializer(obj):
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Type {type(obj)} not serializable")
+
+
+def model_dump_json_dumps(batch):
+    return json.dumps([item.model_dump() for item in batch], default=default_serializer)
+
+
+def per_call_ms(statement, count: int) -> float:
+    number = max(1, TOTAL_ITEMS // count)
+    return min(timeit.repeat(statement, number=number, repeat=3)) / number * 1e3
+
+
+def make_item(index: int) -> ProcessedAgentData:
+    # Varying readings, so gzip sees realistic rather than repeated data
+    return ProcessedAgentData.model_validate({
+        "road_state": random.choice(("normal", "normal", "normal", "pothole", "bump")),
+        "agent_data": {
+            "user_id": 1,
+            "accelerometer": {
+                "x": float(random.randint(-300, 300)),
+                "y": float(random.randint(-300, 300)),
+                "z": float(random.randint(16000, 17000)),
+            },
+            "gps": {
+                "latitude": 50.45 + random.random() / 100,
+                "longitude": 30.52 + random.random() / 100,
+            },
+            "timestamp": datetime(2024, 5, 1) + timedelta(milliseconds=100 * index),
+        },
+    })
+
+
+if __name__ == "__main__":
+    random.seed(0)
+
+    print(f"{'items':>6} {'dumps, ms':>10} {'dump_json, ms':>14} {'raw, ms':>8} "
+          f"{'bytes':>9} {'gzip, ms':>9} {'gzip bytes':>11}")
+    for count in BATCH_SIZES:
+        batch = [make_item(index) for index in range(count)]
+        raw_items = [item.model_dump_json().encode() for item in batch]
+        body = PROCESSED_AGENT_DATA_LIST.dump_json(batch)
+        print(
+            f"{count:>6} "
+            f"{per_call_ms(lambda: model_dump_json_dumps(batch), count):>10.3f} "
+            f"{per_call_ms(lambda: PROCESSED_AGENT_DATA_LIST.dump_json(batch), count):>14.3f} "
+            f"{per_call_ms(lambda: store_payload(raw_items, 'json'), count):>8.3f} "
+            f"{len(body):>9} "
+            f"{per_call_ms(lambda: compress(body, 1), count):>9.3f} "
+            f"{len(compress(body, 1)[0]):>11}"
+        )
@@ -0,0 +1,71 @@
+"""
+Size and cost of JSON vs the binary wire format on the hub hops.
+
+edge -> hub:   a message of EDGE_BATCH_SIZE items turned into queue items
+               (JSON is validated and dumped per item, binary is split into records).
+hub -> store:  a request body built from BATCH_SIZE queued items.
+
+Usage (from the hub directory):
+    python -m benchmarks.wire_format
+"""
+import timeit
+from datetime import datetime
+from typing import List
+
+from pydantic import TypeAdapter
+
+from app.adapters.wire_format import encode_record, join_records, split_records, store_payload
+from app.entities.processed_agent_data import ProcessedAgentData
+from config import BATCH_SIZE
+
+EDGE_BATCH_SIZE = 10
+REPEAT = 5000
+
+PROCESSED_AGENT_DATA_LIST = TypeAdapter(List[ProcessedAgentData])
+
+
+def per_call_us(statement) -> float:
+    return min(timeit.repeat(statement, number=REPEAT, repeat=3)) / REPEAT * 1e6
+
+
+def report(hop, json_payload, binary_payload, json_statement, binary_statement):
+    print(hop)
+    print(f"  {'':8} {'bytes':>8} {'us':>10}")
+    print(f"  {'json':8} {len(json_payload):>8} {per_call_us(json_statement):>10.2f}")
+    print(f"  {'binary':8} {len(binary_payload):>8} {per_call_us(binary_statement):>10.2f}")
+
+
+def queue_json(payload: bytes):
+    return [item.model_dump_json() for item in PROCESSED_AGENT_DATA_LIST.validate_json(payload, strict=True)]
+
+
+if __name__ == "__main__":
+    item = ProcessedAgentData.model_validate({
+        "road_state": "normal",
+        "agent_data": {
+            "user_id": 1,
+            "accelerometer": {"x": -17.0, "y": 4.0, "z": 16516.0},
+            "gps": {"latitude": 50.450386085935094, "longitude": 30.524547100067142},
+            "timestamp": datetime.now(),
+        },
+    })
+
+    json_message = PROCESSED_AGENT_DATA_LIST.dump_json([item] * EDGE_BATCH_SIZE)
+    binary_message = join_records([encode_record(item)] * EDGE_BATCH_SIZE)
+    report(
+        f"edge -> hub, decode and queue ({EDGE_BATCH_SIZE} items)",
+        json_message,
+        binary_message,
+        lambda: queue_json(json_message),
+        lambda: split_records(binary_message),
+    )
+
+    json_items = [item.model_dump_json().encode()] * BATCH_SIZE
+    binary_items = [encode_record(item)] * BATCH_SIZE
+    report(
+        f"hub -> store, request body ({BATCH_SIZE} items)",
+        store_payload(json_items, "json")[0],
+        store_payload(binary_items, "binary")[0],
+        lambda: store_payload(json_items, "json"),
+        lambda: store_payload(binary_items, "binary"),
+    )
@@ -12,6 +12,17 @@ def try_parse_int(value: str):
 STORE_API_HOST = os.environ.get("STORE_API_HOST") or "localhost"
 STORE_API_PORT = try_parse_int(os.environ.get("STORE_API_PORT")) or 8000
 STORE_API_BASE_URL = f"http://{STORE_API_HOST}:{STORE_API_PORT}"
+STORE_API_MAX_CONNECTIONS = try_parse_int(os.environ.get("STORE_API_MAX_CONNECTIONS")) or 10
+# "json" or "binary" (compact records, see app/adapters/wire_format.py)
+STORE_WIRE_FORMAT = (os.environ.get("STORE_WIRE_FORMAT") or "json").lower()
+# Store API request bodies of at least this many bytes are sent gzipped (0 disables compression)
+STORE_GZIP_MIN_SIZE = try_parse_int(os.environ.get("STORE_GZIP_MIN_SIZE")) or 0
+# Maximum number of batches forwarded to the Store API at the same time
+STORE_FLUSH_CONCURRENCY = try_parse_int(os.environ.get("STORE_FLUSH_CONCURRENCY")) or 4
+# Batches from MQTT waiting for a flush worker; beyond this they are left for redelivery
+STORE_FLUSH_BACKLOG = try_parse_int(os.environ.get("STORE_FLUSH_BACKLOG")) or 100
+# Seconds to wait for a Store API response
+STORE_API_TIMEOUT = try_parse_int(os.environ.get("STORE_API_TIMEOUT")) or 10
 
 # Configure for Redis
 REDIS_HOST = os.environ.get("REDIS_HOST") or "localhost"
@@ -19,6 +30,15 @@ REDIS_PORT = try_parse_int(os.environ.get("REDIS_PORT")) or 6379
 
 # Configure for hub logic
 BATCH_SIZE = try_parse_int(os.environ.get("BATCH_SIZE")) or 20
+# Reliable delivery: seconds before an unacknowledged batch is redelivered and retry backoff bounds
+INFLIGHT_VISIBILITY_TIMEOUT = try_parse_int(os.environ.get("INFLIGHT_VISIBILITY_TIMEOUT")) or 60
+STORE_RETRY_BASE_DELAY = try_parse_int(os.environ.get("STORE_RETRY_BASE_DELAY")) or 1
+STORE_RETRY_MAX_DELAY = try_parse_int(os.environ.get("STORE_RETRY_MAX_DELAY")) or 60
+STORE_RETRY_POLL_INTERVAL = try_parse_int(os.environ.get("STORE_RETRY_POLL_INTERVAL")) or 1
+# Failed deliveries after which a batch is moved to the dead letters (0 retries forever)
+STORE_RETRY_MAX_ATTEMPTS = try_parse_int(os.environ.get("STORE_RETRY_MAX_ATTEMPTS"))
+if STORE_RETRY_MAX_ATTEMPTS is None:
+    STORE_RETRY_MAX_ATTEMPTS = 20
 
 # MQTT
 MQTT_BROKER_HOST = os.environ.get("MQTT_BROKER_HOST") or "localhost"
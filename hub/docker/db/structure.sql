@@ -1,5 +1,5 @@
 CREATE TABLE processed_agent_data (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     road_state VARCHAR(255) NOT NULL,
     user_id INTEGER NOT NULL,
     x FLOAT,
@@ -7,5 +7,47 @@ CREATE TABLE processed_agent_data (
     z FLOAT,
     latitude FLOAT,
     longitude FLOAT,
-    timestamp TIMESTAMP
-);
\ No newline at end of file
+    timestamp TIMESTAMP NOT NULL,
+    cell BIGINT,
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+-- Monthly partitions are created by the store on startup, rows outside of them land here
+CREATE TABLE processed_agent_data_default PARTITION OF processed_agent_data DEFAULT;
+
+CREATE INDEX ix_processed_agent_data_user_id_timestamp ON processed_agent_data (user_id, timestamp);
+CREATE INDEX ix_processed_agent_data_cell_road_state ON processed_agent_data (cell, road_state);
+CREATE INDEX ix_processed_agent_data_road_events ON processed_agent_data (road_state, timestamp)
+    WHERE road_state IN ('pothole', 'bump');
+
+-- Road defects merged from nearby pothole and bump events
+CREATE TABLE road_defects (
+    id SERIAL PRIMARY KEY,
+    road_state VARCHAR(255) NOT NULL,
+    latitude FLOAT NOT NULL,
+    longitude FLOAT NOT NULL,
+    cell BIGINT NOT NULL,
+    hit_count INTEGER NOT NULL,
+    first_seen TIMESTAMP NOT NULL,
+    last_seen TIMESTAMP NOT NULL
+);
+
+CREATE INDEX ix_road_defects_cell_road_state ON road_defects (cell, road_state);
+
+-- Rollups maintained by the store on insert
+CREATE TABLE user_road_state_hourly (
+    user_id INTEGER NOT NULL,
+    hour TIMESTAMP NOT NULL,
+    road_state VARCHAR(255) NOT NULL,
+    count BIGINT NOT NULL,
+    PRIMARY KEY (user_id, hour, road_state)
+);
+
+CREATE TABLE cell_road_stats (
+    cell BIGINT PRIMARY KEY,
+    total_count BIGINT NOT NULL,
+    defect_count BIGINT NOT NULL,
+    last_seen TIMESTAMP NOT NULL
+);
+
+CREATE INDEX ix_cell_road_stats_defect_count ON cell_road_stats (defect_count);
@@ -1,17 +1,38 @@
+import asyncio
 import logging
-from typing import List
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import List, Union
 
 from fastapi import FastAPI
+from pydantic import TypeAdapter
 from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
 import paho.mqtt.client as mqtt
 
+from app.adapters.async_store_api_adapter import AsyncStoreApiAdapter
+from app.adapters.redis_batch_queue import AsyncRedisBatchQueue, ClaimedBatch, RedisBatchQueue
 from app.adapters.store_api_adapter import StoreApiAdapter
+from app.adapters.wire_format import is_binary, split_records, valid_records
 from app.entities.processed_agent_data import ProcessedAgentData
+from app.interfaces.store_gateway import SaveResult
 from config import (
     STORE_API_BASE_URL,
+    STORE_API_MAX_CONNECTIONS,
+    STORE_WIRE_FORMAT,
+    STORE_GZIP_MIN_SIZE,
+    STORE_FLUSH_CONCURRENCY,
+    STORE_FLUSH_BACKLOG,
+    STORE_API_TIMEOUT,
     REDIS_HOST,
     REDIS_PORT,
     BATCH_SIZE,
+    INFLIGHT_VISIBILITY_TIMEOUT,
+    STORE_RETRY_BASE_DELAY,
+    STORE_RETRY_MAX_DELAY,
+    STORE_RETRY_POLL_INTERVAL,
+    STORE_RETRY_MAX_ATTEMPTS,
     MQTT_TOPIC,
     MQTT_BROKER_HOST,
     MQTT_BROKER_PORT,
@@ -28,31 +49,168 @@ logging.basicConfig(
 )
 # Create an instance of the Redis using the configuration
 redis_client = Redis(host=REDIS_HOST, port=REDIS_PORT)
+# Reliable queue that hands out complete batches of serialized items in one round trip
+BATCH_QUEUE_OPTIONS = dict(
+    key="processed_agent_data",
+    batch_size=BATCH_SIZE,
+    visibility_timeout=INFLIGHT_VISIBILITY_TIMEOUT,
+    retry_base_delay=STORE_RETRY_BASE_DELAY,
+    retry_max_delay=STORE_RETRY_MAX_DELAY,
+    max_attempts=STORE_RETRY_MAX_ATTEMPTS,
+)
+batch_queue = RedisBatchQueue(redis_client, **BATCH_QUEUE_OPTIONS)
 # Create an instance of the StoreApiAdapter using the configuration
-store_adapter = StoreApiAdapter(api_base_url=STORE_API_BASE_URL)
+store_adapter = StoreApiAdapter(
+    api_base_url=STORE_API_BASE_URL,
+    wire_format=STORE_WIRE_FORMAT,
+    gzip_min_size=STORE_GZIP_MIN_SIZE,
+    timeout=STORE_API_TIMEOUT,
+)
+# Batches completed by MQTT messages are forwarded by worker threads, so a slow Store
+# never holds up the paho network thread and its keepalive
+store_flush_executor = ThreadPoolExecutor(max_workers=STORE_FLUSH_CONCURRENCY, thread_name_prefix="store-flush")
+store_flush_slots = threading.BoundedSemaphore(STORE_FLUSH_BACKLOG)
 # Create an instance of the AgentMQTTAdapter using the configuration
 
+
+def log_failed_batch(batch: ClaimedBatch, result: SaveResult, attempts: int = 0):
+    if result is SaveResult.REJECTED:
+        logging.error(f"Batch {batch.batch_id} was rejected by the Store, it is moved to the dead letters")
+    elif batch_queue.is_dead_lettered(attempts):
+        logging.error(f"Batch {batch.batch_id} was not saved in {attempts} attempts, it is moved to the dead letters")
+    else:
+        logging.warning(f"Batch {batch.batch_id} was not saved (attempt {attempts}), it will be retried")
+
+
+def deliver_batch(batch: ClaimedBatch):
+    """Forward a claimed batch to the Store API and settle it in the queue by the outcome."""
+    try:
+        # Time spent in the backlog does not count against the visibility timeout
+        if not batch_queue.start_delivery(batch):
+            logging.info(f"Batch {batch.batch_id} was claimed again or settled meanwhile, skipping it")
+            return
+        try:
+            result = store_adapter.save_raw_data(processed_agent_data_batch=batch.items)
+        except Exception as e:
+            logging.exception(f"Failed to forward batch {batch.batch_id}: {e}")
+            result = SaveResult.FAILED
+        # The batch leaves the in-flight set only once the Store has accepted or rejected it
+        if result is SaveResult.SAVED:
+            batch_queue.ack(batch.batch_id)
+        elif result is SaveResult.REJECTED:
+            batch_queue.dead_letter(batch.batch_id)
+            log_failed_batch(batch, result)
+        else:
+            log_failed_batch(batch, result, batch_queue.retry_later(batch.batch_id))
+    except Exception as e:
+        # Redis failed as well: the batch is redelivered once its visibility timeout passes
+        logging.exception(f"Failed to settle batch {batch.batch_id}: {e}")
+    finally:
+        store_flush_slots.release()
+
+
+def enqueue_processed_agent_data(items: List[Union[str, bytes]]):
+    """
+    Queue serialized items and hand every batch they complete to a flush worker.
+    Runs on the paho network thread, so it only waits for the one Redis call.
+    """
+    for batch in batch_queue.push(items):
+        if not store_flush_slots.acquire(blocking=False):
+            logging.warning(f"Store flush backlog is full, batch {batch.batch_id} is left for redelivery")
+            continue
+        store_flush_executor.submit(deliver_batch, batch)
+
+
 # FastAPI
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Async clients for the endpoint, so it never blocks the event loop
+    async_redis_client = AsyncRedis(host=REDIS_HOST, port=REDIS_PORT)
+    app.state.batch_queue = AsyncRedisBatchQueue(async_redis_client, **BATCH_QUEUE_OPTIONS)
+    app.state.store_adapter = AsyncStoreApiAdapter(
+        api_base_url=STORE_API_BASE_URL,
+        max_connections=STORE_API_MAX_CONNECTIONS,
+        wire_format=STORE_WIRE_FORMAT,
+        gzip_min_size=STORE_GZIP_MIN_SIZE,
+        timeout=STORE_API_TIMEOUT,
+    )
+    # Batches are forwarded in background tasks, at most STORE_FLUSH_CONCURRENCY at a time
+    app.state.flush_semaphore = asyncio.Semaphore(STORE_FLUSH_CONCURRENCY)
+    app.state.flush_tasks = set()
+    redelivery_task = asyncio.create_task(redeliver_expired_batches())
+    yield
+    redelivery_task.cancel()
+    if app.state.flush_tasks:
+        await asyncio.gather(*app.state.flush_tasks, return_exceptions=True)
+    await app.state.store_adapter.close()
+    await async_redis_client.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
+# Batches claimed per Redis call when redelivering
+REDELIVERY_CLAIM_LIMIT = 100
+
+
+async def flush_to_store(batch: ClaimedBatch):
+    queue = app.state.batch_queue
+    try:
+        try:
+            async with app.state.flush_semaphore:
+                # Time spent waiting for the semaphore does not count against the visibility timeout
+                if not await queue.start_delivery(batch):
+                    logging.info(f"Batch {batch.batch_id} was claimed again or settled meanwhile, skipping it")
+                    return
+                result = await app.state.store_adapter.save_raw_data(processed_agent_data_batch=batch.items)
+        except Exception as e:
+            logging.exception(f"Failed to forward batch {batch.batch_id}: {e}")
+            result = SaveResult.FAILED
+        # The batch leaves the in-flight set only once the Store has accepted or rejected it
+        if result is SaveResult.SAVED:
+            await queue.ack(batch.batch_id)
+        elif result is SaveResult.REJECTED:
+            await queue.dead_letter(batch.batch_id)
+            log_failed_batch(batch, result)
+        else:
+            log_failed_batch(batch, result, await queue.retry_later(batch.batch_id))
+    except Exception as e:
+        # Redis failed as well: the batch is redelivered once its visibility timeout passes
+        logging.exception(f"Failed to settle batch {batch.batch_id}: {e}")
+
+
+def schedule_flush_to_store(batch: ClaimedBatch):
+    task = asyncio.create_task(flush_to_store(batch))
+    # Keep a reference until the task is done, so it is not garbage collected
+    app.state.flush_tasks.add(task)
+    task.add_done_callback(app.state.flush_tasks.discard)
+
+
+async def redeliver_expired_batches():
+    """Periodically retry batches that failed or were left unacknowledged by a crashed consumer."""
+    while True:
+        try:
+            # Claim until no batch is due, so recovery after an outage is not capped per poll
+            while True:
+                batches = await app.state.batch_queue.claim_expired(limit=REDELIVERY_CLAIM_LIMIT)
+                for batch in batches:
+                    schedule_flush_to_store(batch)
+                if len(batches) < REDELIVERY_CLAIM_LIMIT:
+                    break
+        except Exception as e:
+            logging.error(f"Failed to redeliver batches: {e}")
+        await asyncio.sleep(STORE_RETRY_POLL_INTERVAL)
 
 
 @app.post("/processed_agent_data/")
 async def save_processed_agent_data(processed_agent_data: ProcessedAgentData):
-    redis_client.lpush("processed_agent_data", processed_agent_data.model_dump_json())
-    if redis_client.llen("processed_agent_data") >= BATCH_SIZE:
-        processed_agent_data_batch: List[ProcessedAgentData] = []
-        for _ in range(BATCH_SIZE):
-            processed_agent_data = ProcessedAgentData.model_validate_json(
-                redis_client.lpop("processed_agent_data")
-            )
-            processed_agent_data_batch.append(processed_agent_data)
-        print(processed_agent_data_batch)
-        store_adapter.save_data(processed_agent_data_batch=processed_agent_data_batch)
+    for batch in await app.state.batch_queue.push([processed_agent_data.model_dump_json()]):
+        schedule_flush_to_store(batch)
     return {"status": "ok"}
 
 
 # MQTT
 client = mqtt.Client()
+# Edge may publish a single item, a JSON array of items or a binary message of records
+PROCESSED_AGENT_DATA_LIST = TypeAdapter(List[ProcessedAgentData])
 
 
 def on_connect(client, userdata, flags, rc):
@@ -67,32 +225,25 @@ def on_message(client, userdata, msg):
     logging.info(f"Received message: {msg.topic} {msg.payload}")
 
     try:
+        # Binary records are queued as they are, without decoding them. Records the Store
+        # would reject are dropped here, so they cannot get a whole batch dead-lettered
+        if is_binary(msg.payload):
+            records = valid_records(split_records(msg.payload))
+            if records:
+                enqueue_processed_agent_data(records)
+            return
+
         payload: str = msg.payload.decode("utf-8")
 
-        # Create ProcessedAgentData instance with the received data
-        processed_agent_data = ProcessedAgentData.model_validate_json(payload, strict=True)
-
-        redis_client.lpush("processed_agent_data", processed_agent_data.model_dump_json())
-
-        if redis_client.llen("processed_agent_data") >= BATCH_SIZE:
-            processed_agent_data_batch: List[ProcessedAgentData] = []
-            temp_items = []
-
-            for _ in range(BATCH_SIZE):
-                item = redis_client.rpop("processed_agent_data")
-                if item:
-                    try:
-                        data = ProcessedAgentData.model_validate_json(item)
-                        processed_agent_data_batch.append(data)
-                        temp_items.append(item)
-                    except Exception as e:
-                        logging.warning(f"Invalid item skipped: {e}")
-
-            if len(processed_agent_data_batch) == BATCH_SIZE:
-                store_adapter.save_data(processed_agent_data_batch=processed_agent_data_batch)
-            else:
-                for item in reversed(temp_items):
-                    redis_client.rpush("processed_agent_data", item)
+        # Create ProcessedAgentData instances with the received data (a single item or a batch)
+        if payload.lstrip().startswith("["):
+            processed_agent_data_list = PROCESSED_AGENT_DATA_LIST.validate_json(payload, strict=True)
+        else:
+            processed_agent_data_list = [ProcessedAgentData.model_validate_json(payload, strict=True)]
+        if not processed_agent_data_list:
+            return
+
+        enqueue_processed_agent_data([item.model_dump_json() for item in processed_agent_data_list])
 
     except Exception as e:
         logging.info(f"Error processing MQTT message: {e}")
@@ -0,0 +1,146 @@
+import asyncio
+import time
+
+import pytest
+
+from app.adapters.redis_batch_queue import AsyncRedisBatchQueue, RedisBatchQueue
+
+fakeredis = pytest.importorskip("fakeredis")
+
+KEY = "processed_agent_data"
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis()
+
+
+def _queue(redis_client, **options):
+    return RedisBatchQueue(redis_client, key=KEY, batch_size=3, **options)
+
+
+def test_push_claims_complete_batches_in_order(redis_client):
+    queue = _queue(redis_client)
+
+    assert queue.push([b"1", b"2"]) == []
+    batches = queue.push([b"3", b"4", b"5", b"6", b"7"])
+
+    assert [batch.items for batch in batches] == [[b"1", b"2", b"3"], [b"4", b"5", b"6"]]
+    assert batches[0].batch_id < batches[1].batch_id
+    assert redis_client.lrange(KEY, 0, -1) == [b"7"]
+    assert redis_client.zcard(f"{KEY}:inflight") == 2
+
+
+def test_ack_forgets_the_batch(redis_client):
+    queue = _queue(redis_client, visibility_timeout=0)
+    batch, = queue.push([b"1", b"2", b"3"])
+
+    queue.ack(batch.batch_id)
+
+    assert queue.claim_expired() == []
+    assert not redis_client.exists(f"{KEY}:inflight:{batch.batch_id}")
+
+
+def test_unacknowledged_batch_is_redelivered_after_visibility_timeout(redis_client):
+    queue = _queue(redis_client, visibility_timeout=0)
+    batch, = queue.push([b"1", b"2", b"3"])
+
+    redelivered, = queue.claim_expired()
+
+    assert redelivered == batch._replace(claim=2)
+
+
+def test_claimed_batch_is_hidden_until_visibility_timeout(redis_client):
+    queue = _queue(redis_client, visibility_timeout=60)
+    queue.push([b"1", b"2", b"3"])
+
+    assert queue.claim_expired() == []
+
+
+def test_retry_later_backs_off_exponentially(redis_client):
+    queue = _queue(redis_client, visibility_timeout=0, retry_base_delay=2, retry_max_delay=5)
+    batch, = queue.push([b"1", b"2", b"3"])
+
+    delays = []
+    for expected_attempts in (1, 2, 3):
+        before = time.time()
+        assert queue.retry_later(batch.batch_id) == expected_attempts
+        delays.append(redis_client.zscore(f"{KEY}:inflight", batch.batch_id) - before)
+
+    assert [round(delay) for delay in delays] == [2, 4, 5]
+    assert queue.claim_expired() == []
+
+
+def test_retry_later_dead_letters_after_max_attempts(redis_client):
+    queue = _queue(redis_client, visibility_timeout=0, retry_base_delay=0, max_attempts=2)
+    batch, = queue.push([b"1", b"2", b"3"])
+
+    assert queue.retry_later(batch.batch_id) == 1
+    assert not queue.is_dead_lettered(1)
+    assert queue.retry_later(batch.batch_id) == 2
+    assert queue.is_dead_lettered(2)
+
+    assert queue.claim_expired() == []
+    assert redis_client.zrange(f"{KEY}:dead", 0, -1) == [str(batch.batch_id).encode()]
+    assert redis_client.lrange(f"{KEY}:dead:{batch.batch_id}", 0, -1) == batch.items
+    assert not redis_client.hexists(f"{KEY}:attempts", batch.batch_id)
+
+
+def test_zero_max_attempts_retries_forever(redis_client):
+    queue = _queue(redis_client, visibility_timeout=0, retry_base_delay=0)
+    batch, = queue.push([b"1", b"2", b"3"])
+
+    for _ in range(50):
+        queue.retry_later(batch.batch_id)
+
+    assert queue.claim_expired() == [batch._replace(claim=2)]
+    assert not queue.is_dead_lettered(50)
+
+
+def test_dead_letter_keeps_rejected_items(redis_client):
+    queue = _queue(redis_client, visibility_timeout=0)
+    batch, = queue.push([b"1", b"2", b"3"])
+
+    queue.dead_letter(batch.batch_id)
+
+    assert queue.claim_expired() == []
+    assert redis_client.lrange(f"{KEY}:dead:{batch.batch_id}", 0, -1) == batch.items
+
+
+def test_start_delivery_restarts_the_visibility_timeout(redis_client):
+    queue = _queue(redis_client, visibility_timeout=60)
+    batch, = queue.push([b"1", b"2", b"3"])
+    # The batch waited for a worker until its deadline had nearly passed
+    redis_client.zadd(f"{KEY}:inflight", {batch.batch_id: time.time() + 1}, xx=True)
+
+    before = time.time()
+    assert queue.start_delivery(batch)
+
+    assert redis_client.zscore(f"{KEY}:inflight", batch.batch_id) - before >= 59
+
+
+def test_stale_claim_is_not_delivered(redis_client):
+    queue = _queue(redis_client, visibility_timeout=0)
+    batch, = queue.push([b"1", b"2", b"3"])
+    redelivered, = queue.claim_expired()
+
+    assert not queue.start_delivery(batch)
+    assert queue.start_delivery(redelivered)
+
+    queue.ack(redelivered.batch_id)
+    assert not queue.start_delivery(redelivered)
+    assert not redis_client.hexists(f"{KEY}:claims", batch.batch_id)
+
+
+def test_async_queue_shares_the_redis_layout():
+    async def scenario():
+        redis_client = fakeredis.aioredis.FakeRedis()
+        queue = AsyncRedisBatchQueue(redis_client, key=KEY, batch_size=2, visibility_timeout=0, max_attempts=1)
+        first, second = await queue.push([b"1", b"2", b"3", b"4"])
+        assert await queue.start_delivery(first)
+        await queue.ack(first.batch_id)
+        assert await queue.retry_later(second.batch_id) == 1
+        assert await queue.claim_expired() == []
+        return await redis_client.lrange(f"{KEY}:dead:{second.batch_id}", 0, -1)
+
+    assert asyncio.run(scenario()) == [b"3", b"4"]
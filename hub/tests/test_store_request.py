@@ -0,0 +1,33 @@
+import gzip
+
+import pytest
+
+from app.adapters.store_request import compress, save_result
+from app.interfaces.store_gateway import SaveResult
+
+
+@pytest.mark.parametrize(
+    "status_code, expected",
+    [
+        (200, SaveResult.SAVED),
+        (400, SaveResult.REJECTED),
+        (413, SaveResult.REJECTED),
+        (422, SaveResult.REJECTED),
+        (408, SaveResult.FAILED),
+        (429, SaveResult.FAILED),
+        (500, SaveResult.FAILED),
+        (503, SaveResult.FAILED),
+    ],
+)
+def test_save_result_tells_rejected_batches_from_transient_failures(status_code, expected):
+    assert save_result(status_code) is expected
+
+
+def test_compress_only_large_bodies():
+    body = b"[" + b",".join([b'{"road_state":"normal"}'] * 100) + b"]"
+
+    assert compress(body, 0) == (body, {})
+    assert compress(body, len(body) + 1) == (body, {})
+    compressed, headers = compress(body, len(body))
+    assert headers == {"Content-Encoding": "gzip"}
+    assert gzip.decompress(compressed) == body
@@ -0,0 +1,99 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.adapters.wire_format import (
+    BINARY_CONTENT_TYPE,
+    JSON_CONTENT_TYPE,
+    PROCESSED_AGENT_DATA_RECORD,
+    decode_record,
+    encode_record,
+    join_records,
+    split_records,
+    store_payload,
+    valid_records,
+    validate_record,
+)
+from app.entities.processed_agent_data import ProcessedAgentData
+
+
+def _item(road_state="pothole", user_id=1, timestamp=datetime(2024, 1, 1, 12, 0, 0, 123456)) -> ProcessedAgentData:
+    return ProcessedAgentData.model_validate({
+        "road_state": road_state,
+        "agent_data": {
+            "user_id": user_id,
+            "accelerometer": {"x": 0.5, "y": -1.25, "z": 16500.0},
+            "gps": {"latitude": 50.45, "longitude": 30.52},
+            "timestamp": timestamp,
+        },
+    })
+
+
+def _document(item: ProcessedAgentData) -> bytes:
+    return item.model_dump_json().encode()
+
+
+@pytest.mark.parametrize("timestamp", [
+    datetime(2024, 1, 1, 12, 0, 0, 123456),
+    datetime(2024, 1, 1, 12, tzinfo=timezone(timedelta(hours=3))),
+    datetime.min,
+    datetime.max,
+])
+def test_record_round_trip(timestamp):
+    item = _item(timestamp=timestamp)
+
+    decoded = decode_record(encode_record(item))
+
+    assert decoded == item
+    assert decoded.agent_data.timestamp.utcoffset() == timestamp.utcoffset()
+
+
+def test_records_are_split_as_they_were_joined():
+    records = [encode_record(_item(user_id=user_id)) for user_id in range(3)]
+
+    assert split_records(join_records(records)) == records
+
+
+def test_binary_payload_mixes_records_and_documents():
+    items = [_item(user_id=1), _item(user_id=2)]
+
+    body, content_type = store_payload([encode_record(items[0]), _document(items[1])], "binary")
+
+    assert content_type == BINARY_CONTENT_TYPE
+    assert [decode_record(record) for record in split_records(body)] == items
+
+
+@pytest.mark.parametrize("item", [_item(user_id=2 ** 31), _item(road_state="speed_bump")])
+def test_batch_without_binary_form_falls_back_to_json(item):
+    other = _item(user_id=2)
+
+    body, content_type = store_payload([_document(item), encode_record(other)], "binary")
+
+    assert content_type == JSON_CONTENT_TYPE
+    assert [ProcessedAgentData.model_validate(document) for document in json.loads(body)] == [item, other]
+
+
+def test_record_with_out_of_range_timestamp_is_dropped_from_json():
+    valid = _item()
+    record = PROCESSED_AGENT_DATA_RECORD.pack(1, 1, 0.0, 0.0, 0.0, 50.45, 30.52, 2 ** 63 - 1, -32768)
+
+    with pytest.raises(ValueError, match="out of range"):
+        decode_record(record)
+    body, content_type = store_payload([record, _document(valid)], "json")
+
+    assert content_type == JSON_CONTENT_TYPE
+    assert [ProcessedAgentData.model_validate(document) for document in json.loads(body)] == [valid]
+
+
+@pytest.mark.parametrize("record, error", [
+    (PROCESSED_AGENT_DATA_RECORD.pack(3, 1, 0.0, 0.0, 0.0, 50.45, 30.52, 0, -32768), "road state"),
+    (PROCESSED_AGENT_DATA_RECORD.pack(1, 1, 0.0, 0.0, 0.0, 50.45, 30.52, -2 ** 63, -32768), "Timestamp"),
+    (PROCESSED_AGENT_DATA_RECORD.pack(1, 1, 0.0, 0.0, 0.0, 50.45, 30.52, 0, 24 * 60), "UTC offset"),
+])
+def test_invalid_records_are_dropped_from_a_message(record, error):
+    valid = [encode_record(_item(user_id=user_id)) for user_id in (1, 2)]
+
+    with pytest.raises(ValueError, match=error):
+        validate_record(record)
+    assert valid_records(split_records(join_records([valid[0], record, valid[1]]))) == valid
@@ -1,4 +1,8 @@
 import os
 
 STORE_HOST = os.environ.get("STORE_HOST") or "localhost"
-STORE_PORT = os.environ.get("STORE_PORT") or 8000
\ No newline at end of file
+STORE_PORT = os.environ.get("STORE_PORT") or 8000
+
+# Seconds between refreshes of the road defect markers, and hits a defect needs to be shown
+ROAD_DEFECTS_POLL_INTERVAL = float(os.environ.get("ROAD_DEFECTS_POLL_INTERVAL") or 5)
+ROAD_DEFECTS_MIN_HIT_COUNT = int(os.environ.get("ROAD_DEFECTS_MIN_HIT_COUNT") or 1)
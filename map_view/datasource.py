@@ -1,10 +1,12 @@
 import asyncio
 import json
+import urllib.parse
+import urllib.request
 from datetime import datetime
 import websockets
 from kivy import Logger
 from pydantic import BaseModel, field_validator
-from config import STORE_HOST, STORE_PORT
+from config import STORE_HOST, STORE_PORT, ROAD_DEFECTS_POLL_INTERVAL, ROAD_DEFECTS_MIN_HIT_COUNT
 
 
 # Pydantic models
@@ -31,13 +33,25 @@ class ProcessedAgentData(BaseModel):
             )
 
 
+class RoadDefect(BaseModel):
+    id: int
+    road_state: str
+    latitude: float
+    longitude: float
+    hit_count: int
+
+
 class Datasource:
     def __init__(self, user_id: int):
         self.index = 0
         self.user_id = user_id
         self.connection_status = None
         self._new_points = []
+        # Road defects merged by the store from the detections of all agents, by id
+        self._road_defects = None
+        self._bbox = None
         asyncio.ensure_future(self.connect_to_server())
+        asyncio.ensure_future(self.poll_road_defects())
 
     def get_new_points(self):
         Logger.debug(self._new_points)
@@ -45,8 +59,45 @@ class Datasource:
         self._new_points = []
         return points
 
+    def set_bbox(self, bbox):
+        """Limit road defects to the visible (min_lat, min_lon, max_lat, max_lon) box."""
+        self._bbox = bbox
+
+    def get_road_defects(self):
+        """Road defects by id if they were refreshed since the last call, None otherwise."""
+        road_defects = self._road_defects
+        self._road_defects = None
+        return road_defects
+
+    def fetch_road_defects(self, bbox):
+        """All pages of GET /road_defects, blocking."""
+        params = {"min_hit_count": ROAD_DEFECTS_MIN_HIT_COUNT, "limit": 1000}
+        if bbox is not None:
+            params.update(zip(("min_lat", "min_lon", "max_lat", "max_lon"), bbox))
+        road_defects = {}
+        while True:
+            url = f"http://{STORE_HOST}:{STORE_PORT}/road_defects/?{urllib.parse.urlencode(params)}"
+            with urllib.request.urlopen(url, timeout=10) as response:
+                next_after_id = response.headers.get("X-Next-After-Id")
+                for item in json.load(response):
+                    road_defect = RoadDefect(**item)
+                    road_defects[road_defect.id] = road_defect
+            if next_after_id is None:
+                return road_defects
+            params["after_id"] = next_after_id
+
+    async def poll_road_defects(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            try:
+                self._road_defects = await loop.run_in_executor(None, self.fetch_road_defects, self._bbox)
+            except Exception as e:
+                Logger.error(f"Error while fetching road defects: {e}")
+            await asyncio.sleep(ROAD_DEFECTS_POLL_INTERVAL)
+
     async def connect_to_server(self):
-        uri = f"ws://{STORE_HOST}:{STORE_PORT}/ws/{self.user_id}"
+        # The map is redrawn once per second, so more frequent updates would only be merged
+        uri = f"ws://{STORE_HOST}:{STORE_PORT}/ws/{self.user_id}?max_rate=1"
         while True:
             try:
                 Logger.debug(f"Connecting to {uri}")
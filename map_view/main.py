@@ -13,6 +13,8 @@ class MapViewApp(App):
         self.datasource = Datasource(user_id=1)
         self.car_marker = None
         self.line_layer = LineMapLayer(coordinates=[], color=[1, 0, 0, 1], width=2)
+        # Markers of the road defects reported by the store, by defect id
+        self.road_defect_markers = {}
 
     def on_start(self):
         """
@@ -27,12 +29,17 @@ class MapViewApp(App):
         Викликається регулярно для оновлення мапи
         """
 
+        self.datasource.set_bbox(self.mapview.get_bbox())
+        road_defects = self.datasource.get_road_defects()
+        if road_defects is not None:
+            self.update_road_defect_markers(road_defects)
+
         new_points = self.datasource.get_new_points()
 
         if not new_points:
             return
 
-        for latitude, longitude, road_state in new_points:
+        for latitude, longitude, _ in new_points:
             if self.car_marker is None:
                 self.car_marker = MapMarker(lat=latitude, lon=longitude, source="images/car.png")
                 self.mapview.add_marker(self.car_marker)
@@ -45,10 +52,29 @@ class MapViewApp(App):
             else:
                 self.line_layer.add_point((latitude, longitude))
 
-            if road_state == "pothole":
-                self.set_pothole_marker((latitude, longitude))
-            elif road_state == "bump":
-                self.set_bump_marker((latitude, longitude))
+    def update_road_defect_markers(self, road_defects):
+        """
+        Показує по одному маркеру на кожен дефект дороги, який store склеїв з виявлень усіх агентів
+        :param road_defects: дефекти дороги за id
+        """
+
+        for defect_id in list(self.road_defect_markers):
+            marker = self.road_defect_markers[defect_id]
+            defect = road_defects.get(defect_id)
+            if defect is None or (marker.lat, marker.lon) != (defect.latitude, defect.longitude):
+                self.mapview.remove_marker(marker)
+                del self.road_defect_markers[defect_id]
+
+        for defect_id, defect in road_defects.items():
+            if defect_id in self.road_defect_markers:
+                continue
+            if defect.road_state == "pothole":
+                marker = self.set_pothole_marker((defect.latitude, defect.longitude))
+            elif defect.road_state == "bump":
+                marker = self.set_bump_marker((defect.latitude, defect.longitude))
+            else:
+                continue
+            self.road_defect_markers[defect_id] = marker
 
     def update_car_marker(self, point):
         """
@@ -63,19 +89,23 @@ class MapViewApp(App):
         """
         Встановлює маркер для ями
         :param point: GPS координати
+        :return: маркер
         """
 
         pothole_marker = MapMarker(lat=point[0], lon=point[1], source="images/pothole.png")
         self.mapview.add_marker(pothole_marker)
+        return pothole_marker
 
     def set_bump_marker(self, point):
         """
         Встановлює маркер для лежачого поліцейського
         :param point: GPS координати
+        :return: маркер
         """
 
         bump_marker = MapMarker(lat=point[0], lon=point[1], source="images/bump.png")
         self.mapview.add_marker(bump_marker)
+        return bump_marker
 
     def build(self):
         """
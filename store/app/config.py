@@ -14,3 +14,41 @@ POSTGRES_PORT = try_parse(int, os.environ.get("POSTGRES_PORT")) or 5432
 POSTGRES_USER = os.environ.get("POSTGRES_USER") or "user"
 POSTGRES_PASSWORD = os.environ.get("POSTGRES_PASS") or "pass"
 POSTGRES_DB = os.environ.get("POSTGRES_DB") or "test_db"
+
+# Connection pool of the database engine
+POSTGRES_POOL_SIZE = try_parse(int, os.environ.get("POSTGRES_POOL_SIZE")) or 10
+POSTGRES_MAX_OVERFLOW = try_parse(int, os.environ.get("POSTGRES_MAX_OVERFLOW")) or 20
+POSTGRES_POOL_RECYCLE = try_parse(int, os.environ.get("POSTGRES_POOL_RECYCLE")) or 1800
+POSTGRES_POOL_PRE_PING = (os.environ.get("POSTGRES_POOL_PRE_PING") or "true").lower() != "false"
+# Number of compiled SQL statements cached by SQLAlchemy
+SQL_STATEMENT_CACHE_SIZE = try_parse(int, os.environ.get("SQL_STATEMENT_CACHE_SIZE")) or 500
+
+# Monthly partitions of processed_agent_data created around the current month,
+# and the number of months kept attached (0 keeps every partition)
+PARTITION_MONTHS_BEHIND = try_parse(int, os.environ.get("PARTITION_MONTHS_BEHIND")) or 1
+PARTITION_MONTHS_AHEAD = try_parse(int, os.environ.get("PARTITION_MONTHS_AHEAD")) or 2
+PARTITION_RETENTION_MONTHS = try_parse(int, os.environ.get("PARTITION_RETENTION_MONTHS")) or 0
+# Seconds between partition maintenance runs
+PARTITION_MAINTENANCE_INTERVAL = try_parse(int, os.environ.get("PARTITION_MAINTENANCE_INTERVAL")) or 3600
+
+# Largest size in bytes a gzip-compressed request body may inflate to
+GZIP_MAX_DECOMPRESSED_SIZE = try_parse(int, os.environ.get("GZIP_MAX_DECOMPRESSED_SIZE")) or 64 * 1024 * 1024
+
+# Size of the grid cells used to index road events by location (0.001 degrees is ~110 m)
+GRID_CELL_DEGREES = try_parse(float, os.environ.get("GRID_CELL_DEGREES")) or 0.001
+
+# Road events closer than this many meters to a known road defect are merged into it.
+# Must stay below the grid cell size, as only the neighbouring cells are searched.
+DEFECT_MERGE_DISTANCE_M = try_parse(float, os.environ.get("DEFECT_MERGE_DISTANCE_M")) or 10.0
+
+# Outgoing WebSocket messages queued per client before the oldest are dropped,
+# and seconds a single send may take before the client is disconnected
+WEBSOCKET_QUEUE_SIZE = try_parse(int, os.environ.get("WEBSOCKET_QUEUE_SIZE")) or 100
+WEBSOCKET_SEND_TIMEOUT = try_parse(float, os.environ.get("WEBSOCKET_SEND_TIMEOUT")) or 5.0
+
+# Backplane that carries WebSocket broadcasts between store workers: "local" for a
+# single worker, "redis" to share them through Redis pub/sub
+BROADCAST_BACKEND = (os.environ.get("BROADCAST_BACKEND") or "local").lower()
+BROADCAST_CHANNEL = os.environ.get("BROADCAST_CHANNEL") or "processed_agent_data"
+REDIS_HOST = os.environ.get("REDIS_HOST") or "localhost"
+REDIS_PORT = try_parse(int, os.environ.get("REDIS_PORT")) or 6379
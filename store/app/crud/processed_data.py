@@ -1,109 +1,240 @@
-from typing import List
+import csv
+import io
+import math
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional
 
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
 from sqlalchemy.sql import select
-from app.models.database import SessionLocal
 from app.models.db_models import processed_agent_data
 from app.models.schemas import ProcessedAgentData
+from app.services.defect_clustering import cluster_road_events, remove_road_events
+from app.services.geo import EARTH_METERS_PER_DEGREE, bbox_around, cell_of, cell_ranges
+from app.services.rollups import remove_from_rollups, update_rollups
 
-def create_data(item: ProcessedAgentData):
-    db = SessionLocal()
-    try:
-        new_row = {
-            "road_state": item.road_state,
-            "user_id": item.agent_data.user_id,
-            "x": item.agent_data.accelerometer.x,
-            "y": item.agent_data.accelerometer.y,
-            "z": item.agent_data.accelerometer.z,
-            "latitude": item.agent_data.gps.latitude,
-            "longitude": item.agent_data.gps.longitude,
-            "timestamp": item.agent_data.timestamp,
-        }
-        result = db.execute(processed_agent_data.insert().values(**new_row))
-        db.commit()
-        new_row["id"] = result.inserted_primary_key[0]
-        return new_row
-    finally:
-        db.close()
+def _naive_utc(timestamp: datetime) -> datetime:
+    """
+    Timestamp for the TIMESTAMP columns: aware timestamps are converted to UTC,
+    naive ones are taken as UTC already. Rows of a batch may mix both.
+    """
+    if timestamp.tzinfo is None:
+        return timestamp
+    return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
 
-def create_data_batch(items: List[ProcessedAgentData]):
-    db = SessionLocal()
-    try:
-        new_rows = []
-        for item in items:
-            new_rows.append({
-                "road_state": item.road_state,
-                "user_id": item.agent_data.user_id,
-                "x": item.agent_data.accelerometer.x,
-                "y": item.agent_data.accelerometer.y,
-                "z": item.agent_data.accelerometer.z,
-                "latitude": item.agent_data.gps.latitude,
-                "longitude": item.agent_data.gps.longitude,
-                "timestamp": item.agent_data.timestamp,
-            })
-
-        result = db.execute(processed_agent_data.insert().returning(processed_agent_data), new_rows)
-        db.commit()
-
-        return result.mappings().all()
-    finally:
-        db.close()
+def _to_row(item: ProcessedAgentData) -> dict:
+    return {
+        "road_state": item.road_state,
+        "user_id": item.agent_data.user_id,
+        "x": item.agent_data.accelerometer.x,
+        "y": item.agent_data.accelerometer.y,
+        "z": item.agent_data.accelerometer.z,
+        "latitude": item.agent_data.gps.latitude,
+        "longitude": item.agent_data.gps.longitude,
+        "timestamp": _naive_utc(item.agent_data.timestamp),
+        "cell": cell_of(item.agent_data.gps.latitude, item.agent_data.gps.longitude),
+    }
 
+def _after_insert(db: Session, rows: List[dict]):
+    """Keep the tables derived from processed_agent_data in step within the insert transaction."""
+    cluster_road_events(db, rows)
+    update_rollups(db, rows)
 
-def get_data_by_id(data_id: int):
-    db = SessionLocal()
-    try:
-        query = select(processed_agent_data).where(processed_agent_data.c.id == data_id)
-        result = db.execute(query).mappings().fetchone()
-        return result
-    finally:
-        db.close()
+def _after_delete(db: Session, rows: List[dict]):
+    """Take the previous values of updated or deleted rows out of the derived tables."""
+    remove_road_events(db, rows)
+    remove_from_rollups(db, rows)
 
+def create_data(db: Session, item: ProcessedAgentData):
+    new_row = _to_row(item)
+    result = db.execute(processed_agent_data.insert().values(**new_row))
+    _after_insert(db, [new_row])
+    db.commit()
+    new_row["id"] = result.inserted_primary_key[0]
+    return new_row
 
-def list_data():
-    db = SessionLocal()
-    try:
-        results = db.execute(select(processed_agent_data)).mappings().all()
-        return results
-    finally:
-        db.close()
+def create_data_batch(db: Session, items: List[ProcessedAgentData]):
+    new_rows = [_to_row(item) for item in items]
 
+    result = db.execute(processed_agent_data.insert().returning(processed_agent_data), new_rows)
+    created = result.mappings().all()
+    _after_insert(db, new_rows)
+    db.commit()
 
-def update_data(data_id: int, item: ProcessedAgentData):
-    db = SessionLocal()
-    try:
-        update_stmt = (
-            processed_agent_data.update()
-            .where(processed_agent_data.c.id == data_id)
-            .values(
-                road_state=item.road_state,
-                user_id=item.agent_data.user_id,
-                x=item.agent_data.accelerometer.x,
-                y=item.agent_data.accelerometer.y,
-                z=item.agent_data.accelerometer.z,
-                latitude=item.agent_data.gps.latitude,
-                longitude=item.agent_data.gps.longitude,
-                timestamp=item.agent_data.timestamp,
-            )
-            .returning(processed_agent_data)
+    return created
+
+
+# Column order of the rows streamed by COPY
+COPY_COLUMNS = ("road_state", "user_id", "x", "y", "z", "latitude", "longitude", "timestamp", "cell")
+
+
+class _CsvRowStream(io.TextIOBase):
+    """File-like object that renders rows as CSV lines only when COPY reads them."""
+
+    def __init__(self, rows: Iterable[dict], chunk_rows: int = 1000):
+        self._rows = iter(rows)
+        self._chunk_rows = chunk_rows
+        self._buffer = ""
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            chunk = self._render_chunk()
+            if not chunk:
+                break
+            self._buffer += chunk
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def _render_chunk(self) -> str:
+        output = io.StringIO()
+        writer = csv.writer(output, lineterminator="\n")
+        writer.writerows(
+            [row[column] for column in COPY_COLUMNS]
+            for row in islice(self._rows, self._chunk_rows)
         )
-        result = db.execute(update_stmt).mappings().fetchone()
-        db.commit()
-        return result
-    finally:
-        db.close()
+        return output.getvalue()
 
 
-def delete_data(data_id: int):
-    db = SessionLocal()
+def copy_data_batch(db: Session, items: List[ProcessedAgentData]) -> int:
+    """
+    Insert a large batch with PostgreSQL COPY FROM STDIN.
+    Rows are streamed as they are rendered, and generated ids are not returned.
+    """
+    new_rows = [_to_row(item) for item in items]
+    cursor = db.connection().connection.cursor()
     try:
-        delete_stmt = (
-            processed_agent_data.delete()
-            .where(processed_agent_data.c.id == data_id)
-            .returning(processed_agent_data)
+        cursor.copy_expert(
+            f"COPY {processed_agent_data.name} ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            _CsvRowStream(new_rows),
         )
-        result = db.execute(delete_stmt).mappings().fetchone()
-        db.commit()
-        return result
     finally:
-        db.close()
+        cursor.close()
+    _after_insert(db, new_rows)
+    db.commit()
+    return len(new_rows)
+
+
+def get_data_by_id(db: Session, data_id: int):
+    query = select(processed_agent_data).where(processed_agent_data.c.id == data_id)
+    return db.execute(query).mappings().fetchone()
+
+
+def _filter_data(
+    query,
+    user_id: Optional[int] = None,
+    road_state: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    if user_id is not None:
+        query = query.where(processed_agent_data.c.user_id == user_id)
+    if road_state is not None:
+        query = query.where(processed_agent_data.c.road_state == road_state)
+    if since is not None:
+        query = query.where(processed_agent_data.c.timestamp >= since)
+    if until is not None:
+        query = query.where(processed_agent_data.c.timestamp < until)
+    return query
+
+
+def list_data(db: Session, after_id: Optional[int] = None, limit: int = 1000, **filters):
+    """One page of rows ordered by id, starting after the `after_id` cursor."""
+    query = _filter_data(select(processed_agent_data), **filters)
+    if after_id is not None:
+        query = query.where(processed_agent_data.c.id > after_id)
+    query = query.order_by(processed_agent_data.c.id).limit(limit)
+    return db.execute(query).mappings().all()
+
+
+def iter_data(db: Session, chunk_size: int = 1000, **filters) -> Iterator:
+    """All matching rows ordered by id, fetched from a server-side cursor in chunks."""
+    query = _filter_data(select(processed_agent_data), **filters).order_by(processed_agent_data.c.id)
+    result = db.execute(query, execution_options={"yield_per": chunk_size})
+    for rows in result.mappings().partitions():
+        yield from rows
+
+
+def _in_bbox(query, min_latitude, min_longitude, max_latitude, max_longitude):
+    table = processed_agent_data.c
+    ranges = cell_ranges(min_latitude, min_longitude, max_latitude, max_longitude)
+    if ranges is not None:
+        # Narrow down by the indexed grid cells first, the exact box check below drops the cell margins
+        query = query.where(or_(*(table.cell.between(first, last) for first, last in ranges)))
+    return query.where(
+        table.latitude.between(min_latitude, max_latitude),
+        table.longitude.between(min_longitude, max_longitude),
+    )
+
+
+def list_data_in_area(
+    db: Session,
+    min_latitude: float,
+    min_longitude: float,
+    max_latitude: float,
+    max_longitude: float,
+    limit: int = 1000,
+    **filters,
+):
+    """Rows located inside the bounding box, ordered by id."""
+    query = _in_bbox(select(processed_agent_data), min_latitude, min_longitude, max_latitude, max_longitude)
+    query = _filter_data(query, **filters).order_by(processed_agent_data.c.id).limit(limit)
+    return db.execute(query).mappings().all()
+
+
+def list_data_nearby(
+    db: Session, latitude: float, longitude: float, radius_m: float, limit: int = 1000, **filters
+):
+    """Rows within `radius_m` meters of the point, nearest first."""
+    table = processed_agent_data.c
+    # Equirectangular approximation, accurate enough for radiuses of up to tens of kilometers
+    north = (table.latitude - latitude) * EARTH_METERS_PER_DEGREE
+    east = (table.longitude - longitude) * EARTH_METERS_PER_DEGREE * math.cos(math.radians(latitude))
+    squared_distance = north * north + east * east
+    query = _in_bbox(select(processed_agent_data), *bbox_around(latitude, longitude, radius_m))
+    query = (
+        _filter_data(query, **filters)
+        .where(squared_distance <= radius_m * radius_m)
+        .order_by(squared_distance)
+        .limit(limit)
+    )
+    return db.execute(query).mappings().all()
+
+
+def update_data(db: Session, data_id: int, item: ProcessedAgentData):
+    query = select(processed_agent_data).where(processed_agent_data.c.id == data_id).with_for_update()
+    previous = db.execute(query).mappings().fetchone()
+    if previous is None:
+        db.rollback()
+        return None
+    new_row = _to_row(item)
+    update_stmt = (
+        processed_agent_data.update()
+        .where(processed_agent_data.c.id == data_id)
+        .values(**new_row)
+        .returning(processed_agent_data)
+    )
+    result = db.execute(update_stmt).mappings().fetchone()
+    # The previous values leave the road defects and rollups they were counted in, the new ones are added again
+    _after_delete(db, [dict(previous)])
+    _after_insert(db, [new_row])
+    db.commit()
+    return result
+
 
+def delete_data(db: Session, data_id: int):
+    delete_stmt = (
+        processed_agent_data.delete()
+        .where(processed_agent_data.c.id == data_id)
+        .returning(processed_agent_data)
+    )
+    result = db.execute(delete_stmt).mappings().fetchone()
+    if result is not None:
+        _after_delete(db, [dict(result)])
+    db.commit()
+    return result
@@ -0,0 +1,72 @@
+from typing import Optional
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import select
+from app.models.db_models import processed_agent_data, road_defects
+from app.services.defect_clustering import CLUSTERING_LOCK_KEY, DEFECT_ROAD_STATES, cluster_road_events
+from app.services.geo import cell_ranges
+
+
+def get_defect_by_id(db: Session, defect_id: int):
+    query = select(road_defects).where(road_defects.c.id == defect_id)
+    return db.execute(query).mappings().fetchone()
+
+
+def list_defects(
+    db: Session,
+    after_id: Optional[int] = None,
+    limit: int = 1000,
+    road_state: Optional[str] = None,
+    min_hit_count: Optional[int] = None,
+    bbox: Optional[tuple] = None,
+):
+    """
+    One page of road defects ordered by id, starting after the `after_id` cursor.
+    `bbox` is a (min_lat, min_lon, max_lat, max_lon) tuple.
+    """
+    table = road_defects.c
+    query = select(road_defects)
+    if road_state is not None:
+        query = query.where(table.road_state == road_state)
+    if min_hit_count is not None:
+        query = query.where(table.hit_count >= min_hit_count)
+    if bbox is not None:
+        min_latitude, min_longitude, max_latitude, max_longitude = bbox
+        ranges = cell_ranges(min_latitude, min_longitude, max_latitude, max_longitude)
+        if ranges is not None:
+            query = query.where(or_(*(table.cell.between(first, last) for first, last in ranges)))
+        query = query.where(
+            table.latitude.between(min_latitude, max_latitude),
+            table.longitude.between(min_longitude, max_longitude),
+        )
+    if after_id is not None:
+        query = query.where(table.id > after_id)
+    query = query.order_by(table.id).limit(limit)
+    return db.execute(query).mappings().all()
+
+
+def rebuild_defects(db: Session, chunk_size: int = 10000) -> int:
+    """
+    Recluster every stored pothole and bump event from scratch in one transaction.
+    Returns the number of clustered events.
+    """
+    # Concurrent inserts must not cluster into defects between the wipe and the rebuild
+    db.execute(select(func.pg_advisory_xact_lock(CLUSTERING_LOCK_KEY)))
+    db.execute(road_defects.delete())
+    query = (
+        select(
+            processed_agent_data.c.road_state,
+            processed_agent_data.c.latitude,
+            processed_agent_data.c.longitude,
+            processed_agent_data.c.timestamp,
+        )
+        .where(processed_agent_data.c.road_state.in_(DEFECT_ROAD_STATES))
+        .order_by(processed_agent_data.c.timestamp)
+    )
+    clustered = 0
+    result = db.execute(query, execution_options={"yield_per": chunk_size})
+    for rows in result.mappings().partitions():
+        clustered += cluster_road_events(db, rows)
+    db.commit()
+    return clustered
@@ -0,0 +1,104 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import func, or_, text
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import select
+from app.models.db_models import cell_road_stats, processed_agent_data, user_road_state_hourly
+from app.services.defect_clustering import DEFECT_ROAD_STATES
+from app.services.geo import cell_center, cell_ranges
+
+
+def _in_hours(query, since: Optional[datetime], until: Optional[datetime]):
+    # Rollups have an hourly granularity, so the bounds select whole hours
+    if since is not None:
+        query = query.where(user_road_state_hourly.c.hour >= since.replace(minute=0, second=0, microsecond=0))
+    if until is not None:
+        query = query.where(user_road_state_hourly.c.hour < until)
+    return query
+
+
+def user_road_state_counts(
+    db: Session, user_id: int, since: Optional[datetime] = None, until: Optional[datetime] = None
+):
+    """Number of rows of each road state recorded for the user."""
+    table = user_road_state_hourly.c
+    query = select(table.road_state, func.sum(table.count).label("count")).where(table.user_id == user_id)
+    query = _in_hours(query, since, until).group_by(table.road_state).order_by(table.road_state)
+    return db.execute(query).mappings().all()
+
+
+def user_hourly_counts(
+    db: Session,
+    user_id: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    road_state: Optional[str] = None,
+    limit: int = 1000,
+):
+    """Hourly number of rows of each road state recorded for the user, oldest first."""
+    table = user_road_state_hourly.c
+    query = select(table.hour, table.road_state, table.count).where(table.user_id == user_id)
+    if road_state is not None:
+        query = query.where(table.road_state == road_state)
+    query = _in_hours(query, since, until).order_by(table.hour, table.road_state).limit(limit)
+    return db.execute(query).mappings().all()
+
+
+def worst_cells(db: Session, limit: int = 20, min_total_count: int = 1, bbox: Optional[tuple] = None):
+    """
+    Grid cells with the most pothole and bump rows, together with their defect density.
+    `bbox` is a (min_lat, min_lon, max_lat, max_lon) tuple.
+    """
+    table = cell_road_stats.c
+    query = select(cell_road_stats).where(table.defect_count > 0, table.total_count >= min_total_count)
+    if bbox is not None:
+        ranges = cell_ranges(*bbox)
+        if ranges is not None:
+            query = query.where(or_(*(table.cell.between(first, last) for first, last in ranges)))
+    query = query.order_by(table.defect_count.desc(), table.cell).limit(limit)
+
+    cells = []
+    for row in db.execute(query).mappings():
+        latitude, longitude = cell_center(row["cell"])
+        cells.append({
+            **row,
+            "latitude": latitude,
+            "longitude": longitude,
+            "defect_density": row["defect_count"] / row["total_count"],
+        })
+    return cells
+
+
+def rebuild_stats(db: Session) -> dict:
+    """
+    Recompute the rollups from processed_agent_data in one transaction.
+    Concurrent inserts wait until the rebuild commits and are then added on top.
+    """
+    db.execute(text(f"LOCK TABLE {user_road_state_hourly.name}, {cell_road_stats.name} IN EXCLUSIVE MODE"))
+    db.execute(user_road_state_hourly.delete())
+    db.execute(cell_road_stats.delete())
+
+    data = processed_agent_data.c
+    hour = func.date_trunc("hour", data.timestamp)
+    user_hours = db.execute(
+        user_road_state_hourly.insert().from_select(
+            ["user_id", "hour", "road_state", "count"],
+            select(data.user_id, hour, data.road_state, func.count()).group_by(data.user_id, hour, data.road_state),
+        )
+    ).rowcount
+    cells = db.execute(
+        cell_road_stats.insert().from_select(
+            ["cell", "total_count", "defect_count", "last_seen"],
+            select(
+                data.cell,
+                func.count(),
+                func.count().filter(data.road_state.in_(DEFECT_ROAD_STATES)),
+                func.max(data.timestamp),
+            )
+            .where(data.cell.is_not(None))
+            .group_by(data.cell),
+        )
+    ).rowcount
+    db.commit()
+    return {"user_hours": user_hours, "cells": cells}
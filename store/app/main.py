@@ -1,21 +1,105 @@
-from fastapi import FastAPI, WebSocket
-from app.routers import processed_data
-from app.services.websocket_manager import websocket_endpoint
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI, WebSocket
+from redis.asyncio import Redis
+from starlette.concurrency import run_in_threadpool
+from app.config import (
+    BROADCAST_BACKEND,
+    BROADCAST_CHANNEL,
+    REDIS_HOST,
+    REDIS_PORT,
+    PARTITION_MONTHS_BEHIND,
+    PARTITION_MONTHS_AHEAD,
+    PARTITION_RETENTION_MONTHS,
+    PARTITION_MAINTENANCE_INTERVAL,
+    GZIP_MAX_DECOMPRESSED_SIZE,
+)
+from app.routers import processed_data, road_defects, stats
+from app.services.broadcast_backplane import LocalBackplane, RedisBackplane
+from app.services.request_decompression import GzipRequestMiddleware
+from app.services.websocket_manager import (
+    SubscriptionOptions,
+    broadcaster,
+    subscription_options,
+    websocket_endpoint,
+)
 from app.models.database import metadata, engine
+from app.models.migrations import run_backfill_cells, upgrade_schema
+from app.models.partitions import maintain_partitions
+
+
+async def run_partition_maintenance():
+    await run_in_threadpool(
+        maintain_partitions,
+        engine,
+        PARTITION_MONTHS_BEHIND,
+        PARTITION_MONTHS_AHEAD,
+        PARTITION_RETENTION_MONTHS,
+    )
+
+
+async def run_partition_maintenance_periodically():
+    """Keep monthly partitions ahead of the clock and detach expired ones."""
+    while True:
+        await asyncio.sleep(PARTITION_MAINTENANCE_INTERVAL)
+        try:
+            await run_partition_maintenance()
+        except Exception as e:
+            logging.error(f"Partition maintenance failed: {e}")
+
+
+def create_backplane():
+    if BROADCAST_BACKEND == "redis":
+        return RedisBackplane(Redis(host=REDIS_HOST, port=REDIS_PORT), BROADCAST_CHANNEL)
+    if BROADCAST_BACKEND != "local":
+        logging.warning(f"Unknown broadcast backend {BROADCAST_BACKEND!r}, using local")
+    return LocalBackplane()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Tables created by an older version get their new columns before any query uses them.
+    # Their rows get a grid cell in the background, until then area queries may miss them
+    await run_in_threadpool(upgrade_schema, engine)
+    backfill_stop = threading.Event()
+    backfill_thread = threading.Thread(
+        target=run_backfill_cells, args=(engine, backfill_stop), name="backfill-cells", daemon=True
+    )
+    backfill_thread.start()
+    # Partitions must exist before the first insert is accepted
+    await run_partition_maintenance()
+    maintenance_task = asyncio.create_task(run_partition_maintenance_periodically())
+    await broadcaster.start(create_backplane())
+    yield
+    await broadcaster.stop()
+    maintenance_task.cancel()
+    backfill_stop.set()
+
 
 app = FastAPI(
     title="Road Vision Store API",
+    lifespan=lifespan,
 )
 
+# Accept request bodies compressed with Content-Encoding: gzip
+app.add_middleware(GzipRequestMiddleware, max_size=GZIP_MAX_DECOMPRESSED_SIZE)
+
 # Create tables if not exists
 metadata.create_all(bind=engine)
 
 # Include API routes
 app.include_router(processed_data.router, prefix="/processed_agent_data", tags=["processed_agent_data"])
+app.include_router(road_defects.router, prefix="/road_defects", tags=["road_defects"])
+app.include_router(stats.router, prefix="/stats", tags=["stats"])
 
 @app.websocket("/ws/{user_id}")
-async def websocket(user_id: int, websocket: WebSocket):
-    await websocket_endpoint(websocket, user_id)
+async def websocket(
+    user_id: int, websocket: WebSocket, options: SubscriptionOptions = Depends(subscription_options)
+):
+    await websocket_endpoint(websocket, user_id, options)
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,9 +1,36 @@
 from sqlalchemy import create_engine, MetaData
 from sqlalchemy.orm import sessionmaker
-from app.config import POSTGRES_USER, POSTGRES_PASSWORD, POSTGRES_HOST, POSTGRES_PORT, POSTGRES_DB
+from app.config import (
+    POSTGRES_USER,
+    POSTGRES_PASSWORD,
+    POSTGRES_HOST,
+    POSTGRES_PORT,
+    POSTGRES_DB,
+    POSTGRES_POOL_SIZE,
+    POSTGRES_MAX_OVERFLOW,
+    POSTGRES_POOL_RECYCLE,
+    POSTGRES_POOL_PRE_PING,
+    SQL_STATEMENT_CACHE_SIZE,
+)
 
 DATABASE_URL = f"postgresql+psycopg2://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 
-engine = create_engine(DATABASE_URL)
+engine = create_engine(
+    DATABASE_URL,
+    pool_size=POSTGRES_POOL_SIZE,
+    max_overflow=POSTGRES_MAX_OVERFLOW,
+    pool_recycle=POSTGRES_POOL_RECYCLE,
+    pool_pre_ping=POSTGRES_POOL_PRE_PING,
+    query_cache_size=SQL_STATEMENT_CACHE_SIZE,
+)
 SessionLocal = sessionmaker(bind=engine)
 metadata = MetaData()
+
+
+def get_db():
+    """Request-scoped database session, returned to the pool when the request is done."""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
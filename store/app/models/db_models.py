@@ -1,10 +1,11 @@
-from sqlalchemy import Table, Column, Integer, String, Float, DateTime
+from sqlalchemy import Table, Column, Integer, BigInteger, String, Float, DateTime, Index, text
 from .database import metadata
 
 processed_agent_data = Table(
     "processed_agent_data",
     metadata,
-    Column("id", Integer, primary_key=True, index=True),
+    # The partition key must be part of the primary key of a partitioned table
+    Column("id", Integer, primary_key=True, autoincrement=True),
     Column("road_state", String),
     Column("user_id", Integer),
     Column("x", Float),
@@ -12,5 +13,51 @@ processed_agent_data = Table(
     Column("z", Float),
     Column("latitude", Float),
     Column("longitude", Float),
-    Column("timestamp", DateTime),
+    Column("timestamp", DateTime, primary_key=True),
+    # Grid cell of the location, see app.services.geo
+    Column("cell", BigInteger),
+    Index("ix_processed_agent_data_user_id_timestamp", "user_id", "timestamp"),
+    Index("ix_processed_agent_data_cell_road_state", "cell", "road_state"),
+    Index(
+        "ix_processed_agent_data_road_events",
+        "road_state",
+        "timestamp",
+        postgresql_where=text("road_state IN ('pothole', 'bump')"),
+    ),
+    postgresql_partition_by="RANGE (timestamp)",
+)
+
+# Road defects merged from nearby pothole and bump events, see app.services.defect_clustering
+road_defects = Table(
+    "road_defects",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("road_state", String),
+    Column("latitude", Float),
+    Column("longitude", Float),
+    Column("cell", BigInteger),
+    Column("hit_count", Integer),
+    Column("first_seen", DateTime),
+    Column("last_seen", DateTime),
+    Index("ix_road_defects_cell_road_state", "cell", "road_state"),
+)
+
+# Rollups maintained on insert, see app.services.rollups
+user_road_state_hourly = Table(
+    "user_road_state_hourly",
+    metadata,
+    Column("user_id", Integer, primary_key=True),
+    Column("hour", DateTime, primary_key=True),
+    Column("road_state", String, primary_key=True),
+    Column("count", BigInteger),
+)
+
+cell_road_stats = Table(
+    "cell_road_stats",
+    metadata,
+    Column("cell", BigInteger, primary_key=True),
+    Column("total_count", BigInteger),
+    Column("defect_count", BigInteger),
+    Column("last_seen", DateTime),
+    Index("ix_cell_road_stats_defect_count", "defect_count"),
 )
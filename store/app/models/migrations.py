@@ -0,0 +1,67 @@
+import logging
+import threading
+from typing import Optional
+
+from sqlalchemy import bindparam, func, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateIndex
+
+from app.models.db_models import processed_agent_data
+from app.services.geo import cell_expression
+
+
+def backfill_cells(engine: Engine, chunk_size: int = 10000, stop: Optional[threading.Event] = None) -> int:
+    """
+    Compute the grid cell of rows stored without one, walking the table by id
+    `chunk_size` rows per transaction, so every row is visited once.
+    Returns the number of updated rows; stops early once `stop` is set.
+    """
+    table = processed_agent_data.c
+    chunk = select(table.id).where(table.id > bindparam("after_id")).order_by(table.id).limit(chunk_size).subquery()
+    last_id = select(func.max(chunk.c.id))
+    statement = (
+        processed_agent_data.update()
+        .where(
+            table.id > bindparam("after_id"),
+            table.id <= bindparam("last_id"),
+            table.cell.is_(None),
+            table.latitude.is_not(None),
+            table.longitude.is_not(None),
+        )
+        .values(cell=cell_expression(table.latitude, table.longitude))
+    )
+    updated = 0
+    after_id = 0
+    while stop is None or not stop.is_set():
+        with engine.begin() as connection:
+            chunk_last_id = connection.execute(last_id, {"after_id": after_id}).scalar()
+            if chunk_last_id is None:
+                break
+            updated += connection.execute(statement, {"after_id": after_id, "last_id": chunk_last_id}).rowcount
+        after_id = chunk_last_id
+    return updated
+
+
+def upgrade_schema(engine: Engine):
+    """
+    Bring a processed_agent_data table created by an older version up to date:
+    add the cell column and every index of the table definition it lacks, since
+    create_all skips tables that exist. Tables that are already up to date are left
+    as they are. The cell of existing rows is filled in by backfill_cells.
+    """
+    name = processed_agent_data.name
+    with engine.begin() as connection:
+        connection.execute(text(f"ALTER TABLE {name} ADD COLUMN IF NOT EXISTS cell BIGINT"))
+        for index in sorted(processed_agent_data.indexes, key=lambda index: index.name):
+            connection.execute(CreateIndex(index, if_not_exists=True))
+
+
+def run_backfill_cells(engine: Engine, stop: Optional[threading.Event] = None):
+    """Backfill meant for a background thread, so the Store serves requests meanwhile."""
+    try:
+        updated = backfill_cells(engine, stop=stop)
+    except Exception as e:
+        logging.error(f"Backfilling grid cells failed: {e}")
+        return
+    if updated:
+        logging.info(f"Backfilled the grid cell of {updated} rows of {processed_agent_data.name}")
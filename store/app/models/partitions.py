@@ -0,0 +1,100 @@
+import logging
+import re
+from datetime import date
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+
+from app.models.db_models import processed_agent_data
+
+PARTITION_NAME_PATTERN = re.compile(rf"^{processed_agent_data.name}_(\d{{4}})_(\d{{2}})$")
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{processed_agent_data.name}_{month:%Y_%m}"
+
+
+def is_partitioned(engine: Engine) -> bool:
+    """Whether processed_agent_data was created as a partitioned table."""
+    query = text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :name"
+    )
+    with engine.connect() as connection:
+        return connection.execute(query, {"name": processed_agent_data.name}).first() is not None
+
+
+def ensure_partitions(engine: Engine, months_behind: int, months_ahead: int, today: date = None):
+    """
+    Create the default partition and monthly range partitions around the current month.
+    Rows outside of the created months go to the default partition.
+    """
+    current = (today or date.today()).replace(day=1)
+    table = processed_agent_data.name
+    with engine.begin() as connection:
+        connection.execute(text(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"))
+
+    for offset in range(-months_behind, months_ahead + 1):
+        month = _add_months(current, offset)
+        statement = text(
+            f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+        )
+        try:
+            with engine.begin() as connection:
+                connection.execute(statement)
+        except DBAPIError as e:
+            # The default partition already holds rows of this month
+            logging.warning(f"Failed to create partition {partition_name(month)}: {e.orig}")
+
+
+def list_partitions(engine: Engine) -> List[date]:
+    """Months of the attached monthly partitions, oldest first."""
+    query = text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :name"
+    )
+    with engine.connect() as connection:
+        names = connection.execute(query, {"name": processed_agent_data.name}).scalars().all()
+
+    months = []
+    for name in names:
+        match = PARTITION_NAME_PATTERN.match(name)
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+def detach_partitions_older_than(engine: Engine, retention_months: int, today: date = None) -> List[str]:
+    """
+    Detach monthly partitions older than `retention_months` months.
+    Detached partitions stay as standalone tables, ready to be archived or dropped.
+    """
+    cutoff = _add_months((today or date.today()).replace(day=1), -retention_months)
+    detached = []
+    for month in list_partitions(engine):
+        if month >= cutoff:
+            break
+        name = partition_name(month)
+        with engine.begin() as connection:
+            connection.execute(text(f"ALTER TABLE {processed_agent_data.name} DETACH PARTITION {name}"))
+        logging.info(f"Detached partition {name}")
+        detached.append(name)
+    return detached
+
+
+def maintain_partitions(engine: Engine, months_behind: int, months_ahead: int, retention_months: int):
+    """Create upcoming partitions and detach expired ones (retention of 0 keeps everything)."""
+    if not is_partitioned(engine):
+        logging.warning(f"{processed_agent_data.name} is not partitioned, skipping partition maintenance")
+        return
+    ensure_partitions(engine, months_behind, months_ahead)
+    if retention_months > 0:
+        detach_partitions_older_than(engine, retention_months)
@@ -40,3 +40,40 @@ class ProcessedAgentDataInDB(BaseModel):
     latitude: float
     longitude: float
     timestamp: datetime
+
+class BulkInsertResult(BaseModel):
+    inserted: int
+
+class RoadDefect(BaseModel):
+    id: int
+    road_state: str
+    latitude: float
+    longitude: float
+    hit_count: int
+    first_seen: datetime
+    last_seen: datetime
+
+class RebuildDefectsResult(BaseModel):
+    clustered: int
+
+class RoadStateCount(BaseModel):
+    road_state: str
+    count: int
+
+class HourlyRoadStateCount(BaseModel):
+    hour: datetime
+    road_state: str
+    count: int
+
+class CellStats(BaseModel):
+    cell: int
+    latitude: float
+    longitude: float
+    total_count: int
+    defect_count: int
+    defect_density: float
+    last_seen: datetime
+
+class RebuildStatsResult(BaseModel):
+    user_hours: int
+    cells: int
@@ -1,12 +1,92 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
-from app.models.schemas import ProcessedAgentData, ProcessedAgentDataInDB
+import csv
+import io
+import json
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from typing import Iterator, List, Optional
+from app.models.database import SessionLocal, get_db
+from app.models.schemas import BulkInsertResult, ProcessedAgentData, ProcessedAgentDataInDB
 from app.crud import processed_data as crud
 from app.services.websocket_manager import send_data_to_subscribers
+from app.services.wire_format import BINARY_CONTENT_TYPE, decode_processed_agent_data
 from collections import defaultdict
 
 router = APIRouter(tags=["Processed Agent Data"])
 
+PROCESSED_AGENT_DATA_LIST = TypeAdapter(List[ProcessedAgentData])
+
+# Request body accepted by the create endpoints, as a JSON list or a binary message
+PROCESSED_AGENT_DATA_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {"schema": PROCESSED_AGENT_DATA_LIST.json_schema()},
+            BINARY_CONTENT_TYPE: {"schema": {"type": "string", "format": "binary"}},
+        },
+    }
+}
+
+# Columns of every exported row, in both formats
+EXPORT_COLUMNS = ("id", "road_state", "user_id", "x", "y", "z", "latitude", "longitude", "timestamp", "cell")
+
+
+@dataclass
+class DataFilters:
+    """Query filters shared by the listing, export and spatial endpoints."""
+    user_id: Optional[int] = None
+    road_state: Optional[str] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+
+
+async def processed_agent_data_body(request: Request) -> List[ProcessedAgentData]:
+    """Decode the request body by its Content-Type, validating it in one pass."""
+    body = await request.body()
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    try:
+        if content_type == BINARY_CONTENT_TYPE:
+            return decode_processed_agent_data(body)
+        return PROCESSED_AGENT_DATA_LIST.validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+def _export_document(row) -> dict:
+    document = {column: row[column] for column in EXPORT_COLUMNS}
+    document["timestamp"] = row["timestamp"].isoformat()
+    return document
+
+
+def _export_lines(export_format: str, filters: DataFilters) -> Iterator[str]:
+    # The stream outlives the request dependencies, so it owns its session
+    db = SessionLocal()
+    try:
+        rows = crud.iter_data(db, **asdict(filters))
+        if export_format == "csv":
+            output = io.StringIO()
+            writer = csv.writer(output, lineterminator="\n")
+            writer.writerow(EXPORT_COLUMNS)
+            for row in rows:
+                writer.writerow(_export_document(row).values())
+                if output.tell() >= 65536:
+                    yield output.getvalue()
+                    output.seek(0)
+                    output.truncate()
+            yield output.getvalue()
+        else:
+            for row in rows:
+                yield json.dumps(_export_document(row)) + "\n"
+    finally:
+        db.close()
+
 @router.post(
     "/",
     response_model=List[ProcessedAgentDataInDB],
@@ -14,10 +94,15 @@ router = APIRouter(tags=["Processed Agent Data"])
     description="""
     Accepts a list of processed agent data entries and stores them in the database.
     Also pushes the new data to subscribed WebSocket clients in real time.
-    """
+    """,
+    openapi_extra=PROCESSED_AGENT_DATA_BODY,
 )
-async def create_data(data: List[ProcessedAgentData]):
-    created = crud.create_data_batch(data)
+async def create_data(
+    data: List[ProcessedAgentData] = Depends(processed_agent_data_body),
+    db: Session = Depends(get_db),
+):
+    # Run the blocking insert in the threadpool, so it does not stall the event loop
+    created = await run_in_threadpool(crud.create_data_batch, db, data)
 
     user_data_map = defaultdict(list)
     for item in created:
@@ -28,14 +113,94 @@ async def create_data(data: List[ProcessedAgentData]):
 
     return created
 
+@router.post(
+    "/bulk",
+    response_model=BulkInsertResult,
+    summary="Bulk ingest processed agent data",
+    description="""
+    High-volume ingest of processed agent data entries, streamed into the database with COPY.
+    Returns only the number of stored entries and does not push them to WebSocket clients.
+    """,
+    openapi_extra=PROCESSED_AGENT_DATA_BODY,
+)
+async def bulk_create_data(
+    data: List[ProcessedAgentData] = Depends(processed_agent_data_body),
+    db: Session = Depends(get_db),
+):
+    inserted = await run_in_threadpool(crud.copy_data_batch, db, data)
+    return {"inserted": inserted}
+
 @router.get(
     "/",
     response_model=List[ProcessedAgentDataInDB],
-    summary="Get all processed agent data",
-    description="Returns a list of all processed agent data entries stored in the database."
+    summary="Get processed agent data",
+    description="""
+    Returns one page of processed agent data entries ordered by ID, optionally filtered.
+    Pass the X-Next-After-Id response header as `after_id` to fetch the next page.
+    """
+)
+def list_data(
+    response: Response,
+    after_id: Optional[int] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    filters: DataFilters = Depends(),
+    db: Session = Depends(get_db),
+):
+    rows = crud.list_data(db, after_id=after_id, limit=limit, **asdict(filters))
+    if len(rows) == limit:
+        response.headers["X-Next-After-Id"] = str(rows[-1]["id"])
+    return rows
+
+@router.get(
+    "/export",
+    summary="Export processed agent data",
+    description="""
+    Streams every processed agent data entry matching the filters as NDJSON or CSV.
+    Rows are read from a server-side cursor, so memory use does not depend on the result size.
+    """,
+    response_class=StreamingResponse,
+)
+def export_data(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    filters: DataFilters = Depends(),
+):
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    return StreamingResponse(_export_lines(export_format, filters), media_type=media_type)
+
+@router.get(
+    "/area",
+    response_model=List[ProcessedAgentDataInDB],
+    summary="Get processed agent data inside a bounding box",
+    description="Returns processed agent data entries located inside the bounding box, optionally filtered.",
+)
+def list_data_in_area(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lon: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180),
+    limit: int = Query(1000, ge=1, le=10000),
+    filters: DataFilters = Depends(),
+    db: Session = Depends(get_db),
+):
+    if min_lat > max_lat or min_lon > max_lon:
+        raise HTTPException(status_code=422, detail="Bounding box minimum must not exceed its maximum")
+    return crud.list_data_in_area(db, min_lat, min_lon, max_lat, max_lon, limit=limit, **asdict(filters))
+
+@router.get(
+    "/nearby",
+    response_model=List[ProcessedAgentDataInDB],
+    summary="Get processed agent data around a point",
+    description="Returns processed agent data entries within the radius (in meters) of a point, nearest first.",
 )
-def list_data():
-    return crud.list_data()
+def list_data_nearby(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_m: float = Query(..., gt=0, le=50000),
+    limit: int = Query(1000, ge=1, le=10000),
+    filters: DataFilters = Depends(),
+    db: Session = Depends(get_db),
+):
+    return crud.list_data_nearby(db, lat, lon, radius_m, limit=limit, **asdict(filters))
 
 @router.get(
     "/{data_id}",
@@ -43,8 +208,8 @@ def list_data():
     summary="Get processed agent data by ID",
     description="Returns a single processed agent data entry by its ID."
 )
-def get_data(data_id: int):
-    result = crud.get_data_by_id(data_id)
+def get_data(data_id: int, db: Session = Depends(get_db)):
+    result = crud.get_data_by_id(db, data_id)
     if not result:
         raise HTTPException(status_code=404, detail="Data not found")
     return result
@@ -55,8 +220,8 @@ def get_data(data_id: int):
     summary="Update processed agent data by ID",
     description="Updates an existing processed agent data entry by its ID."
 )
-def update_data(data_id: int, item: ProcessedAgentData):
-    result = crud.update_data(data_id, item)
+def update_data(data_id: int, item: ProcessedAgentData, db: Session = Depends(get_db)):
+    result = crud.update_data(db, data_id, item)
     if not result:
         raise HTTPException(status_code=404, detail="Data not found")
     return result
@@ -67,8 +232,8 @@ def update_data(data_id: int, item: ProcessedAgentData):
     summary="Delete processed agent data by ID",
     description="Deletes a processed agent data entry by its ID."
 )
-def delete_data(data_id: int):
-    result = crud.delete_data(data_id)
+def delete_data(data_id: int, db: Session = Depends(get_db)):
+    result = crud.delete_data(db, data_id)
     if not result:
         raise HTTPException(status_code=404, detail="Data not found")
     return result
@@ -0,0 +1,68 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+from app.models.database import get_db
+from app.models.schemas import RebuildDefectsResult, RoadDefect
+from app.crud import road_defects as crud
+
+router = APIRouter(tags=["Road Defects"])
+
+@router.get(
+    "/",
+    response_model=List[RoadDefect],
+    summary="Get road defects",
+    description="""
+    Returns one page of road defects ordered by ID, optionally limited to a bounding box.
+    Every defect merges the nearby pothole or bump detections of all agents.
+    Pass the X-Next-After-Id response header as `after_id` to fetch the next page.
+    """
+)
+def list_defects(
+    response: Response,
+    after_id: Optional[int] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    road_state: Optional[str] = None,
+    min_hit_count: Optional[int] = Query(None, ge=1),
+    min_lat: Optional[float] = Query(None, ge=-90, le=90),
+    min_lon: Optional[float] = Query(None, ge=-180, le=180),
+    max_lat: Optional[float] = Query(None, ge=-90, le=90),
+    max_lon: Optional[float] = Query(None, ge=-180, le=180),
+    db: Session = Depends(get_db),
+):
+    bbox = (min_lat, min_lon, max_lat, max_lon)
+    if all(value is None for value in bbox):
+        bbox = None
+    elif any(value is None for value in bbox):
+        raise HTTPException(status_code=422, detail="Bounding box needs min_lat, min_lon, max_lat and max_lon")
+    elif min_lat > max_lat or min_lon > max_lon:
+        raise HTTPException(status_code=422, detail="Bounding box minimum must not exceed its maximum")
+
+    rows = crud.list_defects(
+        db, after_id=after_id, limit=limit, road_state=road_state, min_hit_count=min_hit_count, bbox=bbox
+    )
+    if len(rows) == limit:
+        response.headers["X-Next-After-Id"] = str(rows[-1]["id"])
+    return rows
+
+@router.post(
+    "/rebuild",
+    response_model=RebuildDefectsResult,
+    summary="Rebuild road defects",
+    description="Clusters all stored pothole and bump detections into road defects from scratch.",
+)
+async def rebuild_defects(db: Session = Depends(get_db)):
+    clustered = await run_in_threadpool(crud.rebuild_defects, db)
+    return {"clustered": clustered}
+
+@router.get(
+    "/{defect_id}",
+    response_model=RoadDefect,
+    summary="Get road defect by ID",
+    description="Returns a single road defect by its ID."
+)
+def get_defect(defect_id: int, db: Session = Depends(get_db)):
+    result = crud.get_defect_by_id(db, defect_id)
+    if not result:
+        raise HTTPException(status_code=404, detail="Road defect not found")
+    return result
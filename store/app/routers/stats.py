@@ -0,0 +1,79 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+from app.models.database import get_db
+from app.models.schemas import CellStats, HourlyRoadStateCount, RebuildStatsResult, RoadStateCount
+from app.crud import stats as crud
+
+router = APIRouter(tags=["Stats"])
+
+@router.get(
+    "/users/{user_id}/road_states",
+    response_model=List[RoadStateCount],
+    summary="Get road state totals of a user",
+    description="""
+    Returns how many entries of each road state were recorded for the user, read from the hourly rollup.
+    `since` and `until` select whole hours.
+    """
+)
+def user_road_state_counts(
+    user_id: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+):
+    return crud.user_road_state_counts(db, user_id, since=since, until=until)
+
+@router.get(
+    "/users/{user_id}/hourly",
+    response_model=List[HourlyRoadStateCount],
+    summary="Get hourly road state counts of a user",
+    description="Returns the hourly number of entries of each road state recorded for the user, oldest first."
+)
+def user_hourly_counts(
+    user_id: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    road_state: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    db: Session = Depends(get_db),
+):
+    return crud.user_hourly_counts(db, user_id, since=since, until=until, road_state=road_state, limit=limit)
+
+@router.get(
+    "/cells/worst",
+    response_model=List[CellStats],
+    summary="Get the worst road segments",
+    description="""
+    Returns the grid cells with the most pothole and bump entries, optionally inside a bounding box.
+    `defect_density` is the share of pothole and bump entries among all entries of the cell.
+    """
+)
+def worst_cells(
+    limit: int = Query(20, ge=1, le=1000),
+    min_total_count: int = Query(1, ge=1),
+    min_lat: Optional[float] = Query(None, ge=-90, le=90),
+    min_lon: Optional[float] = Query(None, ge=-180, le=180),
+    max_lat: Optional[float] = Query(None, ge=-90, le=90),
+    max_lon: Optional[float] = Query(None, ge=-180, le=180),
+    db: Session = Depends(get_db),
+):
+    bbox = (min_lat, min_lon, max_lat, max_lon)
+    if all(value is None for value in bbox):
+        bbox = None
+    elif any(value is None for value in bbox):
+        raise HTTPException(status_code=422, detail="Bounding box needs min_lat, min_lon, max_lat and max_lon")
+    elif min_lat > max_lat or min_lon > max_lon:
+        raise HTTPException(status_code=422, detail="Bounding box minimum must not exceed its maximum")
+    return crud.worst_cells(db, limit=limit, min_total_count=min_total_count, bbox=bbox)
+
+@router.post(
+    "/rebuild",
+    response_model=RebuildStatsResult,
+    summary="Rebuild stats",
+    description="Recomputes the rollups from all stored processed agent data.",
+)
+async def rebuild_stats(db: Session = Depends(get_db)):
+    return await run_in_threadpool(crud.rebuild_stats, db)
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from typing import Callable, Optional
+
+from redis.asyncio import Redis
+
+# Receives the user id and the serialized rows of every published batch
+DeliverCallback = Callable[[int, str], None]
+
+
+class BroadcastBackplane(ABC):
+    """
+    Carries serialized batches from the worker that ingested them to every
+    worker that may hold WebSocket subscribers of the user.
+    """
+
+    @abstractmethod
+    async def start(self, deliver: DeliverCallback):
+        """Start passing published batches to `deliver`."""
+        pass
+
+    @abstractmethod
+    async def publish(self, user_id: int, message: str):
+        """Publish a serialized batch of rows of a user."""
+        pass
+
+    @abstractmethod
+    async def stop(self):
+        pass
+
+
+class LocalBackplane(BroadcastBackplane):
+    """Delivers batches within the current process, for a single store worker."""
+
+    def __init__(self):
+        self._deliver: Optional[DeliverCallback] = None
+
+    async def start(self, deliver: DeliverCallback):
+        self._deliver = deliver
+
+    async def publish(self, user_id: int, message: str):
+        if self._deliver is not None:
+            self._deliver(user_id, message)
+
+    async def stop(self):
+        self._deliver = None
+
+
+class RedisBackplane(BroadcastBackplane):
+    """
+    Shares batches between store workers and replicas through a Redis pub/sub channel.
+
+    Every message is "<user_id>:<serialized rows>", so rows are serialized once by
+    the publishing worker and forwarded as is by the others.
+    """
+
+    def __init__(self, redis_client: Redis, channel: str, reconnect_delay: float = 1):
+        self.redis_client = redis_client
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self._deliver: Optional[DeliverCallback] = None
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: DeliverCallback):
+        self._deliver = deliver
+        subscribed = asyncio.Event()
+        self._listener = asyncio.create_task(self._listen(subscribed))
+        await subscribed.wait()
+
+    async def publish(self, user_id: int, message: str):
+        try:
+            await self.redis_client.publish(self.channel, f"{user_id}:{message}")
+        except Exception as e:
+            # Local subscribers still get the batch while Redis is unavailable
+            logging.error(f"Failed to publish to Redis: {e}")
+            self._deliver(user_id, message)
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+        await self.redis_client.aclose()
+
+    async def _listen(self, subscribed: asyncio.Event):
+        while True:
+            try:
+                async with self.redis_client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    subscribed.set()
+                    async for message in pubsub.listen():
+                        user_id, separator, data = message["data"].decode().partition(":")
+                        if not separator or not user_id.lstrip("-").isdigit():
+                            logging.info(f"Skipping malformed broadcast message: {message['data'][:100]!r}")
+                            continue
+                        self._deliver(int(user_id), data)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Redis subscription failed: {e}")
+                subscribed.set()
+                await asyncio.sleep(self.reconnect_delay)
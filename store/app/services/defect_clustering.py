@@ -0,0 +1,219 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.orm import Session
+
+from app.config import DEFECT_MERGE_DISTANCE_M
+from app.models.db_models import processed_agent_data, road_defects
+from app.services.geo import bbox_around, cell_of, distance_m, neighbour_cells
+
+# Road states that describe a defect of the road surface
+DEFECT_ROAD_STATES = ("pothole", "bump")
+
+# Transaction-level advisory lock that serializes clustering between concurrent requests,
+# so two batches never create separate defects for the same spot
+CLUSTERING_LOCK_KEY = 0x726F6164  # "road"
+
+_UPDATE_DEFECT = (
+    road_defects.update()
+    .where(road_defects.c.id == bindparam("defect_id"))
+    .values(
+        latitude=bindparam("new_latitude"),
+        longitude=bindparam("new_longitude"),
+        cell=bindparam("new_cell"),
+        hit_count=bindparam("new_hit_count"),
+        last_seen=bindparam("new_last_seen"),
+    )
+)
+
+
+def _merge(defect: dict, event: dict):
+    """Move the defect to the running mean of its events and count the new hit."""
+    defect["hit_count"] += 1
+    defect["latitude"] += (event["latitude"] - defect["latitude"]) / defect["hit_count"]
+    defect["longitude"] += (event["longitude"] - defect["longitude"]) / defect["hit_count"]
+    defect["last_seen"] = max(defect["last_seen"], event["timestamp"])
+
+
+def _unmerge(defect: dict, event: dict):
+    """Take a removed event out of the running mean of the defect."""
+    defect["hit_count"] -= 1
+    defect["latitude"] -= (event["latitude"] - defect["latitude"]) / defect["hit_count"]
+    defect["longitude"] -= (event["longitude"] - defect["longitude"]) / defect["hit_count"]
+
+
+def _lock_clustering(db: Session):
+    db.execute(select(func.pg_advisory_xact_lock(CLUSTERING_LOCK_KEY)))
+
+
+def cluster_road_events(db: Session, rows: Iterable[dict]) -> int:
+    """
+    Merge pothole and bump events into the road defects table within the current transaction.
+
+    Every event joins the nearest defect of the same road state that lies within
+    DEFECT_MERGE_DISTANCE_M, or starts a new defect. Candidates are looked up in
+    the grid cell of the event and the eight cells around it, so each batch costs
+    one select, one insert and one update regardless of its size.
+
+    Args:
+        db (Session): Session whose transaction also stores the events.
+        rows: Event rows with road_state, latitude, longitude and timestamp keys.
+
+    Returns:
+        int: Number of clustered events.
+    """
+    events = sorted(
+        (row for row in rows if row["road_state"] in DEFECT_ROAD_STATES),
+        key=lambda row: row["timestamp"],
+    )
+    if not events:
+        return 0
+
+    _lock_clustering(db)
+
+    event_cells = [cell_of(event["latitude"], event["longitude"]) for event in events]
+    search_cells = {cell for event_cell in set(event_cells) for cell in neighbour_cells(event_cell)}
+    known = db.execute(
+        select(road_defects).where(road_defects.c.cell.in_(search_cells))
+    ).mappings()
+
+    defects_by_cell: Dict[Tuple[str, int], List[dict]] = defaultdict(list)
+    for defect in known:
+        defects_by_cell[(defect["road_state"], defect["cell"])].append(dict(defect))
+
+    created: List[dict] = []
+    updated: Dict[int, dict] = {}
+    for event, event_cell in zip(events, event_cells):
+        road_state = event["road_state"]
+        nearest, nearest_distance = None, DEFECT_MERGE_DISTANCE_M
+        for cell in neighbour_cells(event_cell):
+            for defect in defects_by_cell.get((road_state, cell), ()):
+                distance = distance_m(defect["latitude"], defect["longitude"], event["latitude"], event["longitude"])
+                if distance <= nearest_distance:
+                    nearest, nearest_distance = defect, distance
+
+        if nearest is None:
+            defect = {
+                "road_state": road_state,
+                "latitude": event["latitude"],
+                "longitude": event["longitude"],
+                "cell": event_cell,
+                "hit_count": 1,
+                "first_seen": event["timestamp"],
+                "last_seen": event["timestamp"],
+            }
+            created.append(defect)
+            defects_by_cell[(road_state, event_cell)].append(defect)
+            continue
+
+        _merge(nearest, event)
+        cell = cell_of(nearest["latitude"], nearest["longitude"])
+        if cell != nearest["cell"]:
+            defects_by_cell[(road_state, nearest["cell"])].remove(nearest)
+            defects_by_cell[(road_state, cell)].append(nearest)
+            nearest["cell"] = cell
+        if "id" in nearest:
+            updated[nearest["id"]] = nearest
+
+    if created:
+        db.execute(road_defects.insert(), created)
+    if updated:
+        db.execute(
+            _UPDATE_DEFECT,
+            [
+                {
+                    "defect_id": defect["id"],
+                    "new_latitude": defect["latitude"],
+                    "new_longitude": defect["longitude"],
+                    "new_cell": defect["cell"],
+                    "new_hit_count": defect["hit_count"],
+                    "new_last_seen": defect["last_seen"],
+                }
+                for defect in updated.values()
+            ],
+        )
+    return len(events)
+
+
+def _seen_range(db: Session, defect: dict):
+    """First and last timestamps of the stored events around the defect."""
+    data = processed_agent_data.c
+    min_latitude, min_longitude, max_latitude, max_longitude = bbox_around(
+        defect["latitude"], defect["longitude"], DEFECT_MERGE_DISTANCE_M
+    )
+    query = select(func.min(data.timestamp), func.max(data.timestamp)).where(
+        data.road_state == defect["road_state"],
+        data.cell.in_(neighbour_cells(defect["cell"])),
+        data.latitude.between(min_latitude, max_latitude),
+        data.longitude.between(min_longitude, max_longitude),
+    )
+    return db.execute(query).one()
+
+
+def remove_road_events(db: Session, rows: Iterable[dict]) -> int:
+    """
+    Take updated or deleted pothole and bump events out of the road defects within the current transaction.
+
+    Defects do not record their events, so each event is taken out of the nearest
+    defect of the same road state within DEFECT_MERGE_DISTANCE_M, the one it was
+    most likely merged into. Its hit count and centroid are reverted, and a defect
+    left without hits is deleted. When the event was the first or last one seen,
+    the range is recomputed from the stored events around the defect. Call it after
+    the rows are changed, so they are not counted again. POST /road_defects/rebuild
+    reclusters everything from scratch, should the defects still drift apart.
+
+    Args:
+        db (Session): Session whose transaction also changes the events.
+        rows: Previous values of the event rows, with road_state, latitude, longitude and timestamp keys.
+
+    Returns:
+        int: Number of events taken out of a defect.
+    """
+    events = [row for row in rows if row["road_state"] in DEFECT_ROAD_STATES]
+    if not events:
+        return 0
+
+    _lock_clustering(db)
+
+    removed = 0
+    for event in events:
+        known = db.execute(
+            select(road_defects).where(
+                road_defects.c.road_state == event["road_state"],
+                road_defects.c.cell.in_(neighbour_cells(cell_of(event["latitude"], event["longitude"]))),
+            )
+        ).mappings()
+        nearest, nearest_distance = None, DEFECT_MERGE_DISTANCE_M
+        for defect in known:
+            distance = distance_m(defect["latitude"], defect["longitude"], event["latitude"], event["longitude"])
+            if distance <= nearest_distance:
+                nearest, nearest_distance = defect, distance
+        if nearest is None:
+            continue
+
+        removed += 1
+        if nearest["hit_count"] <= 1:
+            db.execute(road_defects.delete().where(road_defects.c.id == nearest["id"]))
+            continue
+
+        defect = dict(nearest)
+        _unmerge(defect, event)
+        defect["cell"] = cell_of(defect["latitude"], defect["longitude"])
+        if event["timestamp"] in (defect["first_seen"], defect["last_seen"]):
+            first_seen, last_seen = _seen_range(db, defect)
+            if first_seen is not None:
+                defect["first_seen"], defect["last_seen"] = first_seen, last_seen
+        db.execute(
+            road_defects.update()
+            .where(road_defects.c.id == defect["id"])
+            .values(
+                latitude=defect["latitude"],
+                longitude=defect["longitude"],
+                cell=defect["cell"],
+                hit_count=defect["hit_count"],
+                first_seen=defect["first_seen"],
+                last_seen=defect["last_seen"],
+            )
+        )
+    return removed
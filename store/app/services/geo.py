@@ -0,0 +1,132 @@
+import math
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import BigInteger, func
+
+from app.config import GRID_CELL_DEGREES
+
+EARTH_METERS_PER_DEGREE = 111320.0
+
+# Cells are numbered row by row from the south-west corner of the world
+GRID_COLUMNS = math.ceil(360 / GRID_CELL_DEGREES)
+
+
+def _row(latitude: float) -> int:
+    return int(math.floor((latitude + 90) / GRID_CELL_DEGREES))
+
+
+def _column(longitude: float) -> int:
+    return int(math.floor((longitude + 180) / GRID_CELL_DEGREES))
+
+
+def cell_of(latitude: float, longitude: float) -> int:
+    """Id of the grid cell that contains the point."""
+    return _row(latitude) * GRID_COLUMNS + _column(longitude)
+
+
+def cell_expression(latitude, longitude):
+    """SQL expression of the id of the grid cell that contains the point, computed like cell_of."""
+    return (
+        func.floor((latitude + 90) / GRID_CELL_DEGREES) * GRID_COLUMNS
+        + func.floor((longitude + 180) / GRID_CELL_DEGREES)
+    ).cast(BigInteger)
+
+
+def neighbour_cells(cell: int) -> List[int]:
+    """Ids of the cell and the eight cells around it."""
+    row, column = divmod(cell, GRID_COLUMNS)
+    return [
+        (row + row_offset) * GRID_COLUMNS + (column + column_offset) % GRID_COLUMNS
+        for row_offset in (-1, 0, 1)
+        for column_offset in (-1, 0, 1)
+    ]
+
+
+def distance_m(latitude1: float, longitude1: float, latitude2: float, longitude2: float) -> float:
+    """Equirectangular distance in meters, accurate for points up to tens of kilometers apart."""
+    north = (latitude2 - latitude1) * EARTH_METERS_PER_DEGREE
+    east = (longitude2 - longitude1) * EARTH_METERS_PER_DEGREE * math.cos(math.radians(latitude1))
+    return math.hypot(north, east)
+
+
+def cell_ranges(
+    min_latitude: float, min_longitude: float, max_latitude: float, max_longitude: float, max_rows: int = 256
+) -> Optional[List[Tuple[int, int]]]:
+    """
+    Inclusive ranges of cell ids covering a bounding box, one range per grid row.
+    Returns None when the box spans more than `max_rows` rows and the grid would not help.
+    """
+    first_row, last_row = _row(min_latitude), _row(max_latitude)
+    if last_row - first_row + 1 > max_rows:
+        return None
+    first_column, last_column = _column(min_longitude), _column(max_longitude)
+    return [
+        (row * GRID_COLUMNS + first_column, row * GRID_COLUMNS + last_column)
+        for row in range(first_row, last_row + 1)
+    ]
+
+
+def bbox_around(latitude: float, longitude: float, radius_m: float) -> Tuple[float, float, float, float]:
+    """Bounding box (min_lat, min_lon, max_lat, max_lon) that contains a circle around the point."""
+    latitude_delta = radius_m / EARTH_METERS_PER_DEGREE
+    longitude_delta = radius_m / (EARTH_METERS_PER_DEGREE * max(math.cos(math.radians(latitude)), 1e-6))
+    return (
+        max(latitude - latitude_delta, -90.0),
+        max(longitude - longitude_delta, -180.0),
+        min(latitude + latitude_delta, 90.0),
+        min(longitude + longitude_delta, 180.0),
+    )
+
+
+def cell_center(cell: int) -> Tuple[float, float]:
+    """Latitude and longitude of the center of a grid cell."""
+    row, column = divmod(cell, GRID_COLUMNS)
+    return (row + 0.5) * GRID_CELL_DEGREES - 90, (column + 0.5) * GRID_CELL_DEGREES - 180
+
+
+def meters_per_pixel(latitude: float, zoom: int) -> float:
+    """Ground resolution of 256-pixel web map tiles at the zoom level."""
+    return 2 * math.pi * 6378137 * math.cos(math.radians(latitude)) / (256 * 2 ** zoom)
+
+
+def simplify_indices(
+    points: Sequence[Tuple[float, float]], tolerance_m: float, anchors: Iterable[int] = ()
+) -> List[int]:
+    """
+    Douglas-Peucker simplification of a (latitude, longitude) track.
+
+    Returns the sorted indices of the points to keep: the ends, the anchors and
+    every point that deviates from the simplified line by more than `tolerance_m`.
+    """
+    if len(points) < 3:
+        return list(range(len(points)))
+
+    scale = math.cos(math.radians(points[0][0]))
+    xy = [
+        (longitude * scale * EARTH_METERS_PER_DEGREE, latitude * EARTH_METERS_PER_DEGREE)
+        for latitude, longitude in points
+    ]
+    kept = {0, len(points) - 1, *anchors}
+    sections = sorted(kept)
+    stack = list(zip(sections, sections[1:]))
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        (x1, y1), (x2, y2) = xy[first], xy[last]
+        dx, dy = x2 - x1, y2 - y1
+        length = math.hypot(dx, dy)
+        farthest, farthest_distance = first, -1.0
+        for index in range(first + 1, last):
+            x, y = xy[index]
+            if length:
+                distance = abs(dy * (x - x1) - dx * (y - y1)) / length
+            else:
+                distance = math.hypot(x - x1, y - y1)
+            if distance > farthest_distance:
+                farthest, farthest_distance = index, distance
+        if farthest_distance > tolerance_m:
+            kept.add(farthest)
+            stack.append((first, farthest))
+            stack.append((farthest, last))
+    return sorted(kept)
@@ -0,0 +1,76 @@
+import zlib
+
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class GzipRequestMiddleware:
+    """
+    Decompresses request bodies sent with `Content-Encoding: gzip` before they reach the routers.
+
+    Bodies of several concatenated gzip members are decompressed member by member,
+    as gunzip does. Bodies that inflate beyond `max_size` bytes are rejected with 413,
+    so a small compressed request cannot exhaust memory; corrupt bodies are rejected with 400.
+    """
+
+    def __init__(self, app: ASGIApp, max_size: int):
+        self.app = app
+        self.max_size = max_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self._is_gzip(scope):
+            await self.app(scope, receive, send)
+            return
+
+        decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+        chunks = []
+        size = 0
+        more_body = True
+        try:
+            while more_body:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                more_body = message.get("more_body", False)
+                data = message.get("body", b"")
+                while data:
+                    if decompressor.eof:
+                        # The previous member ended, the rest of the body is the next one
+                        decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+                    chunk = decompressor.decompress(data, self.max_size - size + 1)
+                    size += len(chunk)
+                    if size > self.max_size or decompressor.unconsumed_tail:
+                        await PlainTextResponse("Decompressed request body is too large", 413)(scope, receive, send)
+                        return
+                    chunks.append(chunk)
+                    data = decompressor.unused_data if decompressor.eof else b""
+            if not decompressor.eof:
+                raise zlib.error("Truncated gzip stream")
+        except zlib.error as e:
+            await PlainTextResponse(f"Invalid gzip request body: {e}", 400)(scope, receive, send)
+            return
+
+        body = b"".join(chunks)
+        headers = [
+            (name, value) for name, value in scope["headers"]
+            if name not in (b"content-encoding", b"content-length")
+        ]
+        headers.append((b"content-length", str(len(body)).encode()))
+        scope = dict(scope, headers=headers)
+
+        async def receive_body() -> Message:
+            nonlocal body
+            if body is None:
+                return await receive()
+            message = {"type": "http.request", "body": body, "more_body": False}
+            body = None
+            return message
+
+        await self.app(scope, receive_body, send)
+
+    @staticmethod
+    def _is_gzip(scope: Scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == b"content-encoding":
+                return value.strip().lower() == b"gzip"
+        return False
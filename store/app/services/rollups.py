@@ -0,0 +1,174 @@
+from collections import Counter
+from typing import Dict, Iterable
+
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models.db_models import cell_road_stats, processed_agent_data, user_road_state_hourly
+from app.services.defect_clustering import DEFECT_ROAD_STATES
+
+
+def _hour_of(timestamp):
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def _upsert_user_hourly(db: Session, counts: Counter):
+    statement = insert(user_road_state_hourly)
+    statement = statement.on_conflict_do_update(
+        index_elements=[
+            user_road_state_hourly.c.user_id,
+            user_road_state_hourly.c.hour,
+            user_road_state_hourly.c.road_state,
+        ],
+        set_={"count": user_road_state_hourly.c.count + statement.excluded.count},
+    )
+    # Rows are locked in key order, so concurrent batches cannot deadlock on each other
+    db.execute(
+        statement,
+        [
+            {"user_id": user_id, "hour": hour, "road_state": road_state, "count": count}
+            for (user_id, hour, road_state), count in sorted(counts.items())
+        ],
+    )
+
+
+def _upsert_cell_stats(db: Session, stats: Dict[int, dict]):
+    statement = insert(cell_road_stats)
+    statement = statement.on_conflict_do_update(
+        index_elements=[cell_road_stats.c.cell],
+        set_={
+            "total_count": cell_road_stats.c.total_count + statement.excluded.total_count,
+            "defect_count": cell_road_stats.c.defect_count + statement.excluded.defect_count,
+            "last_seen": func.greatest(cell_road_stats.c.last_seen, statement.excluded.last_seen),
+        },
+    )
+    db.execute(statement, [stats[cell] for cell in sorted(stats)])
+
+
+def update_rollups(db: Session, rows: Iterable[dict]) -> int:
+    """
+    Add inserted rows to the per-user hourly and per-cell rollups within the current transaction.
+
+    Rows are counted in memory first, so a batch costs one upsert per rollup table
+    no matter how many rows it has.
+
+    Args:
+        db (Session): Session whose transaction also stores the rows.
+        rows: Rows of processed_agent_data, including the cell column.
+
+    Returns:
+        int: Number of counted rows.
+    """
+    user_hourly: Counter = Counter()
+    cells: Dict[int, dict] = {}
+    counted = 0
+    for row in rows:
+        counted += 1
+        user_hourly[(row["user_id"], _hour_of(row["timestamp"]), row["road_state"])] += 1
+        if row["cell"] is None:
+            continue
+        cell = cells.get(row["cell"])
+        if cell is None:
+            cell = cells[row["cell"]] = {
+                "cell": row["cell"], "total_count": 0, "defect_count": 0, "last_seen": row["timestamp"]
+            }
+        cell["total_count"] += 1
+        cell["defect_count"] += row["road_state"] in DEFECT_ROAD_STATES
+        cell["last_seen"] = max(cell["last_seen"], row["timestamp"])
+
+    if user_hourly:
+        _upsert_user_hourly(db, user_hourly)
+    if cells:
+        _upsert_cell_stats(db, cells)
+    return counted
+
+
+def _subtract_user_hourly(db: Session, counts: Counter):
+    table = user_road_state_hourly.c
+    keys = (
+        (table.user_id == bindparam("key_user_id"))
+        & (table.hour == bindparam("key_hour"))
+        & (table.road_state == bindparam("key_road_state"))
+    )
+    db.execute(
+        user_road_state_hourly.update().where(keys).values(count=table.count - bindparam("removed")),
+        [
+            {"key_user_id": user_id, "key_hour": hour, "key_road_state": road_state, "removed": count}
+            for (user_id, hour, road_state), count in sorted(counts.items())
+        ],
+    )
+    db.execute(user_road_state_hourly.delete().where(keys, table.count <= 0), [
+        {"key_user_id": user_id, "key_hour": hour, "key_road_state": road_state}
+        for user_id, hour, road_state in sorted(counts)
+    ])
+
+
+def _subtract_cell_stats(db: Session, stats: Dict[int, dict]):
+    table = cell_road_stats.c
+    data = processed_agent_data.c
+    db.execute(
+        cell_road_stats.update()
+        .where(table.cell == bindparam("key_cell"))
+        .values(
+            total_count=table.total_count - bindparam("removed_total"),
+            defect_count=table.defect_count - bindparam("removed_defects"),
+        ),
+        [
+            {
+                "key_cell": cell,
+                "removed_total": stats[cell]["total_count"],
+                "removed_defects": stats[cell]["defect_count"],
+            }
+            for cell in sorted(stats)
+        ],
+    )
+    db.execute(cell_road_stats.delete().where(table.cell.in_(sorted(stats)), table.total_count <= 0))
+    # last_seen only grows on insert, so it is read back from the remaining rows of the cell
+    # whenever a removed row may have been the latest one
+    latest = (
+        select(func.max(data.timestamp))
+        .where(data.cell == table.cell)
+        .scalar_subquery()
+    )
+    db.execute(
+        cell_road_stats.update()
+        .where(table.cell == bindparam("key_cell"), table.last_seen <= bindparam("removed_last_seen"))
+        .values(last_seen=latest),
+        [{"key_cell": cell, "removed_last_seen": stats[cell]["last_seen"]} for cell in sorted(stats)],
+    )
+
+
+def remove_from_rollups(db: Session, rows: Iterable[dict]) -> int:
+    """
+    Take updated or deleted rows out of the rollups within the current transaction,
+    the inverse of update_rollups. Counters that drop to zero remove their rollup row.
+
+    Must run after the rows are changed in processed_agent_data, which is read back
+    to find the new last_seen of a cell that lost its latest row.
+
+    Args:
+        db (Session): Session whose transaction also changes the rows.
+        rows: Previous values of the rows, including the cell column.
+
+    Returns:
+        int: Number of removed rows.
+    """
+    user_hourly: Counter = Counter()
+    cells: Dict[int, dict] = {}
+    removed = 0
+    for row in rows:
+        removed += 1
+        user_hourly[(row["user_id"], _hour_of(row["timestamp"]), row["road_state"])] += 1
+        if row["cell"] is None:
+            continue
+        cell = cells.setdefault(row["cell"], {"total_count": 0, "defect_count": 0, "last_seen": row["timestamp"]})
+        cell["total_count"] += 1
+        cell["defect_count"] += row["road_state"] in DEFECT_ROAD_STATES
+        cell["last_seen"] = max(cell["last_seen"], row["timestamp"])
+
+    if user_hourly:
+        _subtract_user_hourly(db, user_hourly)
+    if cells:
+        _subtract_cell_stats(db, cells)
+    return removed
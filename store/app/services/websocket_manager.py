@@ -1,25 +1,258 @@
-from fastapi import WebSocket, WebSocketDisconnect
-from fastapi.encoders import jsonable_encoder
-from typing import Set, Dict
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
 
-subscriptions: Dict[int, Set[WebSocket]] = {}
+from fastapi import Query, WebSocket, WebSocketDisconnect, WebSocketException, status
 
+from app.config import WEBSOCKET_QUEUE_SIZE, WEBSOCKET_SEND_TIMEOUT
+from app.services.broadcast_backplane import BroadcastBackplane, LocalBackplane
+from app.services.geo import meters_per_pixel, simplify_indices
 
-async def websocket_endpoint(websocket: WebSocket, user_id: int):
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def serialize_rows(rows: Iterable) -> str:
+    """Serialize rows of processed agent data to a JSON array."""
+    return json.dumps([dict(row) for row in rows], default=_json_default)
+
+
+def coalesce(messages) -> str:
+    """Merge serialized JSON arrays into one array without parsing them."""
+    if len(messages) == 1:
+        return messages[0]
+    return "[" + ",".join(message[1:-1] for message in messages if message != "[]") + "]"
+
+
+@dataclass(frozen=True)
+class SubscriptionOptions:
+    """What a WebSocket client wants to receive and how often."""
+    bbox: Optional[Tuple[float, float, float, float]] = None
+    road_states: Optional[FrozenSet[str]] = None
+    max_rate: Optional[float] = None
+    zoom: Optional[int] = None
+
+    @property
+    def needs_rows(self) -> bool:
+        """Whether batches have to be parsed to filter or simplify them for this client."""
+        return self.bbox is not None or self.road_states is not None or self.zoom is not None
+
+    def matches(self, row: dict) -> bool:
+        if self.road_states is not None and row["road_state"] not in self.road_states:
+            return False
+        if self.bbox is not None:
+            min_latitude, min_longitude, max_latitude, max_longitude = self.bbox
+            if not min_latitude <= row["latitude"] <= max_latitude:
+                return False
+            if not min_longitude <= row["longitude"] <= max_longitude:
+                return False
+        return True
+
+
+def subscription_options(
+    min_lat: Optional[float] = Query(None, ge=-90, le=90),
+    min_lon: Optional[float] = Query(None, ge=-180, le=180),
+    max_lat: Optional[float] = Query(None, ge=-90, le=90),
+    max_lon: Optional[float] = Query(None, ge=-180, le=180),
+    road_state: Optional[List[str]] = Query(None),
+    max_rate: Optional[float] = Query(None, gt=0, le=100),
+    zoom: Optional[int] = Query(None, ge=0, le=22),
+) -> SubscriptionOptions:
+    """Subscription options from the query parameters of the WebSocket URL."""
+    bbox = (min_lat, min_lon, max_lat, max_lon)
+    if all(value is None for value in bbox):
+        bbox = None
+    elif any(value is None for value in bbox) or min_lat > max_lat or min_lon > max_lon:
+        raise WebSocketException(status.WS_1008_POLICY_VIOLATION, "Invalid bounding box")
+    return SubscriptionOptions(
+        bbox=bbox,
+        road_states=frozenset(road_state) if road_state else None,
+        max_rate=max_rate,
+        zoom=zoom,
+    )
+
+
+def simplify_rows(rows: List[dict], zoom: int) -> List[dict]:
+    """Drop the normal points that do not change the track by more than a pixel at the zoom level."""
+    if len(rows) < 3:
+        return rows
+    tolerance = meters_per_pixel(rows[0]["latitude"], zoom)
+    points = [(row["latitude"], row["longitude"]) for row in rows]
+    events = (index for index, row in enumerate(rows) if row["road_state"] != "normal")
+    return [rows[index] for index in simplify_indices(points, tolerance, events)]
+
+
+class Subscriber:
+    """
+    WebSocket client with its own bounded queue of outgoing messages and sender task.
+
+    When the client falls behind, messages waiting in its queue are coalesced into
+    one array and, once the queue is full, the oldest messages are dropped, so a
+    slow client never holds up the publisher or other clients. Clients with
+    `max_rate` get at most that many messages per second, the rest is coalesced.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        queue_size: int,
+        send_timeout: float,
+        options: SubscriptionOptions = SubscriptionOptions(),
+    ):
+        self.websocket = websocket
+        self.send_timeout = send_timeout
+        self.options = options
+        self.dropped = 0
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._sender: Optional[asyncio.Task] = None
+
+    def start(self, on_failure):
+        self._sender = asyncio.create_task(self._send_messages(on_failure))
+
+    def stop(self):
+        if self._sender is not None and self._sender is not asyncio.current_task():
+            self._sender.cancel()
+
+    def offer(self, message):
+        """
+        Queue a message without waiting, dropping the oldest one when the queue is full.
+        Subscribers that need rows take the parsed rows of the batch instead of its JSON.
+        """
+        if self.options.needs_rows:
+            message = [row for row in message if self.options.matches(row)]
+            if not message:
+                return
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(message)
+
+    def _render(self, messages) -> str:
+        if not self.options.needs_rows:
+            return coalesce(messages)
+        rows = [row for batch in messages for row in batch]
+        if self.options.zoom is not None:
+            rows = simplify_rows(rows, self.options.zoom)
+        return json.dumps(rows)
+
+    async def _send_messages(self, on_failure):
+        interval = 1 / self.options.max_rate if self.options.max_rate else 0
+        while True:
+            messages = [await self._queue.get()]
+            started = time.monotonic()
+            while not self._queue.empty():
+                messages.append(self._queue.get_nowait())
+            try:
+                await asyncio.wait_for(self.websocket.send_text(self._render(messages)), self.send_timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.info(f"Dropping WebSocket subscriber: {e!r}")
+                await on_failure(self)
+                return
+            if interval:
+                # Batches arriving meanwhile wait in the queue and go out coalesced
+                await asyncio.sleep(started + interval - time.monotonic())
+
+
+class WebSocketBroadcaster:
+    """
+    Fans out batches of processed agent data to the WebSocket subscribers of each user.
+    Batches travel through the backplane, so they reach subscribers connected to other workers.
+    """
+
+    def __init__(
+        self,
+        backplane: Optional[BroadcastBackplane] = None,
+        queue_size: int = WEBSOCKET_QUEUE_SIZE,
+        send_timeout: float = WEBSOCKET_SEND_TIMEOUT,
+    ):
+        self.backplane = backplane or LocalBackplane()
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.subscriptions: Dict[int, Set[Subscriber]] = {}
+
+    async def start(self, backplane: Optional[BroadcastBackplane] = None):
+        if backplane is not None:
+            self.backplane = backplane
+        await self.backplane.start(self.deliver)
+
+    async def stop(self):
+        await self.backplane.stop()
+
+    def subscribe(
+        self, websocket: WebSocket, user_id: int, options: SubscriptionOptions = SubscriptionOptions()
+    ) -> Subscriber:
+        subscriber = Subscriber(websocket, self.queue_size, self.send_timeout, options)
+        self.subscriptions.setdefault(user_id, set()).add(subscriber)
+        subscriber.start(lambda failed: self._drop(user_id, failed))
+        return subscriber
+
+    def unsubscribe(self, user_id: int, subscriber: Subscriber):
+        subscriber.stop()
+        subscribers = self.subscriptions.get(user_id)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self.subscriptions[user_id]
+
+    async def _drop(self, user_id: int, subscriber: Subscriber):
+        self.unsubscribe(user_id, subscriber)
+        try:
+            await subscriber.websocket.close()
+        except Exception:
+            pass
+
+    async def publish(self, user_id: int, rows):
+        """Serialize the rows once and publish them to the subscribers of the user on every worker."""
+        if isinstance(self.backplane, LocalBackplane) and not self.subscriptions.get(user_id):
+            # Nobody else can be subscribed, so there is no need to serialize the batch
+            return
+        await self.backplane.publish(user_id, serialize_rows(rows))
+
+    def deliver(self, user_id: int, message: str) -> int:
+        """
+        Queue a serialized batch for every local subscriber of the user.
+        Returns the number of subscribers the batch was queued for.
+        """
+        subscribers = self.subscriptions.get(user_id)
+        if not subscribers:
+            return 0
+        rows = None
+        for subscriber in subscribers:
+            if subscriber.options.needs_rows:
+                # Parsed at most once per batch, however many clients filter it
+                if rows is None:
+                    rows = json.loads(message)
+                subscriber.offer(rows)
+            else:
+                subscriber.offer(message)
+        return len(subscribers)
+
+
+broadcaster = WebSocketBroadcaster()
+
+
+async def websocket_endpoint(
+    websocket: WebSocket, user_id: int, options: SubscriptionOptions = SubscriptionOptions()
+):
     await websocket.accept()
-    if user_id not in subscriptions:
-        subscriptions[user_id] = set()
-    subscriptions[user_id].add(websocket)
+    subscriber = broadcaster.subscribe(websocket, user_id, options)
     try:
         while True:
             await websocket.receive_text()
     except WebSocketDisconnect:
-        subscriptions[user_id].remove(websocket)
+        pass
+    finally:
+        broadcaster.unsubscribe(user_id, subscriber)
 
 
 async def send_data_to_subscribers(user_id: int, data):
-    if user_id in subscriptions:
-        data = jsonable_encoder(data)
-
-        for websocket in subscriptions[user_id]:
-            await websocket.send_json(data)
+    await broadcaster.publish(user_id, data)
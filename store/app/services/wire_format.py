@@ -0,0 +1,70 @@
+"""
+Compact binary wire format of processed agent data sent by the hub.
+
+A binary request body is a 6-byte header followed by fixed-width little-endian records:
+
+    header            version: u8 (1), kind: u8 (2 for processed agent data), count: u32
+    processed data    road_state: u8 (index in ROAD_STATES),
+                      user_id: i32, x, y, z, latitude, longitude: f64,
+                      timestamp: i64 (microseconds since 1970-01-01 of the wall clock),
+                      utc_offset: i16 (minutes, -32768 for naive timestamps)
+
+Such bodies are sent with the BINARY_CONTENT_TYPE Content-Type, anything else is read as JSON.
+"""
+import struct
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from pydantic import TypeAdapter
+
+from app.models.schemas import ProcessedAgentData
+
+WIRE_FORMAT_VERSION = 1
+KIND_PROCESSED_AGENT_DATA = 2
+ROAD_STATES = ("normal", "pothole", "bump")
+
+BINARY_CONTENT_TYPE = "application/x-road-vision"
+
+HEADER = struct.Struct("<BBI")
+PROCESSED_AGENT_DATA_RECORD = struct.Struct("<Bi5dqh")
+
+PROCESSED_AGENT_DATA_LIST = TypeAdapter(List[ProcessedAgentData])
+
+_EPOCH = datetime(1970, 1, 1)
+_NAIVE = -32768
+# Timestamps that datetime can represent, other values of the i64 field are rejected
+_MIN_MICROSECONDS = (datetime.min - _EPOCH) // timedelta(microseconds=1)
+_MAX_MICROSECONDS = (datetime.max - _EPOCH) // timedelta(microseconds=1)
+
+
+def decode_processed_agent_data(payload: bytes) -> List[ProcessedAgentData]:
+    """Raises ValueError for a body that is not a valid binary message."""
+    if len(payload) < HEADER.size:
+        raise ValueError("Binary message is shorter than its header")
+    version, kind, count = HEADER.unpack_from(payload)
+    if version != WIRE_FORMAT_VERSION or kind != KIND_PROCESSED_AGENT_DATA:
+        raise ValueError(f"Unsupported binary message version {version} kind {kind}")
+    if len(payload) != HEADER.size + count * PROCESSED_AGENT_DATA_RECORD.size:
+        raise ValueError(f"Binary message of {len(payload)} bytes does not hold {count} records")
+
+    items = []
+    for fields in PROCESSED_AGENT_DATA_RECORD.iter_unpack(memoryview(payload)[HEADER.size:]):
+        code, user_id, x, y, z, latitude, longitude, microseconds, offset = fields
+        if code >= len(ROAD_STATES):
+            raise ValueError(f"Unknown road state code {code}")
+        if not _MIN_MICROSECONDS <= microseconds <= _MAX_MICROSECONDS:
+            raise ValueError(f"Timestamp of {microseconds} microseconds is out of range")
+        timestamp = _EPOCH + timedelta(microseconds=microseconds)
+        if offset != _NAIVE:
+            timestamp = timestamp.replace(tzinfo=timezone(timedelta(minutes=offset)))
+        items.append({
+            "road_state": ROAD_STATES[code],
+            "agent_data": {
+                "user_id": user_id,
+                "accelerometer": {"x": x, "y": y, "z": z},
+                "gps": {"latitude": latitude, "longitude": longitude},
+                "timestamp": timestamp,
+            },
+        })
+    # Validating plain dicts in one call is cheaper than model_construct per nested model
+    return PROCESSED_AGENT_DATA_LIST.validate_python(items)
@@ -0,0 +1,61 @@
+"""
+Insert throughput of the store: executemany with RETURNING vs COPY.
+
+Inserts batches of 20, 1k and 100k generated rows with create_data_batch
+(the POST /processed_agent_data/ path) and copy_data_batch (the bulk path)
+and prints rows per second. Inserted rows are deleted afterwards.
+
+Usage (from the store directory, with the database from app/config.py):
+    python -m benchmarks.bulk_insert
+"""
+import time
+from datetime import datetime, timedelta
+
+from app.crud import processed_data as crud
+from app.models.database import SessionLocal, engine, metadata
+from app.models.db_models import processed_agent_data
+from app.models.schemas import ProcessedAgentData
+
+BATCH_SIZES = [20, 1000, 100000]
+MIN_ROWS = 100000  # small batches are repeated until at least this many rows are inserted
+
+
+def generate_items(count: int):
+    started = datetime(2025, 1, 1)
+    return [
+        ProcessedAgentData(
+            road_state=("normal", "pothole", "bump")[i % 3],
+            agent_data={
+                "user_id": i % 100,
+                "accelerometer": {"x": i % 7, "y": i % 11, "z": 16500 + i % 40},
+                "gps": {"latitude": 50.45 + i * 1e-6, "longitude": 30.52 + i * 1e-6},
+                "timestamp": started + timedelta(milliseconds=100 * i),
+            },
+        )
+        for i in range(count)
+    ]
+
+
+def measure(insert, batch_size: int) -> float:
+    items = generate_items(batch_size)
+    repeats = max(1, MIN_ROWS // batch_size)
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        for _ in range(repeats):
+            insert(db, items)
+        elapsed = time.perf_counter() - started
+        db.execute(processed_agent_data.delete())
+        db.commit()
+    finally:
+        db.close()
+    return batch_size * repeats / elapsed
+
+
+if __name__ == "__main__":
+    metadata.create_all(bind=engine)
+    print(f"{'batch size':>10} {'executemany rows/s':>20} {'COPY rows/s':>12}")
+    for batch_size in BATCH_SIZES:
+        executemany = measure(crud.create_data_batch, batch_size)
+        copy = measure(crud.copy_data_batch, batch_size)
+        print(f"{batch_size:>10} {executemany:>20.0f} {copy:>12.0f}")
@@ -0,0 +1,74 @@
+"""
+Query plans of typical per-user and per-time-range queries on a large table.
+
+Fills processed_agent_data with ROWS generated rows (10M by default) spread
+over a year, 1000 users and 1% potholes/bumps, then prints the plan shape
+and execution time of each query with EXPLAIN ANALYZE.
+
+Usage (from the store directory, with the database from app/config.py;
+the table must be empty, use a throwaway database):
+    python -m benchmarks.query_plans [ROWS]
+"""
+import sys
+from datetime import date
+
+from sqlalchemy import text
+
+from app.models.database import engine, metadata
+from app.models.partitions import ensure_partitions, is_partitioned
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+START = date(2025, 1, 1)
+
+GENERATE = """
+INSERT INTO processed_agent_data (road_state, user_id, x, y, z, latitude, longitude, timestamp)
+SELECT
+    CASE WHEN i % 200 = 0 THEN 'pothole' WHEN i % 200 = 1 THEN 'bump' ELSE 'normal' END,
+    i % 1000,
+    random() * 100, random() * 100, 16500 + random() * 40,
+    50.40 + random() * 0.1, 30.45 + random() * 0.1,
+    TIMESTAMP '2025-01-01' + (i * (365.0 * 86400 / :rows)) * INTERVAL '1 second'
+FROM generate_series(1, :rows) AS i
+"""
+
+QUERIES = {
+    "one user, one day": """
+        SELECT * FROM processed_agent_data
+        WHERE user_id = 42 AND timestamp >= '2025-06-01' AND timestamp < '2025-06-02'
+    """,
+    "one user, one week, by state": """
+        SELECT road_state, count(*) FROM processed_agent_data
+        WHERE user_id = 42 AND timestamp >= '2025-06-01' AND timestamp < '2025-06-08'
+        GROUP BY road_state
+    """,
+    "potholes in one month": """
+        SELECT * FROM processed_agent_data
+        WHERE road_state = 'pothole' AND timestamp >= '2025-03-01' AND timestamp < '2025-04-01'
+    """,
+    "all bumps": "SELECT count(*) FROM processed_agent_data WHERE road_state = 'bump'",
+}
+
+
+def main():
+    metadata.create_all(bind=engine)
+    if is_partitioned(engine):
+        ensure_partitions(engine, months_behind=0, months_ahead=12, today=START)
+
+    with engine.begin() as connection:
+        connection.execute(text(GENERATE), {"rows": ROWS})
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("ANALYZE processed_agent_data"))
+
+    with engine.connect() as connection:
+        for title, query in QUERIES.items():
+            plan = connection.execute(text(f"EXPLAIN (ANALYZE, FORMAT JSON) {query}")).scalar()[0]
+            nodes = []
+            node = plan["Plan"]
+            while node:
+                nodes.append(node["Node Type"])
+                node = node.get("Plans", [None])[0]
+            print(f"{title:<30} {plan['Execution Time']:>10.1f} ms  {' > '.join(nodes)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+WebSocket fan-out of the store: sequential send_json vs the broadcaster.
+
+Subscribes SUBSCRIBERS simulated clients to one user, SLOW_SUBSCRIBERS of
+which take SLOW_SEND_SECONDS per message, and publishes BATCHES batches of
+BATCH_ROWS rows. Prints how long the publishing request is blocked and when
+the fast clients have received every row.
+
+Usage (from the store directory):
+    python -m benchmarks.websocket_fanout
+"""
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+
+from app.services.websocket_manager import WebSocketBroadcaster
+
+SUBSCRIBERS = 1000
+SLOW_SUBSCRIBERS = 10
+SLOW_SEND_SECONDS = 0.05
+BATCHES = 20
+BATCH_ROWS = 20
+USER_ID = 1
+
+
+class FakeWebSocket:
+    def __init__(self, send_delay: float = 0):
+        self.send_delay = send_delay
+        self.received_rows = 0
+        self.done = asyncio.Event()
+
+    async def send_text(self, text: str):
+        if self.send_delay:
+            await asyncio.sleep(self.send_delay)
+        else:
+            await asyncio.sleep(0)
+        self.received_rows += len(json.loads(text))
+        if self.received_rows >= BATCHES * BATCH_ROWS:
+            self.done.set()
+
+    async def send_json(self, data):
+        await self.send_text(json.dumps(data))
+
+    async def close(self):
+        pass
+
+
+def build_batches():
+    started = datetime(2025, 5, 1)
+    return [
+        [
+            {
+                "id": batch * BATCH_ROWS + i,
+                "road_state": "normal",
+                "user_id": USER_ID,
+                "x": 1.0, "y": 2.0, "z": 16500.0,
+                "latitude": 50.45, "longitude": 30.52,
+                "timestamp": started + timedelta(seconds=batch * BATCH_ROWS + i),
+            }
+            for i in range(BATCH_ROWS)
+        ]
+        for batch in range(BATCHES)
+    ]
+
+
+def build_sockets():
+    return [FakeWebSocket(SLOW_SEND_SECONDS if i < SLOW_SUBSCRIBERS else 0) for i in range(SUBSCRIBERS)]
+
+
+async def run_sequential(batches):
+    """The previous implementation: encode per call, await every socket in turn."""
+    sockets = build_sockets()
+    started = time.perf_counter()
+    for rows in batches:
+        data = jsonable_encoder(rows)
+        for websocket in sockets:
+            await websocket.send_json(data)
+    blocked = time.perf_counter() - started
+    return blocked, blocked
+
+
+async def run_broadcaster(batches):
+    broadcaster = WebSocketBroadcaster()
+    await broadcaster.start()
+    sockets = build_sockets()
+    subscribers = [broadcaster.subscribe(websocket, USER_ID) for websocket in sockets]
+
+    started = time.perf_counter()
+    for rows in batches:
+        await broadcaster.publish(USER_ID, rows)
+    blocked = time.perf_counter() - started
+    await asyncio.gather(*(websocket.done.wait() for websocket in sockets[SLOW_SUBSCRIBERS:]))
+    delivered = time.perf_counter() - started
+
+    for subscriber in subscribers:
+        broadcaster.unsubscribe(USER_ID, subscriber)
+    await broadcaster.stop()
+    return blocked, delivered
+
+
+async def main():
+    batches = build_batches()
+    print(f"{SUBSCRIBERS} subscribers ({SLOW_SUBSCRIBERS} slow), {BATCHES} batches of {BATCH_ROWS} rows")
+    print(f"{'mode':>12} {'blocked, s':>12} {'fast clients done, s':>22}")
+    for name, run in (("sequential", run_sequential), ("broadcaster", run_broadcaster)):
+        blocked, delivered = await run(batches)
+        print(f"{name:>12} {blocked:>12.3f} {delivered:>22.3f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,59 @@
+"""
+Decoding cost of JSON vs binary request bodies of the create endpoints.
+
+Builds a body of each format for BATCH_SIZES items and prints its size and how
+long it takes to turn it into validated ProcessedAgentData.
+
+Usage (from the store directory):
+    python -m benchmarks.wire_format
+"""
+import timeit
+from datetime import datetime, timedelta
+
+from app.services.wire_format import (
+    HEADER,
+    KIND_PROCESSED_AGENT_DATA,
+    PROCESSED_AGENT_DATA_LIST,
+    PROCESSED_AGENT_DATA_RECORD,
+    WIRE_FORMAT_VERSION,
+    decode_processed_agent_data,
+)
+
+BATCH_SIZES = (1, 20, 1000)
+REPEAT = 200
+
+
+def per_call_us(statement) -> float:
+    return min(timeit.repeat(statement, number=REPEAT, repeat=3)) / REPEAT * 1e6
+
+
+def json_body(count: int) -> bytes:
+    timestamp = datetime.now()
+    items = [{
+        "road_state": "normal",
+        "agent_data": {
+            "user_id": 1,
+            "accelerometer": {"x": -17.0, "y": 4.0, "z": 16516.0},
+            "gps": {"latitude": 50.450386085935094, "longitude": 30.524547100067142},
+            "timestamp": timestamp,
+        },
+    }] * count
+    return PROCESSED_AGENT_DATA_LIST.dump_json(PROCESSED_AGENT_DATA_LIST.validate_python(items))
+
+
+def binary_body(count: int) -> bytes:
+    microseconds = (datetime.now() - datetime(1970, 1, 1)) // timedelta(microseconds=1)
+    record = PROCESSED_AGENT_DATA_RECORD.pack(
+        0, 1, -17.0, 4.0, 16516.0, 50.450386085935094, 30.524547100067142, microseconds, -32768
+    )
+    return HEADER.pack(WIRE_FORMAT_VERSION, KIND_PROCESSED_AGENT_DATA, count) + record * count
+
+
+if __name__ == "__main__":
+    print(f"{'items':>6} {'json bytes':>11} {'binary bytes':>13} {'json, us':>10} {'binary, us':>11}")
+    for count in BATCH_SIZES:
+        json_payload = json_body(count)
+        binary_payload = binary_body(count)
+        json_us = per_call_us(lambda: PROCESSED_AGENT_DATA_LIST.validate_json(json_payload))
+        binary_us = per_call_us(lambda: decode_processed_agent_data(binary_payload))
+        print(f"{count:>6} {len(json_payload):>11} {len(binary_payload):>13} {json_us:>10.1f} {binary_us:>11.1f}")
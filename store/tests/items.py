@@ -0,0 +1,17 @@
+from datetime import datetime, timedelta
+
+from app.models.schemas import ProcessedAgentData
+
+
+def processed_item(
+    road_state="normal", user_id=1, latitude=50.45, longitude=30.52, timestamp=None, z=16500.0
+) -> ProcessedAgentData:
+    return ProcessedAgentData(
+        road_state=road_state,
+        agent_data={
+            "user_id": user_id,
+            "accelerometer": {"x": 1.0, "y": 2.0, "z": z},
+            "gps": {"latitude": latitude, "longitude": longitude},
+            "timestamp": timestamp or datetime(2025, 5, 1) + timedelta(seconds=z - 16500),
+        },
+    )
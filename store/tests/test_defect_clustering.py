@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+from app.crud import processed_data as crud
+from app.crud.road_defects import list_defects, rebuild_defects
+from app.models.db_models import processed_agent_data
+from tests.items import processed_item
+
+START = datetime(2025, 5, 1, 12)
+KYIV = timezone(timedelta(hours=3))
+# About 1 m apart, well within DEFECT_MERGE_DISTANCE_M
+NEARBY = [(50.45 + i * 0.00001, 30.52) for i in range(4)]
+
+
+def _defects(db):
+    return [dict(defect) for defect in list_defects(db)]
+
+
+def _mixed_items():
+    """Pothole events at one spot, alternating naive and aware timestamps out of order."""
+    return [
+        processed_item("pothole", latitude=NEARBY[0][0], longitude=NEARBY[0][1], timestamp=START + timedelta(minutes=2)),
+        processed_item(
+            "pothole", latitude=NEARBY[1][0], longitude=NEARBY[1][1],
+            timestamp=(START + timedelta(minutes=1)).replace(tzinfo=timezone.utc).astimezone(KYIV),
+        ),
+        processed_item("pothole", latitude=NEARBY[2][0], longitude=NEARBY[2][1], timestamp=START),
+        processed_item(
+            "pothole", latitude=NEARBY[3][0], longitude=NEARBY[3][1],
+            timestamp=(START + timedelta(minutes=3)).replace(tzinfo=timezone.utc),
+        ),
+    ]
+
+
+def test_mixed_naive_and_aware_timestamps_are_clustered(db, client):
+    items = _mixed_items()
+
+    response = client.post(
+        "/processed_agent_data/", content="[" + ",".join(item.model_dump_json() for item in items) + "]"
+    )
+
+    assert response.status_code == 200
+    stored = db.execute(select(processed_agent_data.c.timestamp).order_by(processed_agent_data.c.timestamp))
+    assert stored.scalars().all() == [START + timedelta(minutes=minutes) for minutes in range(4)]
+    defect, = _defects(db)
+    assert defect["hit_count"] == 4
+    assert (defect["first_seen"], defect["last_seen"]) == (START, START + timedelta(minutes=3))
+
+
+def test_aware_timestamp_joins_a_cluster_of_naive_ones(db):
+    crud.create_data_batch(db, _mixed_items()[::2])
+    crud.create_data_batch(db, _mixed_items()[1::2])
+
+    defect, = _defects(db)
+    assert defect["hit_count"] == 4
+    assert defect["last_seen"] == START + timedelta(minutes=3)
+
+
+def test_delete_takes_the_event_out_of_its_defect(db):
+    created = crud.create_data_batch(db, [
+        processed_item("pothole", latitude=latitude, longitude=longitude, timestamp=START + timedelta(minutes=i))
+        for i, (latitude, longitude) in enumerate(NEARBY[:3])
+    ])
+
+    crud.delete_data(db, created[-1]["id"])
+
+    defect, = _defects(db)
+    assert defect["hit_count"] == 2
+    assert defect["latitude"] == sum(latitude for latitude, _ in NEARBY[:2]) / 2
+    assert defect["last_seen"] == START + timedelta(minutes=1)
+
+    for row in created[:2]:
+        crud.delete_data(db, row["id"])
+    assert _defects(db) == []
+
+
+def test_update_moves_the_event_to_another_defect(db):
+    created = crud.create_data_batch(db, [
+        processed_item("pothole", latitude=latitude, longitude=longitude, timestamp=START)
+        for latitude, longitude in NEARBY[:2]
+    ])
+
+    crud.update_data(db, created[0]["id"], processed_item("bump", latitude=50.46, longitude=30.53, timestamp=START))
+
+    pothole, bump = sorted(_defects(db), key=lambda defect: defect["road_state"], reverse=True)
+    assert (pothole["road_state"], pothole["hit_count"], pothole["latitude"]) == ("pothole", 1, NEARBY[1][0])
+    assert (bump["road_state"], bump["hit_count"], bump["latitude"]) == ("bump", 1, 50.46)
+
+
+def test_incremental_defects_match_a_rebuild(db):
+    created = crud.create_data_batch(db, _mixed_items())
+    crud.delete_data(db, created[1]["id"])
+    crud.update_data(db, created[2]["id"], processed_item("pothole", latitude=NEARBY[2][0], longitude=NEARBY[2][1],
+                                                          timestamp=START + timedelta(minutes=5)))
+    incremental = [(d["hit_count"], d["first_seen"], d["last_seen"]) for d in _defects(db)]
+
+    rebuild_defects(db)
+
+    assert [(d["hit_count"], d["first_seen"], d["last_seen"]) for d in _defects(db)] == incremental
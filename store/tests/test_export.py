@@ -0,0 +1,21 @@
+import csv
+import io
+import json
+
+from app.crud import processed_data as crud
+from tests.items import processed_item
+
+
+def test_csv_and_ndjson_exports_have_the_same_columns(db, client):
+    crud.create_data_batch(db, [processed_item(z=16500.0 + i) for i in range(3)])
+
+    ndjson = client.get("/processed_agent_data/export", params={"format": "ndjson"})
+    documents = [json.loads(line) for line in ndjson.text.splitlines()]
+    rows = list(csv.DictReader(io.StringIO(client.get("/processed_agent_data/export", params={"format": "csv"}).text)))
+
+    assert len(documents) == len(rows) == 3
+    assert list(documents[0]) == list(rows[0])
+    assert "cell" in rows[0]
+    assert [document["cell"] for document in documents] == [int(row["cell"]) for row in rows]
+    assert [document["timestamp"] for document in documents] == [row["timestamp"] for row in rows]
+    assert rows[0]["timestamp"] == "2025-05-01T00:00:00"
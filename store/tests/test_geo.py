@@ -0,0 +1,39 @@
+from app.services.geo import EARTH_METERS_PER_DEGREE, simplify_indices
+
+# One meter in degrees of latitude
+METER = 1 / EARTH_METERS_PER_DEGREE
+
+
+def _straight_track(length):
+    return [(50.45, 30.52 + index * 0.0001) for index in range(length)]
+
+
+def test_straight_track_keeps_only_its_ends():
+    assert simplify_indices(_straight_track(10), tolerance_m=1) == [0, 9]
+
+
+def test_corner_is_kept_and_small_wobbles_are_dropped():
+    # East for six points, then north for four
+    east = _straight_track(6)
+    corner_latitude, corner_longitude = east[-1]
+    north = [(corner_latitude + index * 10 * METER, corner_longitude) for index in range(1, 5)]
+    track = east + north
+    track[2] = (track[2][0] + 0.5 * METER, track[2][1])
+
+    assert simplify_indices(track, tolerance_m=1) == [0, 5, 9]
+
+
+def test_pothole_and_bump_anchors_are_kept_on_a_straight_track():
+    assert simplify_indices(_straight_track(10), tolerance_m=1, anchors=[2, 6]) == [0, 2, 6, 9]
+
+
+def test_anchor_is_kept_even_within_the_tolerance():
+    track = _straight_track(10)
+    track[5] = (track[5][0] + 5 * METER, track[5][1])
+
+    assert simplify_indices(track, tolerance_m=10) == [0, 9]
+    assert simplify_indices(track, tolerance_m=10, anchors=[5]) == [0, 5, 9]
+
+
+def test_short_tracks_are_kept_whole():
+    assert simplify_indices(_straight_track(2), tolerance_m=1000) == [0, 1]
@@ -0,0 +1,81 @@
+import threading
+
+from sqlalchemy import select, text
+
+from app.crud import processed_data as crud
+from app.models.db_models import processed_agent_data
+from app.models.migrations import backfill_cells, upgrade_schema
+from app.services.geo import cell_of
+from tests.items import processed_item
+
+LOCATIONS = [(50.45, 30.52), (-33.8688, 151.2093), (0.0, -179.9999), (89.9, 0.0)]
+
+
+def _cells(db):
+    rows = db.execute(select(processed_agent_data.c.latitude, processed_agent_data.c.longitude, processed_agent_data.c.cell))
+    return {(latitude, longitude): cell for latitude, longitude, cell in rows}
+
+
+def test_backfill_computes_cells_like_inserts(db, engine):
+    crud.create_data_batch(db, [processed_item(latitude=lat, longitude=lon) for lat, lon in LOCATIONS])
+    with engine.begin() as connection:
+        connection.execute(processed_agent_data.update().values(cell=None))
+
+    assert backfill_cells(engine, chunk_size=3) == len(LOCATIONS)
+
+    assert _cells(db) == {(lat, lon): cell_of(lat, lon) for lat, lon in LOCATIONS}
+
+
+def test_upgrade_adds_the_cell_column_to_an_old_table(db, engine):
+    crud.create_data_batch(db, [processed_item(latitude=lat, longitude=lon) for lat, lon in LOCATIONS])
+    db.commit()
+    with engine.begin() as connection:
+        connection.execute(text(f"ALTER TABLE {processed_agent_data.name} DROP COLUMN cell"))
+
+    upgrade_schema(engine)
+    upgrade_schema(engine)
+    backfill_cells(engine)
+
+    assert _cells(db) == {(lat, lon): cell_of(lat, lon) for lat, lon in LOCATIONS}
+    assert crud.list_data_in_area(db, 50.4, 30.5, 50.5, 30.6)[0]["latitude"] == 50.45
+
+
+def test_backfill_visits_every_row_once(db, engine):
+    crud.create_data_batch(db, [processed_item(latitude=lat, longitude=lon) for lat, lon in LOCATIONS * 3])
+    with engine.begin() as connection:
+        connection.execute(processed_agent_data.update().where(processed_agent_data.c.latitude > 0).values(cell=None))
+
+    # Chunks hold rows that already have a cell too, the walk by id still reaches the end
+    assert backfill_cells(engine, chunk_size=2) == 6
+    assert backfill_cells(engine, chunk_size=2) == 0
+
+    assert _cells(db) == {(lat, lon): cell_of(lat, lon) for lat, lon in LOCATIONS}
+
+
+def test_backfill_stops_when_asked(db, engine):
+    crud.create_data_batch(db, [processed_item(latitude=lat, longitude=lon) for lat, lon in LOCATIONS])
+    with engine.begin() as connection:
+        connection.execute(processed_agent_data.update().values(cell=None))
+    stop = threading.Event()
+    stop.set()
+
+    assert backfill_cells(engine, chunk_size=1, stop=stop) == 0
+
+
+def test_upgrade_adds_missing_indexes(db, engine):
+    names = {index.name for index in processed_agent_data.indexes}
+    with engine.begin() as connection:
+        for name in names:
+            connection.execute(text(f"DROP INDEX {name}"))
+
+    upgrade_schema(engine)
+    upgrade_schema(engine)
+
+    with engine.connect() as connection:
+        rows = connection.execute(
+            text("SELECT indexname, indexdef FROM pg_indexes WHERE tablename = :table"),
+            {"table": processed_agent_data.name},
+        )
+        indexes = dict(rows.all())
+    assert names <= indexes.keys()
+    assert "WHERE" in indexes["ix_processed_agent_data_road_events"]
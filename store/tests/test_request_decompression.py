@@ -0,0 +1,96 @@
+import asyncio
+import gzip
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.services.request_decompression import GzipRequestMiddleware
+
+MAX_SIZE = 1000
+
+
+def _echo_app():
+    app = FastAPI()
+    app.add_middleware(GzipRequestMiddleware, max_size=MAX_SIZE)
+
+    @app.post("/echo")
+    async def echo(request: Request):
+        body = await request.body()
+        return {
+            "body": body.decode(),
+            "content_length": request.headers.get("content-length"),
+            "content_encoding": request.headers.get("content-encoding"),
+        }
+
+    return app
+
+
+@pytest.fixture
+def client():
+    with TestClient(_echo_app()) as client:
+        yield client
+
+
+def _post(client, body: bytes, encoding="gzip"):
+    return client.post("/echo", content=body, headers={"Content-Encoding": encoding} if encoding else {})
+
+
+def test_plain_body_passes_through(client):
+    response = _post(client, b"plain", encoding=None)
+
+    assert response.json() == {"body": "plain", "content_length": "5", "content_encoding": None}
+
+
+def test_gzip_body_is_decompressed(client):
+    response = _post(client, gzip.compress(b"a" * 500))
+
+    assert response.json() == {"body": "a" * 500, "content_length": "500", "content_encoding": None}
+
+
+def test_every_gzip_member_is_decompressed(client):
+    response = _post(client, gzip.compress(b"a" * 10) + gzip.compress(b"b" * 10) + gzip.compress(b""))
+
+    assert response.json()["body"] == "a" * 10 + "b" * 10
+
+
+def test_members_split_across_body_chunks():
+    body = gzip.compress(b"a" * 10) + gzip.compress(b"b" * 10)
+    first = len(gzip.compress(b"a" * 10))
+    # Chunk boundaries right at the end of the first member and inside the second one
+    chunks = [body[:first], body[first:first + 5], body[first + 5:]]
+    received = []
+
+    async def app(scope, receive, send):
+        message = await receive()
+        received.append(message["body"])
+
+    async def receive():
+        chunk = chunks.pop(0)
+        return {"type": "http.request", "body": chunk, "more_body": bool(chunks)}
+
+    scope = {"type": "http", "headers": [(b"content-encoding", b"gzip")]}
+    asyncio.run(GzipRequestMiddleware(app, max_size=MAX_SIZE)(scope, receive, None))
+
+    assert received == [b"a" * 10 + b"b" * 10]
+
+
+@pytest.mark.parametrize("body", [
+    gzip.compress(b"a" * (MAX_SIZE + 1)),
+    gzip.compress(b"a" * 600) + gzip.compress(b"b" * 600),
+])
+def test_too_large_body_is_rejected(client, body):
+    response = _post(client, body)
+
+    assert response.status_code == 413
+
+
+@pytest.mark.parametrize("body", [
+    b"not gzip",
+    gzip.compress(b"a" * 100)[:-5],
+    gzip.compress(b"a" * 10) + b"trailing garbage",
+])
+def test_invalid_body_is_rejected(client, body):
+    response = _post(client, body)
+
+    assert response.status_code == 400
@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+from app.crud import processed_data as crud
+from app.crud.stats import rebuild_stats
+from app.models.db_models import cell_road_stats, user_road_state_hourly
+from tests.items import processed_item
+
+START = datetime(2025, 5, 1, 12, 30)
+KYIV = timezone(timedelta(hours=3))
+
+
+def _rollups(db):
+    user_hours = db.execute(select(user_road_state_hourly).order_by(*user_road_state_hourly.primary_key))
+    cells = db.execute(select(cell_road_stats).order_by(cell_road_stats.c.cell))
+    return [dict(row) for row in user_hours.mappings()], [dict(row) for row in cells.mappings()]
+
+
+def _assert_matches_rebuild(db):
+    incremental = _rollups(db)
+    rebuild_stats(db)
+    assert _rollups(db) == incremental
+
+
+def _items():
+    """Two cells and two hours, with naive and aware timestamps mixed in one batch."""
+    return [
+        processed_item("normal", timestamp=START),
+        processed_item("pothole", timestamp=(START + timedelta(minutes=10)).replace(tzinfo=timezone.utc)),
+        processed_item("bump", timestamp=(START + timedelta(minutes=40)).replace(tzinfo=timezone.utc).astimezone(KYIV)),
+        processed_item("pothole", latitude=50.46, user_id=2, timestamp=START + timedelta(hours=1)),
+    ]
+
+
+def test_mixed_naive_and_aware_timestamps_are_counted_in_utc_hours(db):
+    crud.create_data_batch(db, _items())
+
+    user_hours, cells = _rollups(db)
+    assert [(row["user_id"], row["hour"], row["road_state"], row["count"]) for row in user_hours] == [
+        (1, datetime(2025, 5, 1, 12), "normal", 1),
+        (1, datetime(2025, 5, 1, 12), "pothole", 1),
+        (1, datetime(2025, 5, 1, 13), "bump", 1),
+        (2, datetime(2025, 5, 1, 13), "pothole", 1),
+    ]
+    assert sorted((row["total_count"], row["defect_count"]) for row in cells) == [(1, 1), (3, 2)]
+    _assert_matches_rebuild(db)
+
+
+def test_delete_subtracts_from_the_rollups(db):
+    created = crud.create_data_batch(db, _items())
+    latest = max(created, key=lambda row: row["timestamp"] if row["user_id"] == 1 else START)
+
+    crud.delete_data(db, latest["id"])
+    crud.delete_data(db, created[-1]["id"])
+
+    user_hours, cells = _rollups(db)
+    assert [(row["road_state"], row["count"]) for row in user_hours] == [("normal", 1), ("pothole", 1)]
+    cell, = cells
+    assert (cell["total_count"], cell["defect_count"]) == (2, 1)
+    assert cell["last_seen"] == START + timedelta(minutes=10)
+    _assert_matches_rebuild(db)
+
+
+def test_update_moves_the_row_between_rollups(db):
+    created = crud.create_data_batch(db, _items())
+
+    crud.update_data(db, created[0]["id"], processed_item("bump", user_id=2, latitude=50.46, timestamp=START))
+
+    user_hours, cells = _rollups(db)
+    assert (2, datetime(2025, 5, 1, 12), "bump", 1) in [
+        (row["user_id"], row["hour"], row["road_state"], row["count"]) for row in user_hours
+    ]
+    assert sorted((row["total_count"], row["defect_count"]) for row in cells) == [(2, 2), (2, 2)]
+    _assert_matches_rebuild(db)
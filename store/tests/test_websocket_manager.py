@@ -0,0 +1,180 @@
+import asyncio
+import json
+
+from app.services import websocket_manager
+from app.services.websocket_manager import SubscriptionOptions, WebSocketBroadcaster, coalesce, simplify_rows
+
+
+class FakeWebSocket:
+    def __init__(self, stalled=False):
+        self.stalled = stalled
+        self.sent = []
+        self.closed = False
+
+    async def send_text(self, message):
+        if self.stalled:
+            await asyncio.Event().wait()
+        self.sent.append(json.loads(message))
+
+    async def close(self):
+        self.closed = True
+
+
+def _row(road_state="normal", latitude=50.45, longitude=30.52):
+    return {"road_state": road_state, "latitude": latitude, "longitude": longitude}
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_coalesce_merges_arrays_and_skips_empty_ones():
+    assert coalesce(['[{"a": 1}]']) == '[{"a": 1}]'
+    assert json.loads(coalesce(['[{"a": 1}]', "[]", '[{"a": 2}, {"a": 3}]'])) == [{"a": 1}, {"a": 2}, {"a": 3}]
+
+
+def test_batches_queued_while_sending_go_out_coalesced():
+    async def scenario():
+        broadcaster = WebSocketBroadcaster(queue_size=10, send_timeout=1)
+        await broadcaster.start()
+        websocket = FakeWebSocket()
+        broadcaster.subscribe(websocket, 1)
+        for latitude in (1, 2, 3):
+            await broadcaster.publish(1, [_row(latitude=latitude)])
+        await _settle()
+        return websocket.sent
+
+    sent, = asyncio.run(scenario())
+
+    assert [row["latitude"] for row in sent] == [1, 2, 3]
+
+
+def test_full_queue_drops_the_oldest_batches():
+    async def scenario():
+        broadcaster = WebSocketBroadcaster(queue_size=2, send_timeout=1)
+        await broadcaster.start()
+        websocket = FakeWebSocket()
+        subscriber = broadcaster.subscribe(websocket, 1)
+        for latitude in (1, 2, 3, 4):
+            await broadcaster.publish(1, [_row(latitude=latitude)])
+        await _settle()
+        return subscriber.dropped, websocket.sent
+
+    dropped, sent = asyncio.run(scenario())
+
+    assert dropped == 2
+    assert sent == [[_row(latitude=3), _row(latitude=4)]]
+
+
+def test_subscriber_that_times_out_is_dropped_and_closed():
+    async def scenario():
+        broadcaster = WebSocketBroadcaster(queue_size=2, send_timeout=0.01)
+        await broadcaster.start()
+        slow, fast = FakeWebSocket(stalled=True), FakeWebSocket()
+        broadcaster.subscribe(slow, 1)
+        broadcaster.subscribe(fast, 1)
+        await broadcaster.publish(1, [_row()])
+        await asyncio.sleep(0.05)
+        await broadcaster.publish(1, [_row()])
+        await _settle()
+        return broadcaster.subscriptions[1], slow, fast
+
+    subscribers, slow, fast = asyncio.run(scenario())
+
+    assert [subscriber.websocket for subscriber in subscribers] == [fast]
+    assert slow.closed
+    assert fast.sent == [[_row()], [_row()]]
+
+
+def test_last_dropped_subscriber_removes_the_user():
+    async def scenario():
+        broadcaster = WebSocketBroadcaster(queue_size=2, send_timeout=0.01)
+        await broadcaster.start()
+        broadcaster.subscribe(FakeWebSocket(stalled=True), 1)
+        await broadcaster.publish(1, [_row()])
+        await asyncio.sleep(0.05)
+        return broadcaster.subscriptions
+
+    assert asyncio.run(scenario()) == {}
+
+
+def test_publish_skips_serialization_without_local_subscribers(monkeypatch):
+    serialized = []
+    serialize_rows = websocket_manager.serialize_rows
+    monkeypatch.setattr(
+        websocket_manager, "serialize_rows", lambda rows: serialized.append(rows) or serialize_rows(rows)
+    )
+
+    async def scenario():
+        broadcaster = WebSocketBroadcaster(queue_size=2, send_timeout=1)
+        await broadcaster.start()
+        await broadcaster.publish(1, [_row()])
+        broadcaster.subscribe(FakeWebSocket(), 2)
+        await broadcaster.publish(2, [_row()])
+
+    asyncio.run(scenario())
+
+    assert serialized == [[_row()]]
+
+
+def _filtered(options, batches):
+    async def scenario():
+        broadcaster = WebSocketBroadcaster(queue_size=10, send_timeout=1)
+        await broadcaster.start()
+        websocket = FakeWebSocket()
+        broadcaster.subscribe(websocket, 1, options)
+        for batch in batches:
+            await broadcaster.publish(1, batch)
+            await _settle()
+        return websocket.sent
+
+    return asyncio.run(scenario())
+
+
+def test_bbox_filter_keeps_rows_inside_the_box():
+    options = SubscriptionOptions(bbox=(50.0, 30.0, 51.0, 31.0))
+    inside, north, west = _row(), _row(latitude=51.5), _row(longitude=29.5)
+
+    assert _filtered(options, [[inside, north], [west]]) == [[inside]]
+
+
+def test_road_state_filter_keeps_requested_states():
+    options = SubscriptionOptions(road_states=frozenset({"pothole", "bump"}))
+    pothole, bump = _row("pothole"), _row("bump")
+
+    assert _filtered(options, [[_row(), pothole], [_row()], [bump]]) == [[pothole], [bump]]
+
+
+def test_max_rate_coalesces_batches_arriving_within_the_interval():
+    async def scenario():
+        broadcaster = WebSocketBroadcaster(queue_size=10, send_timeout=1)
+        await broadcaster.start()
+        websocket = FakeWebSocket()
+        broadcaster.subscribe(websocket, 1, SubscriptionOptions(max_rate=10))
+        for latitude in (1, 2, 3):
+            await broadcaster.publish(1, [_row(latitude=latitude)])
+            await _settle()
+        sent_within_interval = len(websocket.sent)
+        await asyncio.sleep(0.15)
+        return sent_within_interval, websocket.sent
+
+    sent_within_interval, sent = asyncio.run(scenario())
+
+    assert sent_within_interval == 1
+    assert [[row["latitude"] for row in message] for message in sent] == [[1], [2, 3]]
+
+
+def test_zoomed_out_subscriber_gets_a_simplified_track_with_its_events():
+    track = [_row(longitude=30.52 + index * 0.0001) for index in range(10)]
+    track[4] = _row("pothole", longitude=track[4]["longitude"])
+
+    sent, = _filtered(SubscriptionOptions(zoom=10), [track])
+
+    assert sent == [track[0], track[4], track[9]]
+
+
+def test_simplify_rows_leaves_short_tracks_alone():
+    rows = [_row(), _row(longitude=30.53)]
+
+    assert simplify_rows(rows, zoom=0) is rows
@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.wire_format import (
+    BINARY_CONTENT_TYPE,
+    HEADER,
+    KIND_PROCESSED_AGENT_DATA,
+    PROCESSED_AGENT_DATA_RECORD,
+    WIRE_FORMAT_VERSION,
+    decode_processed_agent_data,
+)
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _message(*records) -> bytes:
+    return HEADER.pack(WIRE_FORMAT_VERSION, KIND_PROCESSED_AGENT_DATA, len(records)) + b"".join(
+        PROCESSED_AGENT_DATA_RECORD.pack(*record) for record in records
+    )
+
+
+def _record(code=1, user_id=1, microseconds=0, offset=-32768):
+    return code, user_id, 0.5, -1.25, 16500.0, 50.45, 30.52, microseconds, offset
+
+
+@pytest.mark.parametrize("timestamp, offset", [
+    (datetime(2024, 1, 1, 12, 0, 0, 123456), -32768),
+    (datetime(2024, 1, 1, 12), 180),
+    (datetime.min, -32768),
+    (datetime.max, -32768),
+])
+def test_decode_timestamps(timestamp, offset):
+    microseconds = (timestamp - _EPOCH) // timedelta(microseconds=1)
+
+    item, = decode_processed_agent_data(_message(_record(microseconds=microseconds, offset=offset)))
+
+    assert item.road_state == "pothole"
+    assert item.agent_data.timestamp.replace(tzinfo=None) == timestamp
+    expected_offset = None if offset == -32768 else timedelta(minutes=offset)
+    assert item.agent_data.timestamp.utcoffset() == expected_offset
+
+
+@pytest.mark.parametrize("record", [
+    _record(microseconds=2 ** 63 - 1),
+    _record(microseconds=-2 ** 63),
+    _record(code=7),
+    _record(offset=24 * 60),
+])
+def test_invalid_record_is_rejected(record):
+    with pytest.raises(ValueError):
+        decode_processed_agent_data(_message(record))
+
+
+def test_out_of_range_timestamp_is_answered_with_422(client):
+    response = client.post(
+        "/processed_agent_data/",
+        content=_message(_record(microseconds=2 ** 63 - 1)),
+        headers={"Content-Type": BINARY_CONTENT_TYPE},
+    )
+
+    assert response.status_code == 422
+    assert "out of range" in response.json()["detail"]
+
+
+def test_aware_binary_record_is_stored_in_utc(client, db):
+    microseconds = (datetime(2024, 1, 1, 15) - _EPOCH) // timedelta(microseconds=1)
+
+    response = client.post(
+        "/processed_agent_data/",
+        content=_message(_record(microseconds=microseconds, offset=180)),
+        headers={"Content-Type": BINARY_CONTENT_TYPE},
+    )
+
+    assert response.status_code == 200
+    assert response.json()[0]["timestamp"] == "2024-01-01T12:00:00"